@@ -0,0 +1,29 @@
+import json
+
+import yaml
+from django.core.management import BaseCommand
+
+from integrations.benchmarks.replay import replay
+
+
+class Command(BaseCommand):
+    help = 'Replay a recorded dashboard response log through the scraper against a local Telegram stub'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--log', required=True, help='Response log written with record_responses_path')
+        parser.add_argument('--speed', type=float, default=1.0,
+                            help='Replay speed, 1 is real time, 10 ten times faster and 0 as fast as possible')
+        parser.add_argument('--config', default='./integrations/creds.yml',
+                            help='Scraper config with the routing table the log was recorded with')
+        parser.add_argument('--stub-delay', type=float, default=0, help='Seconds the Telegram stub takes to answer')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        with open(options['config'], 'rb') as f:
+            config = yaml.safe_load(f)
+        report = json.dumps(replay(options['log'], config, options['speed'], options['stub_delay']), indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report + "\n")
+        else:
+            self.stdout.write(report)
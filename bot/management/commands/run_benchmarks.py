@@ -0,0 +1,29 @@
+import json
+
+from django.core.management import BaseCommand
+
+from integrations.benchmarks.scraper_benchmark import BENCHMARKS, DEFAULT_CHURN, DEFAULT_SIZES, run
+
+
+class Command(BaseCommand):
+    help = 'Benchmark the scraper hot path on generated dashboard payloads and print the results as JSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                            help='Number of bets per snapshot, e.g. --sizes 1000 100000 1000000')
+        parser.add_argument('--churn', type=float, default=DEFAULT_CHURN,
+                            help='Share of the bets that change between two polls')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', nargs='+', choices=list(BENCHMARKS), help='Run only these benchmarks')
+        parser.add_argument('--no-memory', action='store_true', help='Skip the peak memory runs')
+        parser.add_argument('--output', help='Write the JSON to this file instead of stdout')
+
+    def handle(self, *args, **options):
+        results = run(sizes=options['sizes'], churn=options['churn'], seed=options['seed'], names=options['only'],
+                      trace_memory=not options['no_memory'])
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + "\n")
+        else:
+            self.stdout.write(output)
@@ -1,13 +1,21 @@
 from django.core.management import BaseCommand
 
 from integrations.scraper import Scraper
+from integrations.supervisor import start_supervisor
 
 
 class Command(BaseCommand):
     help = 'Run the Bet scraper'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--supervisor', action='store_true',
+                            help='Run the routes in worker processes, split by shards / shard_by in creds.yml')
+
     def handle(self, *args, **kwargs):
+        if kwargs['supervisor']:
+            print('Bet scraper supervisor is starting...')
+            start_supervisor()
+            return
         print('Bet scraper is starting...')
         scraper = Scraper()
         scraper.start()
-
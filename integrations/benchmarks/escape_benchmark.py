@@ -0,0 +1,76 @@
+import json
+import re
+import time
+
+from integrations.benchmarks.hash_benchmark import BET_COUNT, generate_bets
+from integrations.benchmarks.print_model_benchmark import build_model
+from integrations.helpers.markdown import escape
+from integrations.print_model import PrintModel, hours_and_minutes
+
+# This file benchmarks the str.translate MarkdownV2 escaper against the regex one it replaced
+# run it with `python -m integrations.benchmarks.escape_benchmark`
+
+
+def legacy_escape(text):
+    escape_chars = r'_*\[\]()~>#+-=|{}.!'
+    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', str(text))
+
+
+class LegacyEscapePrintModel(PrintModel):
+    def get_body_markdown(self):
+        formatted_time = hours_and_minutes(self.hours_to_start)
+        return f"_\\({legacy_escape(formatted_time)}\\)_\n" \
+               f"*{legacy_escape(self.league)}*\n" \
+               f"{legacy_escape(self.home_team)} / {legacy_escape(self.away_team)}" \
+               f" \\- {legacy_escape(self.what_to_display())} {legacy_escape(self.get_sign())}" \
+               f"{legacy_escape(self.display_mod())}@ {legacy_escape(self.price)}\n"
+
+
+def bet_fields(bets):
+    # the values a rendered bet escapes, strings and the raw numbers
+    return [value for bet in bets for value in (bet['league'], bet['home_team'], bet['away_team'], bet['mod'],
+                                                bet['price'], hours_and_minutes(bet['hours_to_start']))]
+
+
+def render_bodies(model_class, bets):
+    return [build_model(model_class, bet).get_body_markdown() for bet in bets]
+
+
+def best_of(function, repeat=3):
+    seconds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        seconds.append(time.perf_counter() - started)
+    return min(seconds), result
+
+
+def run(count=BET_COUNT):
+    bets = generate_bets(count)
+    for bet in bets:
+        bet['mod'] = float(bet['mod'])
+        # the generated names have no markdown in them, real leagues often do
+        bet['league'] = f"{bet['league']} (Women's U-21) - Group B.1"
+    fields = bet_fields(bets)
+
+    measurements = {
+        "escape_fields_legacy": (len(fields), lambda: [legacy_escape(value) for value in fields]),
+        "escape_fields": (len(fields), lambda: [escape(value) for value in fields]),
+        "get_body_markdown_legacy": (count, lambda: render_bodies(LegacyEscapePrintModel, bets)),
+        "get_body_markdown": (count, lambda: render_bodies(PrintModel, bets)),
+    }
+    results = {}
+    outputs = {}
+    for name, (items, function) in measurements.items():
+        seconds, outputs[name] = best_of(function)
+        results[name] = {"items": items, "seconds": round(seconds, 4), "items_per_second": round(items / seconds)}
+
+    # the new escaper has to produce exactly the same text
+    for name in ("escape_fields", "get_body_markdown"):
+        if outputs[name] != outputs[f"{name}_legacy"]:
+            raise AssertionError(f"{name} output differs from the legacy escaper")
+    return {"bets": count, "results": results}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,56 @@
+import json
+import random
+import time
+
+from integrations.helpers.hash_calculator import compute_bet_model_hash, selected_fields
+
+# This file benchmarks the bet dedup digest against the previous salted hash() implementation
+# run it with `python -m integrations.benchmarks.hash_benchmark`
+
+BET_COUNT = 100_000
+
+
+def legacy_compute_bet_model_hash(bet):
+    item_copy = {k: v for k, v in bet.items() if k in selected_fields}
+    return str(hash(frozenset(item_copy.items())))
+
+
+def generate_bets(count, seed=42):
+    rng = random.Random(seed)
+    bet_classes = ['ah', 'ou', '1x2', 'ml', 'asian', 'asian_corners', 'corners_ou']
+    bet_types = ['1', '2', 'o', 'u', 'x', 'corners_1', 'corners_2']
+    return [{
+        'uuid': f"P{i}",
+        'pin_fix': f"P{rng.randrange(10 ** 9)}",
+        'hours_to_start': round(rng.uniform(0, 24), 3),
+        'league': f"League {rng.randrange(300)}",
+        'home_team': f"Home Team {rng.randrange(5000)}",
+        'away_team': f"Away Team {rng.randrange(5000)}",
+        'bet_class': rng.choice(bet_classes),
+        'bet_type': rng.choice(bet_types),
+        'mod': rng.choice([-1.5, -0.5, -0.25, 0, 0.25, 2.5, 3.0]),
+        'price': round(rng.uniform(1.5, 3.5), 2),
+        'placed_count': rng.choice([0, 0, 0, 1]),
+        'dashboard_name': rng.choice(['sing', 'bet365']),
+    } for i in range(count)]
+
+
+def time_function(function, bets):
+    started = time.perf_counter()
+    for bet in bets:
+        function(bet)
+    return time.perf_counter() - started
+
+
+def run(count=BET_COUNT):
+    bets = generate_bets(count)
+    results = {}
+    for name, function in [("legacy_hash", legacy_compute_bet_model_hash),
+                           ("compute_bet_model_hash", compute_bet_model_hash)]:
+        seconds = min(time_function(function, bets) for _ in range(3))
+        results[name] = {"seconds": round(seconds, 4), "bets_per_second": round(count / seconds)}
+    return {"bets": count, "results": results}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
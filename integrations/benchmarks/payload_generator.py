@@ -0,0 +1,74 @@
+import json
+import random
+
+# bet types the dashboards send for each bet class, every known class is generated
+BET_TYPES_BY_CLASS = {
+    'ah': ['1', '2'],
+    'asian_handicap': ['1', '2'],
+    'asian': ['1', '2'],
+    'ou': ['o', 'u'],
+    'overunder': ['o', 'u'],
+    'overunder_corners': ['corners_o', 'corners_u'],
+    'corners_ou': ['corners_o', 'corners_u'],
+    'asian_corners': ['corners_1', 'corners_2'],
+    '1x2': ['1', '2', 'x'],
+    'ml': ['1', '2', 'l', 'd'],
+}
+DASHBOARD_NAMES = ['Sing', 'bet365']
+LEAGUE_COUNT = 300
+TEAM_COUNT = 5000
+
+
+def generate_mod(rng, bet_class):
+    if bet_class in ('1x2', 'ml'):
+        return None
+    if 'corners' in bet_class:
+        return rng.choice([7.0, 8.5, 9.0, 9.5, 10.0, 10.5, 11.5, -1.5, -0.5, 0.5])
+    if bet_class in ('ou', 'overunder'):
+        return rng.choice([0.5, 1.5, 2.0, 2.25, 2.5, 2.75, 3.0, 3.5, 4.5])
+    return rng.choice([-2.5, -1.75, -1.0, -0.5, -0.25, 0.0, 0.25, 0.5, 1.0, 1.5])
+
+
+def generate_bet(rng, number):
+    bet_class = rng.choice(list(BET_TYPES_BY_CLASS))
+    return {
+        'uuid': f"U{number}",
+        'pin_fix': f"P{rng.randrange(10 ** 9)}",
+        'hours_to_start': round(rng.uniform(0, 48), 3),
+        'league': f"League {rng.randrange(LEAGUE_COUNT)}",
+        'home_team': f"Home-Team {rng.randrange(TEAM_COUNT)}",
+        'away_team': f"Away (Team) {rng.randrange(TEAM_COUNT)}",
+        'bet_class': bet_class,
+        'bet_type': rng.choice(BET_TYPES_BY_CLASS[bet_class]),
+        'mod': generate_mod(rng, bet_class),
+        'price': round(rng.uniform(1.5, 3.5), 2),
+        'placed_count': 1 if rng.random() < 0.1 else 0,
+        'dashboard_name': rng.choice(DASHBOARD_NAMES),
+    }
+
+
+class PayloadGenerator:
+    """Generates unified dashboard snapshots that change by `churn` between polls.
+
+    Of the churned bets half get a new price (same uuid, new digest) and half are replaced by new bets.
+    """
+
+    def __init__(self, count, churn=0.01, seed=42):
+        self.rng = random.Random(seed)
+        self.churn = churn
+        self.next_number = count
+        self.bets = [generate_bet(self.rng, number) for number in range(count)]
+
+    def next_snapshot(self):
+        changed = int(len(self.bets) * self.churn)
+        for index in self.rng.sample(range(len(self.bets)), changed):
+            if self.rng.random() < 0.5:
+                self.bets[index] = dict(self.bets[index], price=round(self.rng.uniform(1.5, 3.5), 2))
+            else:
+                self.bets[index] = generate_bet(self.rng, self.next_number)
+                self.next_number += 1
+        return list(self.bets)
+
+    def payload(self, bets=None):
+        # the unified endpoint sends the bet list as a JSON encoded string in its data field
+        return {"data": json.dumps(self.bets if bets is None else bets)}
@@ -0,0 +1,134 @@
+import json
+import time
+
+from integrations.benchmarks.hash_benchmark import BET_COUNT, generate_bets
+from integrations.print_model import PrintModel
+
+# This file benchmarks the bet rule table in PrintModel against the substring chains it replaced
+# run it with `python -m integrations.benchmarks.print_model_benchmark`
+
+
+class LegacyPrintModel(PrintModel):
+    def remodel_based_on_bet_data(self, bet_class, bet_type, mod, away_team):
+        parsed_bet_class = str.lower(bet_class).strip()
+        parsed_bet_type = str.lower(str(bet_type)).strip()
+        bet_changed = False
+
+        if parsed_bet_class == "ah" or parsed_bet_class == "asian_handicap":
+            bet_changed = True
+
+        if parsed_bet_type == "2" and "1x2" not in parsed_bet_class and "ml" not in parsed_bet_class and "asian" not in parsed_bet_class and "ah" not in parsed_bet_class and "asian_handicap" not in parsed_bet_class:
+            self.mod = mod * -1
+            bet_changed = True
+
+        if parsed_bet_type == "2" and "1x2" not in parsed_bet_class and "ml":
+            self.display_team = away_team
+            bet_changed = True
+
+        if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
+            if mod.is_integer():  # Check if the mod value is a whole number
+                self.mod = format(int(mod), "d")
+                bet_changed = True
+            if parsed_bet_type == "o" or parsed_bet_type == "corners_o":
+                self.bet_type = "Over"
+                bet_changed = True
+            if parsed_bet_type == "u" or parsed_bet_type == "corners_u":
+                self.bet_type = "Under"
+                bet_changed = True
+
+        if "asian_corners" in parsed_bet_class:
+            if parsed_bet_type == "corners_2":
+                self.display_team = away_team
+            if mod.is_integer():  # Check if the mod value is a whole number
+                self.mod = format(int(mod), "d")
+                bet_changed = True
+
+        if "1x2" in parsed_bet_class or "ml" in parsed_bet_class:
+            self.mod = -0.5
+            bet_changed = True
+            if parsed_bet_type == "l":
+                self.display_team = away_team
+            if parsed_bet_type == "2":
+                self.display_team = away_team
+            if parsed_bet_type == "x" or parsed_bet_type == "d":
+                self.mod = 0
+                self.display_team = "Draw"
+
+        if "asian" in parsed_bet_class:
+            bet_changed = True
+
+        if not bet_changed:
+            self.page_name = "Error: bet not changed"
+
+    def get_sign(self):
+        parsed_bet_class = str.lower(self.bet_class).strip()
+        # check if mod is null, then replace it with number null
+        if self.mod is None:
+            self.mod = 0
+        if float(self.mod) > 0:
+            if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class or "asian_corners" in parsed_bet_class:
+                return ""
+            return "+"
+        return ""
+
+    def display_mod(self):
+        parsed_bet_class = str.lower(self.bet_class).strip()
+        parsed_bet_type = str.lower(str(self.bet_type)).strip()
+        if "1x2" in parsed_bet_class:
+            if parsed_bet_type == "x" or parsed_bet_type == "d":
+                return ""
+        if "asian_corners" in parsed_bet_class:
+            if parsed_bet_type == "corners_2":
+                return str(self.mod) + " Corner Handicap "
+            if parsed_bet_type == "corners_1":
+                return str(self.mod) + " Corners "
+        if "corners_ou" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
+            return str(self.mod) + " Corners "
+        return str(self.mod) + " "
+
+    def what_to_display(self):
+        parsed_bet_class = str.lower(self.bet_class).strip()
+        if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
+            return self.bet_type
+        return self.display_team
+
+
+def build_model(model_class, bet):
+    return model_class(bet['dashboard_name'], bet['hours_to_start'], bet['league'], bet['home_team'],
+                       bet['away_team'], bet['bet_type'], bet['mod'], bet['price'], bet['bet_class'],
+                       bet['placed_count'], "2.0")
+
+
+def apply_rules(model_class, bet):
+    # the part of rendering the rules are responsible for, without the markdown escaping
+    model = build_model(model_class, bet)
+    return model.what_to_display(), model.get_sign(), model.display_mod()
+
+
+def render(model_class, bet):
+    return build_model(model_class, bet).get_markdown()
+
+
+def time_function(function, model_class, bets):
+    started = time.perf_counter()
+    for bet in bets:
+        function(model_class, bet)
+    return time.perf_counter() - started
+
+
+def run(count=BET_COUNT):
+    bets = generate_bets(count)
+    for bet in bets:
+        # the dashboards always send the mod as a float
+        bet['mod'] = float(bet['mod'])
+    results = {}
+    for function in [apply_rules, render]:
+        for model_class in [LegacyPrintModel, PrintModel]:
+            seconds = min(time_function(function, model_class, bets) for _ in range(3))
+            results[f"{function.__name__}_{model_class.__name__}"] = {
+                "seconds": round(seconds, 4), "bets_per_second": round(count / seconds)}
+    return {"bets": count, "results": results}
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,168 @@
+import asyncio
+import os
+import tempfile
+import time
+from collections import deque
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from integrations.benchmarks.telegram_stub import TelegramStub
+from integrations.helpers.response_log import read_response_log
+from integrations.scraper import Scraper
+
+# This file replays a response log recorded with record_responses_path through the whole scraper pipeline,
+# sending to a local TelegramStub. run it with `python manage.py replay_scraper --log <path> --speed 10`
+
+
+def build_response(url, status, headers, body):
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = 'utf-8'
+    response._content = body.encode()
+    response._content_consumed = True
+    return response
+
+
+class ReplaySession:
+    """Takes the place of the requests session of BetSite and answers with the recorded responses.
+
+    Each url gets its own recordings in order, a get blocks until the recording is due at the replay speed
+    (speed 0 replays as fast as possible). Once a url has no recordings left it answers 304. Logins are not
+    recorded, a post answers with its recordings if there are any and with a successful login otherwise.
+    """
+
+    def __init__(self, records, speed=1.0, clock=time.monotonic, sleep=time.sleep):
+        self.speed = speed
+        self.clock = clock
+        self.sleep = sleep
+        self.records = {}
+        for record in records:
+            self.records.setdefault(record['url'], deque()).append(record)
+        recorded_at = [record['t'] for queue in self.records.values() for record in queue]
+        self.first_recorded_at = min(recorded_at) if recorded_at else 0
+        self.started_at = None
+        self.replayed = 0
+        self.logins = 0
+        # BetSite reads the expiry of the session cookies after a login
+        self.cookies = requests.cookies.RequestsCookieJar()
+
+    def get(self, url, headers=None, timeout=None, stream=False):
+        queue = self.records.get(url)
+        if not queue:
+            return build_response(url, 304, {}, "")
+        record = queue.popleft()
+        if self.started_at is None:
+            self.started_at = self.clock()
+        if self.speed:
+            due_at = self.started_at + (record['t'] - self.first_recorded_at) / self.speed
+            wait = due_at - self.clock()
+            if wait > 0:
+                self.sleep(wait)
+        self.replayed += 1
+        return build_response(url, record['status'], record['headers'], record['body'])
+
+    def post(self, url, data=None, timeout=None):
+        # an expired session in the recording makes BetSite log in again
+        self.logins += 1
+        queue = self.records.get(url)
+        if queue:
+            record = queue.popleft()
+            self.replayed += 1
+            return build_response(url, record['status'], record['headers'], record['body'])
+        return build_response(url, 200, {'Content-Type': 'text/html'}, "Logged in")
+
+    def finished(self):
+        return not any(self.records.values())
+
+    def close(self):
+        pass
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 4)
+
+
+class Replayer:
+    def __init__(self, log_path, config, speed=1.0, stub_response_delay=0):
+        self.log_path = log_path
+        self.config = config
+        self.speed = speed
+        self.stub_response_delay = stub_response_delay
+
+    async def run(self):
+        records = list(read_response_log(self.log_path))
+        stub = TelegramStub(response_delay=self.stub_response_delay).start()
+        with tempfile.TemporaryDirectory() as directory:
+            try:
+                return await self.replay(records, stub, directory)
+            finally:
+                stub.stop()
+
+    async def replay(self, records, stub, directory):
+        config = dict(self.config)
+        config.pop('record_responses_path', None)
+        config.update({
+            'bot_token': config.get('bot_token', 'replay'),
+            'telegram_api_url': stub.url,
+            # the replay must never take from the counters the bot shares with the real scraper
+            'clean_counter_path': os.path.join(directory, 'shared_counters.sqlite3'),
+        })
+
+        scraper = Scraper()
+        sources, routes = scraper.get_routing_table(config)
+        session = ReplaySession(records, self.speed)
+        for source in sources.values():
+            scraper.get_bet_site(source.name, config).session = session
+        for route in routes:
+            if route.counter is not None:
+                scraper.get_shared_counter(route.counter, config).set(10 ** 9)
+
+        started = time.monotonic()
+        cycles = 0
+        sends = []
+        while not session.finished():
+            cycle_started = time.monotonic()
+            message_queues = await scraper.get_and_parse_data(config)
+            sends.append(asyncio.create_task(scraper.send_and_record_latency(message_queues, config, cycle_started)))
+            cycles += 1
+        latencies = [latency for latency in await asyncio.gather(*sends) if latency is not None]
+
+        # delayed routes still hold messages after the last cycle
+        while scraper.delay_scheduler is not None and len(scraper.delay_scheduler):
+            await asyncio.sleep(0.05)
+        if scraper.telegram_dispatcher is not None:
+            await scraper.telegram_dispatcher.join()
+        elapsed = time.monotonic() - started
+        for shared_counter in scraper.shared_counters.values():
+            shared_counter.close()
+
+        dispatcher_stats = scraper.telegram_dispatcher.stats() if scraper.telegram_dispatcher is not None else {}
+        return {
+            "records": session.replayed,
+            "logins": session.logins,
+            "cycles": cycles,
+            "speed": self.speed,
+            "elapsed_seconds": round(elapsed, 4),
+            "cycles_per_second": round(cycles / elapsed, 2) if elapsed else None,
+            "new_bets": {route: count for (route,), count in scraper.new_bets.values.items()},
+            "messages_received_by_stub": len(stub.messages),
+            "edits_received_by_stub": len(stub.edits),
+            "messages_by_chat": stub.message_counts(),
+            "telegram": dispatcher_stats,
+            "poll_to_send_seconds": {
+                "p50": percentile(latencies, 0.5),
+                "p95": percentile(latencies, 0.95),
+                "max": round(max(latencies), 4) if latencies else None,
+            },
+        }
+
+
+def replay(log_path, config, speed=1.0, stub_response_delay=0):
+    return asyncio.run(Replayer(log_path, config, speed, stub_response_delay).run())
+
@@ -0,0 +1,127 @@
+import asyncio
+import json
+import platform
+import time
+import tracemalloc
+
+from integrations.benchmarks.payload_generator import PayloadGenerator
+from integrations.client.bet_site import BetSite
+from integrations.helpers.hash_calculator import compute_bet_model_hash
+from integrations.helpers.markdown import escape
+from integrations.helpers.routing import DEFAULT_SOURCE
+from integrations.print_model import PrintModel
+from integrations.scraper import Scraper
+
+# This file benchmarks the scraper hot path on generated unified dashboard payloads
+# run it with `python manage.py run_benchmarks` or `python -m integrations.benchmarks.scraper_benchmark`
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_CHURN = 0.01
+SCRAPER_CONFIG = {"get_data2_api_url": "https://dashboard.example.com/api/unified",
+                  "chat_sing_id": 1, "chat_bet365_id": 2, "chat_bet365_clean_id": 3}
+
+
+class SnapshotSite(BetSite):
+    """Stands in for BetSite and answers every fetch with the next generated snapshot."""
+
+    def __init__(self, payloads):
+        super().__init__(DEFAULT_SOURCE)
+        self.payloads = list(payloads)
+
+    async def fetch_bets_data(self, url):
+        payload = self.payloads.pop(0)
+        self.response_sizes[url] = len(payload['data'])
+        return payload
+
+
+def render_markdown(bet):
+    return PrintModel(bet['dashboard_name'], bet['hours_to_start'], bet['league'], bet['home_team'],
+                      bet['away_team'], bet['bet_type'], bet['mod'], bet['price'], bet['bet_class'],
+                      bet['placed_count'], "2.0").get_markdown()
+
+
+def prepare_hash(generator):
+    bets = generator.bets
+    return lambda: [compute_bet_model_hash(bet) for bet in bets], len(bets)
+
+
+def prepare_get_new_bets(generator):
+    scraper = Scraper()
+    scraper.get_new_bets("sing_bets", generator.bets)
+    snapshot = generator.next_snapshot()
+    return lambda: scraper.get_new_bets("sing_bets", snapshot), len(snapshot)
+
+
+def prepare_get_new_bets_based_on_uuid(generator):
+    scraper = Scraper()
+    scraper.get_new_bets_based_on_uuid("bet365_clean", generator.bets)
+    snapshot = generator.next_snapshot()
+    return lambda: scraper.get_new_bets_based_on_uuid("bet365_clean", snapshot), len(snapshot)
+
+
+def prepare_get_markdown(generator):
+    bets = generator.bets
+    return lambda: [render_markdown(bet) for bet in bets], len(bets)
+
+
+def prepare_escape(generator):
+    texts = [text for bet in generator.bets for text in (bet['league'], bet['home_team'], bet['away_team'])]
+    return lambda: [escape(text) for text in texts], len(texts)
+
+
+def prepare_cycle(generator, columnar=False):
+    scraper = Scraper()
+    config = dict(SCRAPER_CONFIG, columnar_batches=columnar)
+    baseline = generator.payload()
+    snapshot = generator.payload(generator.next_snapshot())
+    scraper.bet_sites[DEFAULT_SOURCE] = SnapshotSite([baseline, snapshot])
+    # the first poll only fills the dedup maps, the measured one is the poll after it
+    asyncio.run(scraper.get_and_parse_data(config))
+    return lambda: asyncio.run(scraper.get_and_parse_data(config)), len(generator.bets)
+
+
+BENCHMARKS = {
+    "compute_bet_model_hash": prepare_hash,
+    "get_new_bets": prepare_get_new_bets,
+    "get_new_bets_based_on_uuid": prepare_get_new_bets_based_on_uuid,
+    "print_model_get_markdown": prepare_get_markdown,
+    "escape": prepare_escape,
+    "get_and_parse_data": prepare_cycle,
+    "get_and_parse_data_columnar": lambda generator: prepare_cycle(generator, columnar=True),
+}
+
+
+def measure(prepare, count, churn, seed, trace_memory):
+    # every measurement gets a fresh generator and scraper, so one benchmark's dedup state can't help the next
+    function, items = prepare(PayloadGenerator(count, churn, seed))
+    started = time.perf_counter()
+    function()
+    seconds = time.perf_counter() - started
+    result = {"items": items, "seconds": round(seconds, 4), "items_per_second": round(items / seconds)}
+
+    if trace_memory:
+        # tracemalloc slows everything down, so the peak is taken from a separate run
+        function, _ = prepare(PayloadGenerator(count, churn, seed))
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        result["peak_memory_bytes"] = peak
+    return result
+
+
+def run(sizes=None, churn=DEFAULT_CHURN, seed=42, names=None, trace_memory=True):
+    results = {}
+    for count in sizes or DEFAULT_SIZES:
+        results[str(count)] = {name: measure(prepare, count, churn, seed, trace_memory)
+                               for name, prepare in BENCHMARKS.items() if names is None or name in names}
+    return {
+        "python": platform.python_version(),
+        "churn": churn,
+        "seed": seed,
+        "results": results,
+    }
+
+
+if __name__ == '__main__':
+    print(json.dumps(run(), indent=2))
@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class TelegramStub:
+    """Local stand-in for the Bot API that accepts sendMessage and editMessageText and remembers what it got.
+
+    Point TelegramApi at `url` (the telegram_api_url config key) to send to it instead of telegram.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, response_delay=0):
+        self.response_delay = response_delay
+        self.messages = []
+        self.edits = []
+        self.lock = threading.Lock()
+        stub = self
+
+        class StubHandler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length', 0))
+                fields = {key: values[0] for key, values in parse_qs(self.rfile.read(length).decode()).items()}
+                if not self.path.endswith(('/sendMessage', '/editMessageText')):
+                    self.respond(404, {"ok": False, "error_code": 404, "description": "Not Found"})
+                    return
+                if stub.response_delay:
+                    time.sleep(stub.response_delay)
+                if self.path.endswith('/editMessageText'):
+                    self.edit(fields)
+                    return
+                with stub.lock:
+                    stub.messages.append((fields.get('chat_id'), fields.get('text'), time.monotonic()))
+                    message_id = len(stub.messages)
+                self.respond(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": fields.get('chat_id')},
+                                                          "text": fields.get('text')}})
+
+            def edit(self, fields):
+                message_id = int(fields.get('message_id', 0))
+                with stub.lock:
+                    found = 0 < message_id <= len(stub.messages)
+                    if found:
+                        stub.edits.append((fields.get('chat_id'), message_id, fields.get('text'), time.monotonic()))
+                if not found:
+                    self.respond(400, {"ok": False, "error_code": 400,
+                                       "description": "Bad Request: message to edit not found"})
+                    return
+                self.respond(200, {"ok": True, "result": {"message_id": message_id, "chat": {"id": fields.get('chat_id')},
+                                                          "text": fields.get('text')}})
+
+            def respond(self, status, body):
+                encoded = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded)))
+                self.end_headers()
+                self.wfile.write(encoded)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), StubHandler)
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, name="telegram-stub", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def message_counts(self):
+        counts = {}
+        with self.lock:
+            for chat_id, _, _ in self.messages:
+                counts[chat_id] = counts.get(chat_id, 0) + 1
+        return counts
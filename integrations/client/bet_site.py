@@ -1,20 +1,67 @@
+import asyncio
+import hashlib
 import logging
+import random
 import time
+from urllib.parse import urlsplit
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.request import ACCEPT_ENCODING
+
+from integrations.helpers.circuit_breaker import CLOSED, CircuitBreaker
 
 loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(level=logging.INFO, format=loggingFormat)
 logging.getLogger('telethon').setLevel(level=logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# returned by get_bets_data when the dashboard payload is the same as on the previous poll
+NOT_MODIFIED = object()
+# returned by fetch_bets_data without a request while the circuit breaker of the dashboard is open
+CIRCUIT_OPEN = object()
+# status codes the dashboards answer an api call with when the session is gone
+SESSION_EXPIRED_STATUS_CODES = (401, 403)
+# a session is never refreshed sooner than this after a login, even when its cookie says so
+MIN_REFRESH_INTERVAL = 30
+# bodies are read and decompressed in chunks of this size
+READ_CHUNK_SIZE = 64 * 1024
+
 
 class BetSite:
-    def __init__(self):
+    def __init__(self, name="bet site", connect_timeout=5, read_timeout=30, pool_size=4):
+        self.name = name
         self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # gzip and deflate always, br and zstd when the optional brotli / zstandard packages are installed
+        self.session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        self.timeout = (connect_timeout, read_timeout)
         self.last_used_username = None
         self.last_used_password = None
         self.last_login_url = None
+        # per url ETag / Last-Modified validators and digest of the last body, to detect unchanged payloads
+        self.validators = {}
+        self.body_digests = {}
+        # size of the last response body per url, decompressed and as transferred, picked up by the scraper metrics
+        self.response_sizes = {}
+        self.transfer_sizes = {}
+        # a ResponseRecorder that keeps every raw response for replaying it later, see helpers/response_log.py
+        self.recorder = None
+        # fetch_bets_data retries with jittered exponential backoff, the breaker stops it once the dashboard is down
+        self.max_retries = 3
+        self.retry_delay = 1
+        self.max_retry_delay = 10
+        self.retry_counts = {}
+        self.breaker = CircuitBreaker(name)
+        # the session is logged in again this many seconds before its cookie expires, see refresh_session.
+        # session_lifetime is used for dashboards whose session cookie has no expiry
+        self.session_refresh_margin = 60
+        self.session_lifetime = None
+        self.refresh_at = None
+        # requests.Session is not thread safe, a refresh must not log in while a fetch thread uses the session
+        self.session_lock = asyncio.Lock()
         logger.info("BetSite init")
 
     def login(self, username, password, url):
@@ -27,55 +74,175 @@ class BetSite:
             'password': password
         }
 
-        response = self.session.post(url, data=payload)
+        response = self.session.post(url, data=payload, timeout=self.timeout)
 
         if response.status_code == 200:
             if "Username" in response.text:
                 logger.error("Login failed, received the login page as a response.")
                 return False
+            self.schedule_refresh()
             return True
         return False
 
+    def get_session_expiry(self):
+        # the earliest expiring cookie of the session, or the configured lifetime when no cookie says
+        expires = [cookie.expires for cookie in self.session.cookies if cookie.expires]
+        if expires:
+            return min(expires)
+        if self.session_lifetime:
+            return time.time() + self.session_lifetime
+        return None
+
+    def schedule_refresh(self):
+        expires_at = self.get_session_expiry()
+        if expires_at is None:
+            self.refresh_at = None
+            return
+        self.refresh_at = max(expires_at - self.session_refresh_margin, time.time() + MIN_REFRESH_INTERVAL)
+
+    def seconds_until_refresh(self):
+        if self.refresh_at is None:
+            return None
+        return self.refresh_at - time.time()
+
+    async def refresh_session(self):
+        """Logs in again before the session expires, so a poll doesn't have to do it on the way."""
+        logger.info(f"Refreshing the session of {self.name}")
+        try:
+            async with self.session_lock:
+                logged_in = await asyncio.to_thread(self.login, self.last_used_username, self.last_used_password,
+                                                    self.last_login_url)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Refreshing the session of {self.name} failed: {e}")
+            logged_in = False
+        if not logged_in:
+            # polls still log in again when they find the session expired, this only retries the refresh
+            self.refresh_at = time.time() + MIN_REFRESH_INTERVAL
+        return logged_in
+
     def get_bets_data(self, url):
-        MAX_RETRIES = 3
-        RETRY_DELAY = 5  # delay between retries, in seconds
+        """Fetches the dashboard once. Connection errors, timeouts and 5xx answers are raised, so the caller
+        can retry them, see fetch_bets_data."""
+        response = self.session.get(url, headers=self.conditional_headers(url), timeout=self.timeout, stream=True)
 
-        # logger.info(f"BetSite get_bets_data from url {url}")
+        if self.is_session_expired(response):
+            response.close()
+            logger.warning("Session expired. Trying to re-login.")
+            if self.login(self.last_used_username, self.last_used_password, self.last_login_url):
+                logger.info("Re-login successful. Retrying the request.")
+                response = self.session.get(url, headers=self.conditional_headers(url), timeout=self.timeout,
+                                            stream=True)
+            else:
+                logger.error("Re-login failed.")
+                return None
+        digest = self.read_body(url, response)
 
-        for attempt in range(MAX_RETRIES):
+        # Log the full response for debugging, lazily so the body is not decoded when debug is off
+        logger.debug("Response status: %s", response.status_code)
+        logger.debug("Response headers: %s", response.headers)
+
+        if self.recorder is not None:
+            self.recorder.record(url, response)
+        if response.status_code == 304:
+            return NOT_MODIFIED
+
+        if response.status_code >= 500:
+            raise requests.exceptions.HTTPError(f"{response.status_code} from {url}", response=response)
+
+        if response.status_code == 200:
+            # dashboards without ETag support still send the same bytes when nothing changed,
+            # so a digest of the raw body lets us skip json decoding and the rest of the cycle
+            if self.body_digests.get(url) == digest:
+                return NOT_MODIFIED
             try:
-                response = self.session.get(url)
-
-                if self.is_session_expired(response):
-                    logger.warning("Session expired. Trying to re-login.")
-                    if self.login(self.last_used_username, self.last_used_password, self.last_login_url):
-                        logger.info("Re-login successful. Retrying the request.")
-                        response = self.session.get(url)
-                    else:
-                        logger.error("Re-login failed.")
-                        return None
-
-                # Log the full response for debugging
-                logger.debug(f"Response status: {response.status_code}")
-                logger.debug(f"Response headers: {response.headers}")
-                logger.debug(f"Response content: {response.text}")
-
-                if response.status_code == 200:
-                    try:
-                        return response.json()
-                    except requests.exceptions.JSONDecodeError:
-                        logger.error(f"Failed to decode JSON from response. Content: {response.text}")
-                        return None
-
-            except requests.exceptions.ConnectionError:
-                if attempt < MAX_RETRIES - 1:  # No need to sleep on the last attempt
-                    logger.warning(f"Connection error. Retrying in {RETRY_DELAY} seconds...")
-                    time.sleep(RETRY_DELAY)
-                else:
-                    logger.error("Max retries reached. Could not get data.")
+                data = response.json()
+            except requests.exceptions.JSONDecodeError:
+                logger.error(f"Failed to decode JSON from response. Content: {response.text}")
+                return None
+            self.remember_payload(url, response, digest)
+            return data
+        logger.error(f"Unexpected status {response.status_code} from {url}")
+        return None
+
+    def read_body(self, url, response):
+        """Reads a streamed body chunk by chunk and returns its digest.
+
+        Every chunk is decompressed as it arrives and hashed right away, so the digest needs no second pass over
+        the body. The decompressed body is still kept whole, the parser needs it: response.content, text and
+        json() work as usual afterwards.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        chunks = []
+        for chunk in response.iter_content(READ_CHUNK_SIZE):
+            digest.update(chunk)
+            chunks.append(chunk)
+        body = b"".join(chunks)
+        response._content = body
+        self.response_sizes[url] = len(body)
+        # urllib3 counts the bytes it read from the socket, before decompression
+        self.transfer_sizes[url] = response.raw.tell() if hasattr(response.raw, 'tell') else len(body)
+        return digest.digest()
+
+    def conditional_headers(self, url):
+        headers = {}
+        validators = self.validators.get(url, {})
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+        return headers
+
+    def remember_payload(self, url, response, digest):
+        self.validators[url] = {
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified')
+        }
+        self.body_digests[url] = digest
+
+    async def fetch_bets_data(self, url):
+        if not self.breaker.allow_request():
+            return CIRCUIT_OPEN
+        # a probe of a half open circuit gets one attempt, it only has to tell if the dashboard is back
+        # max_retries counts the attempts, fetch_retries: 0 in creds.yml still makes one
+        attempts = max(1, self.max_retries) if self.breaker.state == CLOSED else 1
+        for attempt in range(attempts):
+            try:
+                # requests is blocking, so the fetch runs in a worker thread and the event loop stays free
+                async with self.session_lock:
+                    data = await asyncio.to_thread(self.get_bets_data, url)
+            except requests.exceptions.RequestException as e:
+                if attempt == attempts - 1:
+                    logger.error(f"Could not get data from {self.name} after {attempts} attempts: {e}")
+                    self.breaker.record_failure()
                     return None
+                delay = self.get_retry_delay(attempt)
+                self.retry_counts[url] = self.retry_counts.get(url, 0) + 1
+                logger.warning(f"Fetching {self.name} failed ({e}), retrying in {delay:.1f}s")
+                # sleeping in the loop instead of the worker thread, sends and other sources go on meanwhile
+                await asyncio.sleep(delay)
+                continue
+            # None is a dashboard that answers but is of no use (failed re-login, broken json, 4xx),
+            # it counts against the circuit like a dashboard that doesn't answer at all
+            if data is None:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+            return data
+
+    def get_retry_delay(self, attempt):
+        # full jitter, so the workers of several scrapers don't retry a recovering dashboard at the same moment
+        return random.uniform(0, min(self.max_retry_delay, self.retry_delay * 2 ** attempt))
 
     def is_session_expired(self, response):
-        # Assuming session expiration is detected by the presence of "Username" in response text
-        # Adjust this method based on your exact criteria
-        return "Username" in response.text
+        # decided from the status, headers and redirects only, the body of a big payload is never scanned.
+        # the api answers json, an expired session gets the html login page instead (or a redirect to it)
+        if response.status_code in SESSION_EXPIRED_STATUS_CODES:
+            return True
+        if response.status_code != 200:
+            return False
+        if response.headers.get('Content-Type', '').startswith('text/html'):
+            return True
+        return bool(response.history) and self.is_login_url(response.url)
+
+    def is_login_url(self, url):
+        return self.last_login_url is not None and urlsplit(url).path == urlsplit(self.last_login_url).path
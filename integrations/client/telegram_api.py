@@ -0,0 +1,62 @@
+import asyncio
+import logging
+
+import requests
+from requests.adapters import HTTPAdapter
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+TELEGRAM_API_URL = "https://api.telegram.org"
+
+
+class TelegramApi:
+    def __init__(self, bot_token, connect_timeout=5, read_timeout=15, pool_size=10, api_url=TELEGRAM_API_URL):
+        self.bot_token = bot_token
+        self.api_url = api_url
+        self.timeout = (connect_timeout, read_timeout)
+        # one pooled keep-alive session for all bot api calls, instead of a new connection per message
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def method_url(self, method):
+        return f"{self.api_url}/bot{self.bot_token}/{method}"
+
+    def send_message_sync(self, chat_id, text, parse_mode='MarkdownV2'):
+        payload = {
+            'chat_id': chat_id,
+            'text': text,
+            'parse_mode': parse_mode
+        }
+        try:
+            return self.session.post(self.method_url("sendMessage"), data=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to send message to {chat_id}: {e}")
+            return None
+
+    async def send_message(self, chat_id, text, parse_mode='MarkdownV2'):
+        # requests is blocking, so the call runs in a worker thread and the event loop stays free
+        return await asyncio.to_thread(self.send_message_sync, chat_id, text, parse_mode)
+
+    def edit_message_text_sync(self, chat_id, message_id, text, parse_mode='MarkdownV2'):
+        payload = {
+            'chat_id': chat_id,
+            'message_id': message_id,
+            'text': text,
+            'parse_mode': parse_mode
+        }
+        try:
+            return self.session.post(self.method_url("editMessageText"), data=payload, timeout=self.timeout)
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Failed to edit message {message_id} in {chat_id}: {e}")
+            return None
+
+    async def edit_message_text(self, chat_id, message_id, text, parse_mode='MarkdownV2'):
+        return await asyncio.to_thread(self.edit_message_text_sync, chat_id, message_id, text, parse_mode)
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,204 @@
+import asyncio
+import logging
+import time
+
+from integrations.helpers.metrics import MetricsRegistry
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def reserve(self):
+        """Take a token and return how long to wait before it may be used."""
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    async def acquire(self):
+        delay = self.reserve()
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        # used when telegram answers 429, nothing goes out of this bucket until retry_after has passed
+        now = self.clock()
+        self.tokens = min(self.tokens + (now - self.updated) * self.rate, 1 - seconds * self.rate)
+        self.updated = now
+
+
+class TelegramDispatcher:
+    """Sends messages through one queue per chat, limited per chat and globally like the Bot API is.
+
+    Chats are served in parallel, messages to the same chat keep their order.
+    """
+
+    def __init__(self, telegram_api, chat_rate=1.0, chat_burst=3, global_rate=30.0, global_burst=30, max_retries=5,
+                 max_rate_limited_retries=20, metrics=None, bucket_factory=None):
+        self.telegram_api = telegram_api
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        # called with (name, rate, capacity), lets several processes share one budget, see SharedTokenBucket
+        self.bucket_factory = bucket_factory or (lambda name, rate, capacity: TokenBucket(rate, capacity))
+        self.global_bucket = self.bucket_factory("global", global_rate, global_burst)
+        self.max_retries = max_retries
+        # 429s wait for telegram's retry_after, they get their own, larger limit
+        self.max_rate_limited_retries = max_rate_limited_retries
+        self.loop = None
+        self.queues = {}
+        self.buckets = {}
+        self.workers = {}
+        self.sent_count = 0
+        self.failed_count = 0
+        self.rate_limited_count = 0
+        self.last_send_latency = None
+        self.max_send_latency = 0
+        self.metrics = metrics if metrics is not None else MetricsRegistry()
+        self.send_seconds = self.metrics.histogram(
+            'telegram_send_seconds', 'Time from queueing a message until telegram answered',
+            buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0))
+        self.messages_total = self.metrics.counter(
+            'telegram_messages_total', 'Messages handed to the dispatcher by result', ['result'])
+        self.rate_limited_total = self.metrics.counter(
+            'telegram_rate_limited_total', 'Answers with status 429 from telegram')
+        self.errors_total = self.metrics.counter(
+            'telegram_errors_total', 'Failed sendMessage calls by status code, "network" for timeouts', ['status'])
+        self.metrics.gauge('telegram_queue_depth', 'Messages waiting in the dispatcher').set_function(self.queue_depth)
+
+    def enqueue(self, chat_id, text, parse_mode='MarkdownV2', edit_message_id=None):
+        """Queue a message and return a future with the telegram response (None when it could not be sent).
+
+        With `edit_message_id` the text replaces the one of that message instead of being sent as a new one.
+        """
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop:
+            # queues and workers belong to the loop they were created in
+            self.loop = loop
+            self.queues = {}
+            self.workers = {}
+        if chat_id not in self.queues:
+            self.queues[chat_id] = asyncio.Queue()
+            if chat_id not in self.buckets:
+                self.buckets[chat_id] = self.bucket_factory(f"chat:{chat_id}", self.chat_rate, self.chat_burst)
+            self.workers[chat_id] = loop.create_task(self.chat_worker(chat_id))
+
+        future = loop.create_future()
+        self.queues[chat_id].put_nowait((text, parse_mode, edit_message_id, time.monotonic(), future))
+        return future
+
+    async def send(self, chat_id, text, parse_mode='MarkdownV2'):
+        return await self.enqueue(chat_id, text, parse_mode)
+
+    def queue_depth(self):
+        return sum(queue.qsize() for queue in self.queues.values())
+
+    def stats(self):
+        return {
+            'queue_depth': self.queue_depth(),
+            'sent': self.sent_count,
+            'failed': self.failed_count,
+            'rate_limited': self.rate_limited_count,
+            'last_send_latency': self.last_send_latency,
+            'max_send_latency': self.max_send_latency,
+        }
+
+    async def chat_worker(self, chat_id):
+        queue = self.queues[chat_id]
+        while True:
+            text, parse_mode, edit_message_id, enqueued_at, future = await queue.get()
+            try:
+                response = await self.deliver(chat_id, text, parse_mode, edit_message_id)
+                latency = time.monotonic() - enqueued_at
+                self.last_send_latency = latency
+                self.max_send_latency = max(self.max_send_latency, latency)
+                self.send_seconds.observe(latency)
+                if not future.done():
+                    future.set_result(response)
+            except Exception as e:
+                logger.exception(f"Dispatcher failed to send message to {chat_id}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                queue.task_done()
+
+    async def deliver(self, chat_id, text, parse_mode, edit_message_id=None):
+        bucket = self.buckets[chat_id]
+        # 429s are not counted as failed attempts, they are limited by max_rate_limited_retries instead
+        attempt = 0
+        rate_limited = 0
+        while attempt < self.max_retries and rate_limited < self.max_rate_limited_retries:
+            await bucket.acquire()
+            await self.global_bucket.acquire()
+            if edit_message_id is not None:
+                response = await self.telegram_api.edit_message_text(chat_id, edit_message_id, text, parse_mode)
+            else:
+                response = await self.telegram_api.send_message(chat_id, text, parse_mode)
+
+            if response is None:
+                # network error or timeout, back off a little and try again
+                self.errors_total.inc(status="network")
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+                continue
+
+            if response.status_code == 429:
+                retry_after = self.get_retry_after(response)
+                rate_limited += 1
+                self.rate_limited_count += 1
+                self.rate_limited_total.inc()
+                logger.warning(f"Rate limited by telegram for chat {chat_id}, retrying after {retry_after}s")
+                # telegram doesn't say which limit was hit, so nothing else goes out until retry_after either
+                bucket.pause(retry_after)
+                self.global_bucket.pause(retry_after)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES:
+                self.errors_total.inc(status=response.status_code)
+                await asyncio.sleep(2 ** attempt)
+                attempt += 1
+                continue
+
+            if response.status_code == 200 or (edit_message_id is not None and self.is_not_modified(response)):
+                # an edit to the text the message already has is rejected, but there is nothing left to do
+                self.sent_count += 1
+                self.messages_total.inc(result="sent" if edit_message_id is None else "edited")
+            else:
+                self.failed_count += 1
+                self.messages_total.inc(result="failed")
+                self.errors_total.inc(status=response.status_code)
+                logger.error(f"Telegram rejected message to {chat_id}: {response.status_code} {response.text}")
+            return response
+
+        self.failed_count += 1
+        self.messages_total.inc(result="failed")
+        logger.error(f"Giving up on message to {chat_id} after {attempt} failed attempts and "
+                     f"{rate_limited} rate limited ones")
+        return None
+
+    def get_retry_after(self, response):
+        try:
+            return response.json()['parameters']['retry_after']
+        except (ValueError, KeyError, TypeError):
+            return 1
+
+    def is_not_modified(self, response):
+        return response.status_code == 400 and 'message is not modified' in response.text
+
+    async def join(self):
+        for queue in list(self.queues.values()):
+            await queue.join()
@@ -0,0 +1,131 @@
+KNOWN_BET_CLASSES = ['ah', 'asian_handicap', 'asian', 'ou', 'overunder', 'overunder_corners', 'corners_ou',
+                     'asian_corners', '1x2', 'ml']
+KNOWN_BET_TYPES = ['1', '2', 'o', 'u', 'x', 'd', 'l', 'corners_1', 'corners_2', 'corners_o', 'corners_u']
+
+HOME, AWAY, DRAW = "home", "away", "draw"
+
+
+class BetRule:
+    """How a bet with one bet_class and bet_type is displayed, see compile_rule."""
+
+    __slots__ = ('negate_mod', 'format_integer_mod', 'fixed_mod', 'display_team', 'bet_type', 'changed',
+                 'changed_if_integer_mod', 'show_bet_type', 'plus_sign', 'mod_suffix')
+
+    def __init__(self, negate_mod=False, format_integer_mod=False, fixed_mod=None, display_team=HOME, bet_type=None,
+                 changed=False, changed_if_integer_mod=False, show_bet_type=False, plus_sign=True, mod_suffix=" "):
+        self.negate_mod = negate_mod
+        # whole number mods are shown without the trailing .0
+        self.format_integer_mod = format_integer_mod
+        self.fixed_mod = fixed_mod
+        self.display_team = display_team
+        # replaces the bet type, e.g. "Over" for o
+        self.bet_type = bet_type
+        # a bet that is not changed by any rule gets the error page name
+        self.changed = changed
+        self.changed_if_integer_mod = changed_if_integer_mod
+        self.show_bet_type = show_bet_type
+        self.plus_sign = plus_sign
+        # None hides the mod completely, e.g. for a draw
+        self.mod_suffix = mod_suffix
+
+    def apply_mod(self, mod):
+        """Returns the displayed mod and whether the mod changed the bet."""
+        new_mod = mod
+        changed = self.changed
+        if self.negate_mod:
+            new_mod = mod * -1
+        if self.format_integer_mod and mod.is_integer():
+            new_mod = format(int(mod), "d")
+            changed = changed or self.changed_if_integer_mod
+        if self.fixed_mod is not None:
+            new_mod = self.fixed_mod
+        return new_mod, changed
+
+
+def normalize(bet_class, bet_type):
+    return str.lower(bet_class).strip(), str.lower(str(bet_type)).strip()
+
+
+def compile_rule(bet_class, bet_type):
+    """Builds the rule for a normalized bet_class and bet_type.
+
+    bet_class is matched by substring, the same way the dashboards have always been read, so that e.g. "corners_ou"
+    is an over/under bet as well.
+    """
+    is_over_under = "ou" in bet_class or "overunder" in bet_class
+    is_asian_corners = "asian_corners" in bet_class
+    is_moneyline = "1x2" in bet_class or "ml" in bet_class
+    is_asian = "asian" in bet_class or "ah" in bet_class
+
+    rule = BetRule()
+    if bet_class == "ah" or bet_class == "asian_handicap" or "asian" in bet_class:
+        rule.changed = True
+
+    if bet_type == "2" and not is_moneyline and not is_asian:
+        rule.negate_mod = True
+        rule.changed = True
+
+    # ml bets are not excluded here, an ml bet on 2 is on the away team too
+    if bet_type == "2" and "1x2" not in bet_class:
+        rule.display_team = AWAY
+        rule.changed = True
+
+    if is_over_under:
+        rule.format_integer_mod = True
+        rule.changed_if_integer_mod = True
+        rule.show_bet_type = True
+        rule.plus_sign = False
+        if bet_type == "o" or bet_type == "corners_o":
+            rule.bet_type = "Over"
+            rule.changed = True
+        if bet_type == "u" or bet_type == "corners_u":
+            rule.bet_type = "Under"
+            rule.changed = True
+
+    if is_asian_corners:
+        rule.format_integer_mod = True
+        rule.changed_if_integer_mod = True
+        rule.plus_sign = False
+        if bet_type == "corners_2":
+            rule.display_team = AWAY
+
+    if is_moneyline:
+        rule.fixed_mod = -0.5
+        rule.changed = True
+        if bet_type == "l" or bet_type == "2":
+            rule.display_team = AWAY
+        if bet_type == "x" or bet_type == "d":
+            rule.fixed_mod = 0
+            rule.display_team = DRAW
+
+    if "1x2" in bet_class and (bet_type == "x" or bet_type == "d"):
+        rule.mod_suffix = None
+    elif is_asian_corners and bet_type == "corners_2":
+        rule.mod_suffix = " Corner Handicap "
+    elif is_asian_corners and bet_type == "corners_1":
+        rule.mod_suffix = " Corners "
+    elif "corners_ou" in bet_class or "overunder_corners" in bet_class:
+        rule.mod_suffix = " Corners "
+    return rule
+
+
+# every known bet_class and bet_type is compiled up front, anything else the first time it shows up
+RULES = {(bet_class, bet_type): compile_rule(bet_class, bet_type)
+         for bet_class in KNOWN_BET_CLASSES for bet_type in KNOWN_BET_TYPES}
+# the same rules keyed by the values as they come from the dashboard, so most bets skip normalizing.
+# the type is part of the key because 2 and 2.0 are equal dict keys but are displayed differently
+RAW_RULES = {}
+
+
+def get_rule(bet_class, bet_type):
+    raw_key = (bet_class, bet_type, type(bet_type))
+    try:
+        return RAW_RULES[raw_key]
+    except KeyError:
+        pass
+    key = normalize(bet_class, bet_type)
+    rule = RULES.get(key)
+    if rule is None:
+        rule = RULES[key] = compile_rule(*key)
+    RAW_RULES[raw_key] = rule
+    return rule
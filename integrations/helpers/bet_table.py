@@ -0,0 +1,100 @@
+from integrations.helpers.hash_calculator import compute_bet_model_hash
+
+
+class BetTable:
+    """One poll snapshot kept column by column.
+
+    Partitioning, dedup and the placed bet lookup work on whole columns at once with dict and set operations
+    instead of one method call per bet, and the digests are computed once per snapshot no matter how many
+    routes the bets end up in. The original bet dicts are kept in `rows` for rendering.
+    """
+
+    def __init__(self, rows, uuids=None, dashboard_names=None, placed_counts=None, digests=None):
+        self.rows = rows
+        self.uuids = uuids if uuids is not None else [row['uuid'] for row in rows]
+        self.dashboard_names = dashboard_names if dashboard_names is not None else \
+            [row.get('dashboard_name', '').lower() for row in rows]
+        self.placed_counts = placed_counts if placed_counts is not None else [row['placed_count'] for row in rows]
+        self.digests_column = digests
+
+    def __len__(self):
+        return len(self.rows)
+
+    @property
+    def digests(self):
+        if self.digests_column is None:
+            self.digests_column = [compute_bet_model_hash(row) for row in self.rows]
+        elif None in self.digests_column:
+            # partition() only computes the digests the hash routes need
+            self.digests_column = [compute_bet_model_hash(row) if digest is None else digest
+                                   for digest, row in zip(self.digests_column, self.rows)]
+        return self.digests_column
+
+    def select(self, indices):
+        digests = self.digests_column
+        return BetTable(
+            [self.rows[i] for i in indices],
+            [self.uuids[i] for i in indices],
+            [self.dashboard_names[i] for i in indices],
+            [self.placed_counts[i] for i in indices],
+            [digests[i] for i in indices] if digests is not None else None
+        )
+
+    def partition(self, routes):
+        """Splits the table into one table per route, the rows keep their order."""
+        by_dashboard = {}
+        for index, dashboard_name in enumerate(self.dashboard_names):
+            by_dashboard.setdefault(dashboard_name, []).append(index)
+
+        route_indices = {}
+        for route in routes:
+            if route.dashboard_name is None:
+                indices = range(len(self.rows))
+            else:
+                indices = by_dashboard.get(route.dashboard_name, [])
+            if route.bet_filter:
+                indices = [i for i in indices if route.matches(self.rows[i], self.dashboard_names[i])]
+            route_indices[route.name] = indices
+
+        # rows that more than one hash route looks at get their digest computed once, here
+        if self.digests_column is None:
+            digests = [None] * len(self.rows)
+            for route in routes:
+                if route.dedup != "hash":
+                    continue
+                for i in route_indices[route.name]:
+                    if digests[i] is None:
+                        digests[i] = compute_bet_model_hash(self.rows[i])
+            self.digests_column = digests
+
+        return {name: self.select(indices) for name, indices in route_indices.items()}
+
+    def min_hours_to_start(self):
+        # games that already started don't call for kickoff polling, see Scraper.poll_source
+        hours = [row['hours_to_start'] for row in self.rows
+                 if row.get('hours_to_start') is not None and row['hours_to_start'] >= 0]
+        return min(hours) if hours else None
+
+    def new_rows_by_digest(self, old_digests):
+        """Returns {digest: row} of the whole table and the rows whose digest is not in `old_digests`."""
+        rows_by_digest = dict(zip(self.digests, self.rows))
+        new_digests = rows_by_digest.keys() - old_digests
+        # the set difference loses the order, so the rows are picked in the order of the snapshot
+        new_rows = [row for digest, row in rows_by_digest.items() if digest in new_digests] if new_digests else []
+        return rows_by_digest, new_rows
+
+    def unseen_rows_by_uuid(self, seen_uuids):
+        """Returns {uuid: row} of the uuids not in `seen_uuids`, the first row wins when a uuid repeats."""
+        rows = {}
+        for uuid, row in zip(self.uuids, self.rows):
+            if uuid not in rows and uuid not in seen_uuids:
+                rows[uuid] = row
+        return rows
+
+    def placed_rows(self, known_uuids):
+        """Returns the rows of placed bets whose uuid is not in `known_uuids` yet, one row per uuid."""
+        placed = {}
+        for uuid, placed_count, row in zip(self.uuids, self.placed_counts, self.rows):
+            if placed_count > 0 and uuid not in placed and uuid not in known_uuids:
+                placed[uuid] = row
+        return placed
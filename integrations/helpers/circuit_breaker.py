@@ -0,0 +1,68 @@
+import logging
+import time
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+# exported as the value of the scraper_circuit_state gauge
+STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitBreaker:
+    """Stops requests to a dashboard that keeps failing and lets a single probe through from time to time.
+
+    After `failure_threshold` failed fetches in a row the circuit opens and requests are refused for
+    `reset_timeout` seconds. Then one probe goes through (half open): if it works the circuit closes again,
+    if not it stays open and the time until the next probe doubles, up to `max_reset_timeout`.
+    """
+
+    def __init__(self, name, failure_threshold=3, reset_timeout=30, max_reset_timeout=300, clock=time.monotonic):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.min_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = reset_timeout
+        self.opened_at = None
+
+    def allow_request(self):
+        if self.state == OPEN and self.clock() - self.opened_at >= self.reset_timeout:
+            self.change_state(HALF_OPEN)
+        return self.state != OPEN
+
+    def record_success(self):
+        self.failures = 0
+        self.reset_timeout = self.min_reset_timeout
+        if self.state != CLOSED:
+            self.change_state(CLOSED)
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # the probe failed, wait longer before the next one
+            self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+            self.open()
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self.open()
+
+    def open(self):
+        self.opened_at = self.clock()
+        self.change_state(OPEN)
+
+    def change_state(self, state):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            logger.warning(f"Circuit for {self.name} is open after {self.failures} failed fetches ({previous} before), "
+                           f"next probe in {self.reset_timeout}s")
+        else:
+            logger.info(f"Circuit for {self.name} is {state} ({previous} before)")
+
+    def state_value(self):
+        return STATE_VALUES[self.state]
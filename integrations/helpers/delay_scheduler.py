@@ -0,0 +1,72 @@
+import asyncio
+import heapq
+import itertools
+import logging
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# items due within this many seconds of each other are released in the same batch
+RELEASE_TOLERANCE = 0.005
+
+
+class DelayScheduler:
+    """Releases items when their delay has passed, from its own asyncio task.
+
+    Items that become due at the same time are released together in one call of `release`.
+    """
+
+    def __init__(self, release):
+        self.release = release
+        self.heap = []
+        self.sequence = itertools.count()
+        self.loop = None
+        self.task = None
+        self.wakeup = None
+
+    def __len__(self):
+        return len(self.heap)
+
+    def schedule(self, item, delay):
+        loop = asyncio.get_running_loop()
+        if loop is not self.loop or self.task is None or self.task.done():
+            self.loop = loop
+            self.wakeup = asyncio.Event()
+            self.task = loop.create_task(self.run())
+        release_at = loop.time() + delay
+        # the sequence number keeps items with the same release time in the order they were scheduled
+        heapq.heappush(self.heap, (release_at, next(self.sequence), item))
+        if self.heap[0][2] is item:
+            self.wakeup.set()
+
+    async def run(self):
+        while True:
+            if not self.heap:
+                await self.wakeup.wait()
+                self.wakeup.clear()
+                continue
+
+            timeout = self.heap[0][0] - self.loop.time()
+            if timeout > 0:
+                try:
+                    # a newly scheduled item that is due earlier wakes us up before the timeout
+                    await asyncio.wait_for(self.wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                self.wakeup.clear()
+                continue
+
+            release_until = self.loop.time() + RELEASE_TOLERANCE
+            due_items = []
+            while self.heap and self.heap[0][0] <= release_until:
+                due_items.append(heapq.heappop(self.heap)[2])
+            try:
+                self.release(due_items)
+            except Exception:
+                logger.exception("Failed to release delayed items")
+
+    def stop(self):
+        if self.task is not None:
+            self.task.cancel()
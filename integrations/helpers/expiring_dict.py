@@ -0,0 +1,92 @@
+import heapq
+import time
+
+
+class ExpiringDict:
+    """Dict with a per entry expiry time and a hard cap on the number of entries.
+
+    Expiry times are kept in a heap, so removing the expired entries only looks at the ones that are due.
+    When the cap is reached the entries closest to their expiry are evicted first, the entry being added never is.
+    `on_evict` is called with the reason ("expired" or "capacity") and the number of evicted entries.
+    """
+
+    def __init__(self, max_size=100_000, default_ttl=24 * 60 * 60, clock=time.time, on_evict=None):
+        self.max_size = max_size
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self.entries = {}
+        self.expires_at = {}
+        self.expiry_heap = []
+        self.evicted_expired = 0
+        self.evicted_capacity = 0
+        self.on_evict = on_evict
+
+    def __contains__(self, key):
+        return key in self.entries
+
+    def __getitem__(self, key):
+        return self.entries[key]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    def __setitem__(self, key, value):
+        self.add(key, value)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, default=None):
+        return self.entries.get(key, default)
+
+    def items(self):
+        return self.entries.items()
+
+    def update_from(self, mapping, ttl=None):
+        for key, value in mapping.items():
+            self.add(key, value, ttl)
+
+    def add(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.default_ttl
+        expires_at = self.clock() + ttl
+        # make room before the key goes in, otherwise a key with the shortest ttl would evict itself right away
+        if key not in self.entries:
+            evicted = 0
+            while self.entries and len(self.entries) >= self.max_size:
+                self.pop_soonest()
+                evicted += 1
+            if evicted:
+                self.evicted_capacity += evicted
+                if self.on_evict is not None:
+                    self.on_evict("capacity", evicted)
+        self.entries[key] = value
+        self.expires_at[key] = expires_at
+        heapq.heappush(self.expiry_heap, (expires_at, key))
+
+        # re-added keys leave stale heap entries behind, rebuild the heap before it gets much bigger than the dict
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [(expires_at, key) for key, expires_at in self.expires_at.items()]
+            heapq.heapify(self.expiry_heap)
+
+    def expire(self):
+        now = self.clock()
+        evicted = 0
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expires_at, key = heapq.heappop(self.expiry_heap)
+            if self.expires_at.get(key) == expires_at:
+                del self.entries[key]
+                del self.expires_at[key]
+                evicted += 1
+        self.evicted_expired += evicted
+        if evicted and self.on_evict is not None:
+            self.on_evict("expired", evicted)
+        return evicted
+
+    def pop_soonest(self):
+        while self.expiry_heap:
+            expires_at, key = heapq.heappop(self.expiry_heap)
+            if self.expires_at.get(key) == expires_at:
+                del self.expires_at[key]
+                return key, self.entries.pop(key)
+        raise KeyError("pop_soonest(): dictionary is empty")
@@ -1,8 +1,19 @@
+from hashlib import blake2b
+
 selected_fields = ['pin_fix', 'league', 'home_team', 'away_team', 'bet_class', 'bet_type', 'mod', 'price']
 
 
-def compute_bet_model_hash(bet):
-    # Create a copy without the fields to discard
-    item_copy = {k: v for k, v in bet.items() if k in selected_fields}
-    return str(hash(frozenset(item_copy.items())))
+def as_float(value):
+    # the dashboard sends whole numbers as ints sometimes (1 == 1.0), they have to encode the same way
+    if value.__class__ is int:
+        return float(value)
+    return value
 
+
+def compute_bet_model_hash(bet):
+    # blake2b over the repr of the selected fields is stable across processes and restarts,
+    # unlike the builtin hash() which is salted per process
+    get = bet.get
+    encoded = repr((get('pin_fix'), get('league'), get('home_team'), get('away_team'), get('bet_class'),
+                    get('bet_type'), as_float(get('mod')), as_float(get('price'))))
+    return blake2b(encoded.encode(), digest_size=16).digest()
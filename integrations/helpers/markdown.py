@@ -0,0 +1,18 @@
+from functools import lru_cache
+
+# the characters Telegram's MarkdownV2 gives a special meaning, every one of them is sent with a backslash in front
+MARKDOWN_V2_SPECIAL_CHARS = '_*[]()~>#+-=|{}.!\\'
+
+ESCAPE_TABLE = str.maketrans({char: '\\' + char for char in MARKDOWN_V2_SPECIAL_CHARS})
+
+
+def escape(text):
+    """Escape the characters that have a special meaning in Telegram's MarkdownV2."""
+    # one str.translate pass with a precomputed table, instead of a regex substitution per call
+    if text.__class__ is not str:
+        text = str(text)
+    return text.translate(ESCAPE_TABLE)
+
+
+# leagues, team names and page names repeat all the time, so their escaped form is cached
+escape_field = lru_cache(maxsize=4096, typed=True)(escape)
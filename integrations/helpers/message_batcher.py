@@ -0,0 +1,30 @@
+TELEGRAM_MESSAGE_LIMIT = 4096
+MESSAGE_SEPARATOR = '\n'
+
+
+def pack_messages(blocks, limit=TELEGRAM_MESSAGE_LIMIT, separator=MESSAGE_SEPARATOR):
+    """Pack rendered bet blocks into as few messages as possible without splitting a block.
+
+    The limit is checked on the MarkdownV2 source, which is never shorter than the text telegram counts.
+    A block that is longer than the limit on its own is sent as its own message.
+    """
+    return [separator.join(group) for group in pack_message_groups(blocks, limit, separator)]
+
+
+def pack_message_groups(blocks, limit=TELEGRAM_MESSAGE_LIMIT, separator=MESSAGE_SEPARATOR):
+    """Same as pack_messages, but returns the blocks that go into each message instead of the joined text."""
+    groups = []
+    current = []
+    current_length = 0
+    for block in blocks:
+        added_length = len(block) + (len(separator) if current else 0)
+        if current and current_length + added_length > limit:
+            groups.append(current)
+            current = []
+            current_length = 0
+            added_length = len(block)
+        current.append(block)
+        current_length += added_length
+    if current:
+        groups.append(current)
+    return groups
@@ -0,0 +1,73 @@
+class TrackedMessage(str):
+    """A rendered message that remembers the uuid of its bet, it behaves like the plain text everywhere else."""
+
+    def __new__(cls, text, bet_uuid):
+        message = super().__new__(cls, text)
+        message.bet_uuid = bet_uuid
+        return message
+
+
+class MessageTracker:
+    """The telegram message ids of the bets a route has sent, per chat.
+
+    A bet that changes later (price, line) edits the message it was sent in instead of being posted again. With a
+    connection the ids are kept in the state db, changes are buffered and written together with the outbox
+    acknowledgements (see StateStore.flush).
+    """
+
+    def __init__(self, connection=None):
+        self.connection = connection
+        # route -> uuid -> chat id -> message id
+        self.messages = {}
+        # (route, uuid, chat id) -> message id, or None when it was forgotten
+        self.changed = {}
+        if self.connection is not None:
+            with self.connection:
+                self.connection.execute("CREATE TABLE IF NOT EXISTS sent_messages ("
+                                        "route TEXT NOT NULL, uuid TEXT NOT NULL, chat_id NOT NULL, "
+                                        "message_id INTEGER NOT NULL, PRIMARY KEY (route, uuid, chat_id)"
+                                        ") WITHOUT ROWID")
+            for route_name, uuid, chat_id, message_id in self.connection.execute(
+                    "SELECT route, uuid, chat_id, message_id FROM sent_messages"):
+                self.messages.setdefault(route_name, {}).setdefault(uuid, {})[chat_id] = message_id
+
+    def uuids(self, route_name):
+        return self.messages.get(route_name, {})
+
+    def message_id(self, route_name, uuid, chat_id):
+        return self.messages.get(route_name, {}).get(uuid, {}).get(chat_id)
+
+    def remember(self, route_name, uuid, chat_id, message_id):
+        self.messages.setdefault(route_name, {}).setdefault(uuid, {})[chat_id] = message_id
+        if self.connection is not None:
+            self.changed[(route_name, uuid, chat_id)] = message_id
+
+    def forget(self, route_name, uuid, chat_id=None):
+        chats = self.messages.get(route_name, {}).get(uuid)
+        if not chats:
+            return
+        for forgotten_chat_id in ([chat_id] if chat_id is not None else list(chats)):
+            if chats.pop(forgotten_chat_id, None) is not None and self.connection is not None:
+                self.changed[(route_name, uuid, forgotten_chat_id)] = None
+        if not chats:
+            del self.messages[route_name][uuid]
+
+    def forget_missing(self, route_name, current_uuids):
+        """Forgets the bets of a route that are not in its snapshot anymore, returns their uuids."""
+        current_uuids = set(current_uuids)
+        removed = [uuid for uuid in self.uuids(route_name) if uuid not in current_uuids]
+        for uuid in removed:
+            self.forget(route_name, uuid)
+        return removed
+
+    def write_buffered(self):
+        """Writes the buffered changes, has to run inside the caller's transaction."""
+        if not self.changed:
+            return
+        self.connection.executemany("DELETE FROM sent_messages WHERE route = ? AND uuid = ? AND chat_id = ?",
+                                    [key for key, message_id in self.changed.items() if message_id is None])
+        self.connection.executemany("INSERT OR REPLACE INTO sent_messages (route, uuid, chat_id, message_id) "
+                                    "VALUES (?, ?, ?, ?)",
+                                    [key + (message_id,) for key, message_id in self.changed.items()
+                                     if message_id is not None])
+        self.changed = {}
@@ -0,0 +1,217 @@
+import logging
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# the same default buckets as the prometheus client libraries, in seconds
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def escape_label_value(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def format_labels(label_names, label_values, extra=()):
+    pairs = list(zip(label_names, label_values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label_value(value)}"' for name, value in pairs) + "}"
+
+
+def format_value(value):
+    if value == float('inf'):
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    type_name = None
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self.lock = threading.Lock()
+        self.values = {}
+
+    def label_key(self, labels):
+        if set(labels) != set(self.label_names):
+            raise ValueError(f"Metric {self.name} expects labels {self.label_names}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            samples = sorted(self.values.items())
+        for label_values, value in samples:
+            lines.append(f"{self.name}{format_labels(self.label_names, label_values)} {format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def get(self, **labels):
+        return self.values.get(self.label_key(labels), 0)
+
+
+class Gauge(Metric):
+    type_name = "gauge"
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        # gauges whose value is read when the metrics are rendered, e.g. the length of a queue
+        self.functions = {}
+
+    def set(self, value, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            self.values[key] = value
+
+    def set_function(self, function, **labels):
+        self.functions[self.label_key(labels)] = function
+
+    def get(self, **labels):
+        key = self.label_key(labels)
+        if key in self.functions:
+            return self.functions[key]()
+        return self.values.get(key, 0)
+
+    def render(self):
+        for key, function in list(self.functions.items()):
+            try:
+                value = function()
+            except Exception:
+                logger.exception(f"Failed to read gauge {self.name}")
+                continue
+            with self.lock:
+                self.values[key] = value
+        return super().render()
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self.label_key(labels)
+        with self.lock:
+            counts, total = self.values.get(key, ([0] * len(self.buckets), 0))
+            for index, upper_bound in enumerate(self.buckets):
+                if value <= upper_bound:
+                    counts[index] += 1
+                    break
+            self.values[key] = (counts, total + value)
+
+    def count(self, **labels):
+        counts, _ = self.values.get(self.label_key(labels), ([0], 0))
+        return sum(counts)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.type_name}"]
+        with self.lock:
+            samples = sorted((key, (list(counts), total)) for key, (counts, total) in self.values.items())
+        for label_values, (counts, total) in samples:
+            cumulative = 0
+            for upper_bound, count in zip(self.buckets, counts):
+                cumulative += count
+                labels = format_labels(self.label_names, label_values, [("le", format_value(float(upper_bound)))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = format_labels(self.label_names, label_values)
+            lines.append(f"{self.name}_sum{labels} {format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """Counters, gauges and histograms rendered in the Prometheus text format.
+
+    Asking for a metric that is already registered returns the existing one, so every component can register
+    the metrics it updates without knowing who else uses the registry.
+    """
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+        self.server = None
+
+    def register(self, metric_class, name, help_text, label_names=(), **kwargs):
+        with self.lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = metric_class(name, help_text, label_names, **kwargs)
+            elif not isinstance(metric, metric_class) or metric.label_names != tuple(label_names):
+                raise ValueError(f"Metric {name} is already registered as a different metric")
+            return metric
+
+    def counter(self, name, help_text, label_names=()):
+        return self.register(Counter, name, help_text, label_names)
+
+    def gauge(self, name, help_text, label_names=()):
+        return self.register(Gauge, name, help_text, label_names)
+
+    def histogram(self, name, help_text, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram, name, help_text, label_names, buckets=buckets)
+
+    def render(self):
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines += metric.render()
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        # written next to the target and renamed, so a reader never sees a half written file
+        temporary_path = f"{path}.tmp"
+        with open(temporary_path, 'w') as f:
+            f.write(self.render())
+        os.replace(temporary_path, path)
+
+    def serve(self, port, host='127.0.0.1'):
+        """Serve the metrics on http://host:port/metrics from a background thread."""
+        registry = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = registry.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', CONTENT_TYPE)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # scrapes every few seconds would drown the scraper logs
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), MetricsHandler)
+        thread = threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True)
+        thread.start()
+        logger.info(f"Serving metrics on http://{host}:{self.server.server_port}/metrics")
+        return self.server
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
@@ -0,0 +1,102 @@
+import logging
+import time
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class OutboxMessage(str):
+    """A rendered message that remembers its outbox row, it behaves like the plain text everywhere else."""
+
+    def __new__(cls, text, outbox_id, counted=False, bet_uuid=None):
+        message = super().__new__(cls, text)
+        message.outbox_id = outbox_id
+        # already taken from the route's shared counter, so a resend after a restart doesn't take again
+        message.counted = counted
+        # set for the messages of routes that edit changed bets, see TrackedMessage
+        message.bet_uuid = bet_uuid
+        return message
+
+
+class Outbox:
+    """Rendered messages that are not acknowledged by telegram yet, one pending row per message and chat.
+
+    Messages are added in the same transaction as the dedup state of their poll cycle (see StateStore.save), so
+    after a crash a bet is either still new or its message is in the outbox. Acknowledgements are buffered and
+    written in one transaction per batch instead of one commit per message.
+    """
+
+    def __init__(self, connection, flush_size=100):
+        self.connection = connection
+        self.flush_size = flush_size
+        self.acknowledged = []
+        self.counted = []
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS outbox_messages ("
+                                    "id INTEGER PRIMARY KEY, route TEXT NOT NULL, text TEXT NOT NULL, "
+                                    "created_at REAL NOT NULL, counted INTEGER NOT NULL DEFAULT 0, bet_uuid TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS outbox_pending ("
+                                    "message_id INTEGER NOT NULL, chat_id NOT NULL, PRIMARY KEY (message_id, chat_id)"
+                                    ") WITHOUT ROWID")
+            columns = [row[1] for row in self.connection.execute("PRAGMA table_info(outbox_messages)")]
+            if 'bet_uuid' not in columns:
+                # outboxes written before edits were tracked
+                self.connection.execute("ALTER TABLE outbox_messages ADD COLUMN bet_uuid TEXT")
+
+    def add(self, route_name, chats, texts):
+        """Adds the messages of one route, has to run inside the caller's transaction."""
+        messages = []
+        created_at = time.time()
+        for text in texts:
+            bet_uuid = getattr(text, 'bet_uuid', None)
+            cursor = self.connection.execute("INSERT INTO outbox_messages (route, text, created_at, bet_uuid) "
+                                             "VALUES (?, ?, ?, ?)", (route_name, text, created_at, bet_uuid))
+            self.connection.executemany("INSERT INTO outbox_pending (message_id, chat_id) VALUES (?, ?)",
+                                        [(cursor.lastrowid, chat_id) for chat_id in chats])
+            messages.append(OutboxMessage(text, cursor.lastrowid, bet_uuid=bet_uuid))
+        return messages
+
+    def acknowledge(self, message, chat_id):
+        if not isinstance(message, OutboxMessage):
+            return
+        self.acknowledged.append((message.outbox_id, chat_id))
+        if len(self.acknowledged) >= self.flush_size:
+            self.flush()
+
+    def mark_counted(self, message):
+        if isinstance(message, OutboxMessage) and not message.counted:
+            message.counted = True
+            self.counted.append((message.outbox_id,))
+
+    def write_buffered(self):
+        """Writes the buffered acknowledgements, has to run inside the caller's transaction."""
+        if self.counted:
+            self.connection.executemany("UPDATE outbox_messages SET counted = 1 WHERE id = ?", self.counted)
+            self.counted = []
+        if self.acknowledged:
+            self.connection.executemany("DELETE FROM outbox_pending WHERE message_id = ? AND chat_id = ?",
+                                        self.acknowledged)
+            self.connection.executemany(
+                "DELETE FROM outbox_messages WHERE id = ? AND NOT EXISTS "
+                "(SELECT 1 FROM outbox_pending WHERE message_id = ?)",
+                [(message_id, message_id) for message_id in {message_id for message_id, _ in self.acknowledged}])
+            self.acknowledged = []
+
+    def flush(self):
+        if self.acknowledged or self.counted:
+            with self.connection:
+                self.write_buffered()
+
+    def pending(self):
+        """Returns [(route, message, chat_ids)] of everything not acknowledged yet, oldest first."""
+        messages = {}
+        rows = self.connection.execute("SELECT m.id, m.route, m.text, m.counted, m.bet_uuid, p.chat_id "
+                                       "FROM outbox_messages m JOIN outbox_pending p ON p.message_id = m.id "
+                                       "ORDER BY m.id")
+        for message_id, route_name, text, counted, bet_uuid, chat_id in rows:
+            if message_id not in messages:
+                messages[message_id] = (route_name, OutboxMessage(text, message_id, bool(counted), bet_uuid), [])
+            messages[message_id][2].append(chat_id)
+        return list(messages.values())
@@ -0,0 +1,44 @@
+import json
+import re
+
+_decoder = json.JSONDecoder()
+_whitespace = re.compile(r'[ \t\n\r]*')
+
+
+def iter_bets(payload):
+    """Yield the bets of the dashboard `data` field one at a time.
+
+    The dashboard sends the bet list as a JSON encoded string, decoding it element by element
+    means we never hold the whole decoded list next to the string it came from.
+    """
+    if not isinstance(payload, str):
+        # some endpoints already send the list itself
+        yield from payload
+        return
+
+    index = _whitespace.match(payload, 0).end()
+    if not payload.startswith('[', index):
+        raise json.JSONDecodeError("Expecting '['", payload, index)
+    index = _whitespace.match(payload, index + 1).end()
+    if payload.startswith(']', index):
+        return
+
+    while True:
+        bet, index = _decoder.raw_decode(payload, index)
+        yield bet
+        index = _whitespace.match(payload, index).end()
+        if payload.startswith(']', index):
+            return
+        if not payload.startswith(',', index):
+            raise json.JSONDecodeError("Expecting ',' delimiter", payload, index)
+        index = _whitespace.match(payload, index + 1).end()
+
+
+def decode_bets(payload):
+    """Decode the whole bet list at once, for callers that keep every bet of the snapshot anyway."""
+    if not isinstance(payload, str):
+        return list(payload)
+    bets = json.loads(payload)
+    if not isinstance(bets, list):
+        raise json.JSONDecodeError("Expecting '['", payload, 0)
+    return bets
@@ -0,0 +1,48 @@
+import time
+
+
+class PollScheduler:
+    def __init__(self, base_interval=30, min_interval=5, max_interval=60, kickoff_window_hours=1.0,
+                 kickoff_interval=10, speedup_factor=0.5, backoff_factor=1.5):
+        self.base_interval = base_interval
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.kickoff_window_hours = kickoff_window_hours
+        self.kickoff_interval = kickoff_interval
+        self.speedup_factor = speedup_factor
+        self.backoff_factor = backoff_factor
+        self.interval = base_interval
+        self.cycle_started = None
+        self.last_cycle_duration = 0
+        self.last_send_latency = None
+
+    def start_cycle(self):
+        self.cycle_started = time.monotonic()
+        return self.cycle_started
+
+    def next_interval(self, new_bets_count, min_hours_to_start=None):
+        # poll faster while the dashboard is busy, back off slowly while nothing changes
+        if new_bets_count > 0:
+            interval = self.interval * self.speedup_factor
+        else:
+            interval = self.interval * self.backoff_factor
+        interval = max(self.min_interval, min(self.max_interval, interval))
+
+        # bets close to kickoff move quickly, so never wait longer than the kickoff interval for them
+        if min_hours_to_start is not None and min_hours_to_start <= self.kickoff_window_hours:
+            interval = max(self.min_interval, min(interval, self.kickoff_interval))
+
+        self.interval = interval
+        return interval
+
+    def sleep_time(self, new_bets_count, min_hours_to_start=None):
+        # the interval is measured from the start of the cycle, so slow fetches don't push the period out
+        interval = self.next_interval(new_bets_count, min_hours_to_start)
+        if self.cycle_started is None:
+            return interval
+        self.last_cycle_duration = time.monotonic() - self.cycle_started
+        return max(0, interval - self.last_cycle_duration)
+
+    def record_send_latency(self, cycle_started):
+        self.last_send_latency = time.monotonic() - cycle_started
+        return self.last_send_latency
@@ -0,0 +1,55 @@
+from collections import OrderedDict
+
+from integrations.helpers.hash_calculator import compute_bet_model_hash
+from integrations.helpers.markdown import escape_field
+from integrations.print_model import ERROR_PAGE_NAME, PrintModel, hours_and_minutes, placed_text
+
+
+class RenderCache:
+    """LRU cache of rendered bets, keyed by the bet digest, the raw mod and price and the displayed time to start.
+
+    Only the first lines of a message differ between lanes (page name and placed text), so the body is
+    rendered once per bet and shared by every lane that sends it, e.g. bet365 and bet365_clean.
+    """
+
+    def __init__(self, max_size=10_000):
+        self.max_size = max_size
+        self.bodies = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def render(self, bet, page_name, placed_count, placed_price):
+        # the digest compares mod and price as floats but the body prints them as they came, 1 and 1.0 differ
+        key = (compute_bet_model_hash(bet), repr(bet['mod']), repr(bet['price']),
+               hours_and_minutes(bet['hours_to_start']))
+        cached = self.bodies.get(key)
+        if cached is None:
+            self.misses += 1
+            model = PrintModel(
+                page_name=page_name,
+                hours_to_start=bet['hours_to_start'],
+                league=bet['league'],
+                home_team=bet['home_team'],
+                away_team=bet['away_team'],
+                bet_type=bet['bet_type'],
+                mod=bet['mod'],
+                price=bet['price'],
+                bet_class=bet['bet_class'],
+                placed_count=placed_count,
+                placed_price=placed_price
+            )
+            # PrintModel replaces the page name when it doesn't know the bet class, that depends on the bet only
+            cached = (model.page_name == ERROR_PAGE_NAME, model.get_body_markdown())
+            self.bodies[key] = cached
+            if len(self.bodies) > self.max_size:
+                self.bodies.popitem(last=False)
+        else:
+            self.hits += 1
+            self.bodies.move_to_end(key)
+
+        is_error, body = cached
+        header_page_name = ERROR_PAGE_NAME if is_error else page_name
+        return f"__{escape_field(header_page_name)}__\n{placed_text(placed_count, placed_price)}{body}"
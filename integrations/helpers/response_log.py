@@ -0,0 +1,58 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# response headers needed to replay conditional requests and the content type
+RECORDED_HEADERS = ('ETag', 'Last-Modified', 'Content-Type')
+
+
+class ResponseRecorder:
+    """Appends raw dashboard responses with their timestamp to a gzip compressed log.
+
+    Every record is written as its own gzip member and the file is closed after each one, so a crash can
+    only lose the record that was being written. gzip readers treat the members as one stream.
+    """
+
+    def __init__(self, path, clock=time.time):
+        self.path = path
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.records_written = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def record(self, url, response):
+        record = {
+            't': self.clock(),
+            'url': url,
+            'status': response.status_code,
+            'headers': {name: response.headers[name] for name in RECORDED_HEADERS if name in response.headers},
+            'body': response.content.decode('utf-8', 'replace'),
+        }
+        line = (json.dumps(record) + "\n").encode()
+        # fetches of different sources run in parallel threads
+        with self.lock:
+            with gzip.open(self.path, 'ab') as f:
+                f.write(line)
+            self.records_written += 1
+
+
+def read_response_log(path):
+    """Yields the records of a response log in the order they were written."""
+    with gzip.open(path, 'rt') as f:
+        try:
+            for line in f:
+                yield json.loads(line)
+        except (EOFError, zlib.error, json.JSONDecodeError) as e:
+            # the last record of a log whose writer was killed can be incomplete
+            logger.warning(f"Response log {path} ends with an incomplete record: {e}")
@@ -0,0 +1,174 @@
+DEFAULT_SOURCE = "dashboard_v2"
+DEDUP_MODES = ("hash", "uuid")
+RENDERERS = ("default", "clean")
+SHARD_KEYS = ("source", "dashboard")
+# seconds a route holds its messages back before sending, when the route doesn't set its own delay
+DEFAULT_SEND_DELAYS = {"bet365_clean": 1}
+
+
+class Source:
+    def __init__(self, name, api_url, login_url=None, username=None, password=None):
+        self.name = name
+        self.api_url = api_url
+        self.login_url = login_url
+        self.username = username
+        self.password = password
+
+
+class Route:
+    def __init__(self, name, source, dashboard_name=None, bet_filter=None, dedup="hash", partition=None,
+                 renderer="default", page_name=None, chats=None, delay=0, batch=False, counter=None,
+                 edit_updates=True):
+        if dedup not in DEDUP_MODES:
+            raise ValueError(f"Route {name}: dedup has to be one of {DEDUP_MODES}, got {dedup}")
+        if renderer not in RENDERERS:
+            raise ValueError(f"Route {name}: renderer has to be one of {RENDERERS}, got {renderer}")
+        self.name = name
+        self.source = source
+        self.dashboard_name = dashboard_name.lower() if dashboard_name else None
+        # field -> allowed values, compared lower case, e.g. {'bet_class': ['ah', 'ou']}
+        self.bet_filter = {field: {str(value).lower() for value in values}
+                           for field, values in (bet_filter or {}).items()}
+        self.dedup = dedup
+        # key of the dedup state in Scraper.bets_dict, kept stable so persisted state survives config changes
+        self.partition = partition or name
+        self.renderer = renderer
+        self.page_name = page_name or name
+        self.chats = chats or []
+        self.delay = delay
+        self.batch = batch
+        # name of a shared counter that limits how many messages this route sends, see SharedCounter
+        self.counter = counter
+        # a changed bet (new price or line) edits the message it was sent in instead of being posted again.
+        # only for hash dedup, uuid dedup never sends a bet twice, and not when several bets share a message
+        self.edit_updates = edit_updates and dedup == "hash" and not batch
+
+    def matches(self, bet, dashboard_name):
+        if self.dashboard_name is not None and dashboard_name != self.dashboard_name:
+            return False
+        for field, allowed_values in self.bet_filter.items():
+            if str(bet.get(field)).lower() not in allowed_values:
+                return False
+        return True
+
+
+def load_routing_table(config):
+    """Returns the sources and routes from creds.yml, or the original sing / bet365 setup when there are none."""
+    if 'routes' not in config:
+        return legacy_routing_table(config)
+
+    sources = {}
+    for name, source_config in config.get('sources', {}).items():
+        sources[name] = Source(name, source_config['api_url'], source_config.get('login_url'),
+                               source_config.get('username'), source_config.get('password'))
+    if DEFAULT_SOURCE not in sources and 'get_data2_api_url' in config:
+        sources[DEFAULT_SOURCE] = legacy_source(config)
+
+    routes = []
+    for route_config in config['routes']:
+        name = route_config['name']
+        source = route_config.get('source', DEFAULT_SOURCE)
+        if source not in sources:
+            raise ValueError(f"Route {name} uses unknown source {source}")
+        routes.append(Route(
+            name,
+            source,
+            dashboard_name=route_config.get('dashboard_name'),
+            bet_filter=route_config.get('filter'),
+            dedup=route_config.get('dedup', 'hash'),
+            partition=route_config.get('partition'),
+            renderer=route_config.get('renderer', 'default'),
+            page_name=route_config.get('page_name'),
+            chats=route_config.get('chats', []),
+            delay=route_config.get('delay', get_send_delay(name, config)),
+            batch=route_config.get('batch', config.get('batch_messages', {}).get(name, False)),
+            counter=route_config.get('counter'),
+            edit_updates=route_config.get('edit_updates', config.get('edit_updates', {}).get(name, True))
+        ))
+    return sources, routes
+
+
+def legacy_source(config):
+    return Source(DEFAULT_SOURCE, config.get('get_data2_api_url'), config.get('get_data2_login_url'),
+                  config.get('get_data2_username'), config.get('get_data2_password'))
+
+
+def legacy_routing_table(config):
+    # the original hardcoded setup: one unified endpoint split by dashboard_name into three chats
+    sources = {DEFAULT_SOURCE: legacy_source(config)}
+    batch_messages = config.get('batch_messages', {})
+    edit_updates = config.get('edit_updates', {})
+    routes = [
+        Route("sing", DEFAULT_SOURCE, dashboard_name="sing", dedup="hash", partition="sing_bets",
+              page_name="Sing", chats=legacy_chats(config, 'chat_sing_id'),
+              delay=get_send_delay("sing", config), batch=batch_messages.get("sing", False),
+              edit_updates=edit_updates.get("sing", True)),
+        Route("bet365", DEFAULT_SOURCE, dashboard_name="bet365", dedup="hash", partition="bet365_bets",
+              page_name="Bet365", chats=legacy_chats(config, 'chat_bet365_id'),
+              delay=get_send_delay("bet365", config), batch=batch_messages.get("bet365", False),
+              edit_updates=edit_updates.get("bet365", True)),
+        Route("bet365_clean", DEFAULT_SOURCE, dashboard_name="bet365", dedup="uuid", partition="bet365_clean",
+              renderer="clean", page_name="Bet365", chats=legacy_chats(config, 'chat_bet365_clean_id'),
+              delay=get_send_delay("bet365_clean", config), batch=batch_messages.get("bet365_clean", False),
+              counter="clean_message_count"),
+    ]
+    return sources, routes
+
+
+def legacy_chats(config, key):
+    return [config[key]] if key in config else []
+
+
+def plan_shards(sources, routes, config):
+    """Splits the routes into the shards of the supervisor workers, returns {shard name: [route names]}.
+
+    `shards` in creds.yml lists the routes of every shard by hand, otherwise `shard_by` groups them by
+    source (the default) or by dashboard. Every worker fetches the endpoints of its own routes, so by source
+    all routes of one endpoint share a fetch. By dashboard, the dashboards of one endpoint each fetch the
+    same payload in their own worker, see shared_endpoints.
+    """
+    route_names = [route.name for route in routes]
+    if 'shards' in config:
+        shards = {str(name): list(names) for name, names in config['shards'].items()}
+        assigned = [name for names in shards.values() for name in names]
+        unknown = set(assigned) - set(route_names)
+        if unknown:
+            raise ValueError(f"Shards use unknown routes {sorted(unknown)}")
+        duplicated = {name for name in assigned if assigned.count(name) > 1}
+        if duplicated:
+            raise ValueError(f"Routes {sorted(duplicated)} are in more than one shard")
+        unassigned = [name for name in route_names if name not in assigned]
+        if unassigned:
+            raise ValueError(f"Routes {unassigned} are not in any shard")
+        return shards
+
+    shard_by = config.get('shard_by', 'source')
+    if shard_by not in SHARD_KEYS:
+        raise ValueError(f"shard_by has to be one of {SHARD_KEYS}, got {shard_by}")
+    # sources with the same api url are one endpoint, they go into the shard of the first of them
+    endpoint_shards = {}
+    source_shards = {}
+    for name, source in sources.items():
+        source_shards[name] = endpoint_shards.setdefault(source.api_url, name)
+    shards = {}
+    for route in routes:
+        if shard_by == 'dashboard' and route.dashboard_name is not None:
+            shard_name = f"{route.source}-{route.dashboard_name}"
+        else:
+            shard_name = source_shards.get(route.source, route.source)
+        shards.setdefault(shard_name, []).append(route.name)
+    return shards
+
+
+def shared_endpoints(sources, routes, shards):
+    """Returns {api url: [shard names]} of the endpoints that more than one shard fetches."""
+    route_sources = {route.name: route.source for route in routes}
+    endpoints = {}
+    for shard_name, route_names in shards.items():
+        for api_url in dict.fromkeys(sources[route_sources[name]].api_url for name in route_names):
+            endpoints.setdefault(api_url, []).append(shard_name)
+    return {api_url: shard_names for api_url, shard_names in endpoints.items() if len(shard_names) > 1}
+
+
+def get_send_delay(name, config):
+    return config.get('send_delays', {}).get(name, DEFAULT_SEND_DELAYS.get(name, 0))
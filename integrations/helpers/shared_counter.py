@@ -0,0 +1,51 @@
+import os
+import sqlite3
+
+# lives outside the working directory, so the bot and the scraper find it no matter where they are started from
+DEFAULT_COUNTER_PATH = os.path.join(os.path.expanduser('~'), '.forwarder', 'shared_counters.sqlite3')
+
+
+class SharedCounter:
+    """Counter shared between processes, backed by sqlite so every change is atomic."""
+
+    def __init__(self, name, path=DEFAULT_COUNTER_PATH):
+        self.name = name
+        # configured paths like '~/.forwarder/...' resolve to the same file for the scraper and the bot
+        path = os.path.expanduser(path)
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # isolation_level=None lets us open the write transactions ourselves with BEGIN IMMEDIATE
+        self.connection = sqlite3.connect(path, timeout=5, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def get(self):
+        row = self.connection.execute("SELECT value FROM counters WHERE name = ?", (self.name,)).fetchone()
+        return row[0] if row else 0
+
+    def set(self, value):
+        self.connection.execute("INSERT INTO counters (name, value) VALUES (?, ?) "
+                                "ON CONFLICT(name) DO UPDATE SET value = excluded.value", (self.name, value))
+
+    def take(self, requested):
+        """Atomically take up to `requested` from the counter, returns (taken, remaining)."""
+        if requested <= 0:
+            return 0, self.get()
+        # BEGIN IMMEDIATE takes the write lock before reading, so a set() from the other process can't be lost
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = self.connection.execute("SELECT value FROM counters WHERE name = ?", (self.name,)).fetchone()
+            value = row[0] if row else 0
+            taken = min(value, requested)
+            if taken > 0:
+                self.connection.execute("UPDATE counters SET value = ? WHERE name = ?", (value - taken, self.name))
+            self.connection.execute("COMMIT")
+        except Exception:
+            self.connection.execute("ROLLBACK")
+            raise
+        return taken, value - taken
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,74 @@
+import asyncio
+import os
+import sqlite3
+import threading
+import time
+
+# next to the shared counters, every worker of the supervisor has to use the same file
+DEFAULT_BUDGET_PATH = os.path.join(os.path.expanduser('~'), '.forwarder', 'telegram_budget.sqlite3')
+
+
+class SharedTokenBucket:
+    """TokenBucket whose tokens are shared by every process that uses the same sqlite file and name.
+
+    The scraper workers started by the supervisor send to telegram independently, this keeps them within one
+    per chat and one global budget together.
+    """
+
+    def __init__(self, name, rate, capacity, path=DEFAULT_BUDGET_PATH, clock=time.time):
+        self.name = name
+        self.rate = rate
+        self.capacity = capacity
+        # the same as the shared counters, '~' in creds.yml is the home of the user running the bot
+        path = os.path.expanduser(path)
+        self.path = path
+        # wall clock, monotonic clocks of different processes can't be compared
+        self.clock = clock
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # reserve runs in worker threads, the lock keeps them from using the connection at the same time
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(path, timeout=5, isolation_level=None, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS token_buckets ("
+                                "name TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def update(self, change):
+        """Atomically applies `change(tokens, now)` to the stored bucket and returns the new token count."""
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                now = self.clock()
+                row = self.connection.execute("SELECT tokens, updated FROM token_buckets WHERE name = ?",
+                                              (self.name,)).fetchone()
+                tokens, updated = row if row else (self.capacity, now)
+                tokens = change(tokens + max(0, now - updated) * self.rate)
+                self.connection.execute("INSERT INTO token_buckets (name, tokens, updated) VALUES (?, ?, ?) "
+                                        "ON CONFLICT(name) DO UPDATE SET tokens = excluded.tokens, "
+                                        "updated = excluded.updated", (self.name, tokens, now))
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return tokens
+
+    def reserve(self):
+        """Take a token and return how long to wait before it may be used."""
+        tokens = self.update(lambda tokens: min(self.capacity, tokens) - 1)
+        if tokens >= 0:
+            return 0
+        return -tokens / self.rate
+
+    async def acquire(self):
+        # the sqlite lock can be held by another worker for a moment, so it is taken outside the event loop
+        delay = await asyncio.to_thread(self.reserve)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+    def pause(self, seconds):
+        # used when telegram answers 429, nothing goes out of this bucket until retry_after has passed
+        self.update(lambda tokens: min(tokens, 1 - seconds * self.rate))
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,104 @@
+import json
+import logging
+import sqlite3
+import time
+
+from integrations.helpers.message_tracker import MessageTracker
+from integrations.helpers.outbox import Outbox
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+
+class StateStore:
+    """Keeps the scraper dedup state in sqlite, so a restart continues where the last run stopped."""
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        # with WAL and synchronous=NORMAL the per cycle commits don't wait for an fsync
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS partitions (name TEXT PRIMARY KEY)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS dedup_keys ("
+                                    "partition TEXT NOT NULL, key NOT NULL, PRIMARY KEY (partition, key)"
+                                    ") WITHOUT ROWID")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS placed_bets (uuid TEXT PRIMARY KEY, bet TEXT NOT NULL)")
+        # what is already on disk, so every save only writes the difference
+        self.saved_keys = {}
+        self.saved_placed = set()
+        self.outbox = Outbox(self.connection)
+        self.message_tracker = MessageTracker(self.connection)
+
+    def load(self):
+        started = time.perf_counter()
+        bets_dict = {}
+        for (name,) in self.connection.execute("SELECT name FROM partitions"):
+            bets_dict[name] = {}
+        # only the keys are needed for dedup, the bets themselves come back with the next poll
+        for partition, key in self.connection.execute("SELECT partition, key FROM dedup_keys"):
+            bets_dict.setdefault(partition, {})[key] = None
+
+        placed_bets = {}
+        for uuid, bet in self.connection.execute("SELECT uuid, bet FROM placed_bets"):
+            placed_bets[uuid] = json.loads(bet)
+
+        self.saved_keys = {partition: set(keys) for partition, keys in bets_dict.items()}
+        self.saved_placed = set(placed_bets)
+        logger.info(f"Loaded dedup state from {self.path}: "
+                    f"{sum(len(keys) for keys in bets_dict.values())} keys, {len(placed_bets)} placed bets "
+                    f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return bets_dict, placed_bets
+
+    def save(self, bets_dict, placed_bets, new_messages=()):
+        """Saves the dedup state and adds `new_messages` [(route name, chat ids, texts)] to the outbox.
+
+        Returns the texts as OutboxMessages, in the same order.
+        """
+        # one transaction per poll cycle, only the keys that were added or removed since the last save
+        with self.connection:
+            self.outbox.write_buffered()
+            self.message_tracker.write_buffered()
+            outbox_messages = [self.outbox.add(route_name, chats, texts) for route_name, chats, texts in new_messages]
+
+            for partition, bets in bets_dict.items():
+                saved = self.saved_keys.get(partition)
+                if saved is None:
+                    self.connection.execute("INSERT OR IGNORE INTO partitions (name) VALUES (?)", (partition,))
+                    saved = set()
+                current = set(bets)
+                added = current - saved
+                removed = saved - current
+                if removed:
+                    self.connection.executemany("DELETE FROM dedup_keys WHERE partition = ? AND key = ?",
+                                                [(partition, key) for key in removed])
+                if added:
+                    self.connection.executemany("INSERT OR IGNORE INTO dedup_keys (partition, key) VALUES (?, ?)",
+                                                [(partition, key) for key in added])
+                self.saved_keys[partition] = current
+
+            current_placed = set(placed_bets)
+            added_placed = current_placed - self.saved_placed
+            removed_placed = self.saved_placed - current_placed
+            if removed_placed:
+                self.connection.executemany("DELETE FROM placed_bets WHERE uuid = ?",
+                                            [(uuid,) for uuid in removed_placed])
+            if added_placed:
+                self.connection.executemany("INSERT OR REPLACE INTO placed_bets (uuid, bet) VALUES (?, ?)",
+                                            [(uuid, json.dumps(placed_bets[uuid])) for uuid in added_placed])
+            self.saved_placed = current_placed
+        return outbox_messages
+
+    def flush(self):
+        """Writes the buffered outbox acknowledgements and message ids in one transaction."""
+        if self.outbox.acknowledged or self.outbox.counted or self.message_tracker.changed:
+            with self.connection:
+                self.outbox.write_buffered()
+                self.message_tracker.write_buffered()
+
+    def close(self):
+        self.flush()
+        self.connection.close()
@@ -1,10 +1,8 @@
-import re
+from integrations.helpers.bet_rules import AWAY, DRAW, get_rule
+from integrations.helpers.markdown import escape, escape_field
 
-
-def escape(text):
-    """Escape the characters that have a special meaning in Telegram's MarkdownV2."""
-    escape_chars = r'_*\[\]()~>#+-=|{}.!'
-    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', str(text))
+# shown instead of the page name when no rule knows the bet
+ERROR_PAGE_NAME = "Error: bet not changed"
 
 
 def hours_and_minutes(number):
@@ -13,6 +11,12 @@ def hours_and_minutes(number):
     return f"{hours}h {minutes}min"
 
 
+def placed_text(placed_count, placed_price):
+    if placed_count == 0:
+        return "\n"
+    return f"_Already placed before @ {escape(placed_price)}_\n\n"
+
+
 class PrintModel:
     def __init__(self, page_name, hours_to_start, league, home_team, away_team, bet_type, mod, price, bet_class,
                  placed_count, placed_price="NaN"):
@@ -32,98 +36,52 @@ class PrintModel:
         self.remodel_based_on_bet_data(bet_class, bet_type, mod, away_team)
 
     def get_markdown(self):
-        formatted_time = hours_and_minutes(self.hours_to_start)
-        return f"__{escape(self.page_name)}__\n" \
+        return f"__{escape_field(self.page_name)}__\n" \
                f"{self.get_placed_text()}" \
-               f"_\\({escape(formatted_time)}\\)_\n" \
-               f"*{escape(self.league)}*\n" \
-               f"{escape(self.home_team)} / {escape(self.away_team)}" \
-               f" \\- {escape(self.what_to_display())} {escape(self.get_sign())}{escape(self.display_mod())}@ {escape(self.price)}\n"
+               f"{self.get_body_markdown()}"
 
-    def remodel_based_on_bet_data(self, bet_class, bet_type, mod, away_team):
-        parsed_bet_class = str.lower(bet_class).strip()
-        parsed_bet_type = str.lower(str(bet_type)).strip()
-        bet_changed = False
-
-        if parsed_bet_class == "ah" or parsed_bet_class == "asian_handicap":
-            bet_changed = True
-
-        if parsed_bet_type == "2" and "1x2" not in parsed_bet_class and "ml" not in parsed_bet_class and "asian" not in parsed_bet_class and "ah" not in parsed_bet_class and "asian_handicap" not in parsed_bet_class:
-            self.mod = mod * -1
-            bet_changed = True
+    def get_body_markdown(self):
+        # everything below the page name and placed text, it only depends on the bet itself
+        formatted_time = hours_and_minutes(self.hours_to_start)
+        # the bet line has no markdown of its own, so it is escaped in one pass instead of field by field.
+        # get_sign has to run before display_mod, it replaces a missing mod with 0
+        sign = self.get_sign()
+        bet_line = f"{self.home_team} / {self.away_team} - " \
+                   f"{self.what_to_display()} {sign}{self.display_mod()}@ {self.price}"
+        return f"_{escape(f'({formatted_time})')}_\n" \
+               f"*{escape_field(self.league)}*\n" \
+               f"{escape(bet_line)}\n"
 
-        if parsed_bet_type == "2" and "1x2" not in parsed_bet_class and "ml":
+    def remodel_based_on_bet_data(self, bet_class, bet_type, mod, away_team):
+        self.rule = get_rule(bet_class, bet_type)
+        self.mod, bet_changed = self.rule.apply_mod(mod)
+        if self.rule.bet_type is not None:
+            self.bet_type = self.rule.bet_type
+        if self.rule.display_team == AWAY:
             self.display_team = away_team
-            bet_changed = True
-
-        if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
-            if mod.is_integer():  # Check if the mod value is a whole number
-                self.mod = format(int(mod), "d")
-                bet_changed = True
-            if parsed_bet_type == "o" or parsed_bet_type == "corners_o":
-                self.bet_type = "Over"
-                bet_changed = True
-            if parsed_bet_type == "u" or parsed_bet_type == "corners_u":
-                self.bet_type = "Under"
-                bet_changed = True
-
-        if "asian_corners" in parsed_bet_class:
-            if parsed_bet_type == "corners_2":
-                self.display_team = away_team
-            if mod.is_integer():  # Check if the mod value is a whole number
-                self.mod = format(int(mod), "d")
-                bet_changed = True
-
-        if "1x2" in parsed_bet_class or "ml" in parsed_bet_class:
-            self.mod = -0.5
-            bet_changed = True
-            if parsed_bet_type == "l":
-                self.display_team = away_team
-            if parsed_bet_type == "2":
-                self.display_team = away_team
-            if parsed_bet_type == "x" or parsed_bet_type == "d":
-                self.mod = 0
-                self.display_team = "Draw"
-
-        if "asian" in parsed_bet_class:
-            bet_changed = True
+        elif self.rule.display_team == DRAW:
+            self.display_team = "Draw"
 
         if not bet_changed:
-            self.page_name = "Error: bet not changed"
+            self.page_name = ERROR_PAGE_NAME
 
     def get_sign(self):
-        parsed_bet_class = str.lower(self.bet_class).strip()
         # check if mod is null, then replace it with number null
         if self.mod is None:
             self.mod = 0
-        if float(self.mod) > 0:
-            if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class or "asian_corners" in parsed_bet_class:
-                return ""
+        if float(self.mod) > 0 and self.rule.plus_sign:
             return "+"
         return ""
 
     def display_mod(self):
-        parsed_bet_class = str.lower(self.bet_class).strip()
-        parsed_bet_type = str.lower(str(self.bet_type)).strip()
-        if "1x2" in parsed_bet_class:
-            if parsed_bet_type == "x" or parsed_bet_type == "d":
-                return ""
-        if "asian_corners" in parsed_bet_class:
-            if parsed_bet_type == "corners_2":
-                return str(self.mod) + " Corner Handicap "
-            if parsed_bet_type == "corners_1":
-                return str(self.mod) + " Corners "
-        if "corners_ou" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
-            return str(self.mod) + " Corners "
-        return str(self.mod) + " "
+        if self.rule.mod_suffix is None:
+            return ""
+        return str(self.mod) + self.rule.mod_suffix
 
     def what_to_display(self):
-        parsed_bet_class = str.lower(self.bet_class).strip()
-        if "ou" in parsed_bet_class or "overunder" in parsed_bet_class or "overunder_corners" in parsed_bet_class:
+        if self.rule.show_bet_type:
             return self.bet_type
         return self.display_team
 
     def get_placed_text(self):
-        if self.placed_count == 0:
-            return "\n"
-        return f"_Already placed before @ {escape(self.placed_price)}_\n\n"
+        return placed_text(self.placed_count, self.placed_price)
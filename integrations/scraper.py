@@ -1,15 +1,28 @@
 import asyncio
-import json
+import functools
 import logging
-import os
 import time
 
-import requests
 import yaml
 
-from integrations.client.bet_site import BetSite
-from integrations.print_model import PrintModel
+from integrations.client.bet_site import BetSite, CIRCUIT_OPEN, NOT_MODIFIED
+from integrations.client.telegram_api import TELEGRAM_API_URL, TelegramApi
+from integrations.client.telegram_dispatcher import TelegramDispatcher
+from integrations.helpers.bet_table import BetTable
+from integrations.helpers.delay_scheduler import DelayScheduler
+from integrations.helpers.expiring_dict import ExpiringDict
 from integrations.helpers.hash_calculator import compute_bet_model_hash
+from integrations.helpers.message_batcher import MESSAGE_SEPARATOR, pack_message_groups
+from integrations.helpers.message_tracker import MessageTracker, TrackedMessage
+from integrations.helpers.metrics import MetricsRegistry
+from integrations.helpers.payload_decoder import decode_bets, iter_bets
+from integrations.helpers.poll_scheduler import PollScheduler
+from integrations.helpers.response_log import ResponseRecorder
+from integrations.helpers.render_cache import RenderCache
+from integrations.helpers.routing import DEFAULT_SOURCE, Route, load_routing_table
+from integrations.helpers.shared_counter import SharedCounter, DEFAULT_COUNTER_PATH
+from integrations.helpers.shared_token_bucket import DEFAULT_BUDGET_PATH, SharedTokenBucket
+from integrations.helpers.state_store import StateStore
 
 loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(level=logging.INFO, format=loggingFormat)
@@ -19,168 +32,635 @@ logger = logging.getLogger(__name__)
 
 class Scraper:
     def __init__(self):
-        self.dashboard_v2_site = BetSite()
+        self.dashboard_v2_site = BetSite(DEFAULT_SOURCE)
+        # one BetSite per source of the routing table, the unified dashboard is the default one
+        self.bet_sites = {DEFAULT_SOURCE: self.dashboard_v2_site}
+        self.sources = None
+        self.routes = None
         # we should update this every time we get new data, to prevent memory leaks
         self.bets_dict = {}
         # has to be a dict, because we have 2 urls and data sources
         self.last_updated = {}
-        self.placed_bets = {}
-        self.clean_delay_queue = {}
-        self.clean_message_count = 0
-        self.bet365_last_updated = time.time()
+        # placed bets and the uuid dedup partitions only grow, so their entries expire after kickoff
+        self.dedup_max_entries = 100_000
+        self.dedup_ttl_seconds = 24 * 60 * 60
+        self.dedup_grace_seconds = 3 * 60 * 60
+        self.placed_bets = self.create_expiring_dict("placed_bets")
+        # holds back the messages of delayed destinations (bet365_clean) until their delay has passed
+        self.delay_scheduler = None
+        # counters set by the /start N command of the telegram bot, every bet a route sends takes one from its counter
+        self.shared_counters = {}
+        self.telegram_api = None
+        # sends run in the background so the next fetch can overlap them, the dispatcher keeps messages in order
+        self.telegram_dispatcher = None
+        self.pending_sends = set()
+        # logs in to the dashboards again before their sessions expire, see refresh_sessions
+        self.session_refresher = None
+        self.poll_scheduler = PollScheduler()
+        # smallest hours_to_start seen in the last poll, used to poll faster close to kickoff
+        self.min_hours_to_start = None
+        self.source_min_hours_to_start = {}
+        self.state_store = None
+        self.render_cache = RenderCache()
+        # telegram message ids of the sent bets, replaced by the one of the state store when there is one
+        self.message_tracker = MessageTracker()
+        self.response_recorder = None
+        self.metrics = MetricsRegistry()
+        self.create_metrics()
 
     def start(self):
         with open('./integrations/creds.yml', 'rb') as f:
             config = yaml.safe_load(f)
-        self.login_to_dashboard_v2(config)
+        self.run(config)
+
+    def run(self, config):
+        self.get_routing_table(config)
+        self.configure_dedup(config)
+        self.render_cache.max_size = config.get('render_cache_size', self.render_cache.max_size)
+        self.restore_state(config)
+        self.start_metrics(config)
+        self.login_to_sources(config)
         asyncio.run(self.periodic_task(config))
 
-    def login_to_dashboard_v2(self, config):
-        username = config['get_data2_username']
-        password = config['get_data2_password']
-        login_url = config['get_data2_login_url']
-        if self.dashboard_v2_site.login(username, password, login_url):
-            logger.info("Logged in successfully to dashboard_v2_site bet site!")
-        else:
-            logger.info("Failed to log in to dashboard_v2_site bet site.")
+    def create_metrics(self):
+        metrics = self.metrics
+        self.fetch_seconds = metrics.histogram('scraper_fetch_seconds', 'Time to fetch a dashboard snapshot', ['source'])
+        self.fetch_bytes = metrics.counter('scraper_fetch_bytes_total',
+                                           'Response bytes received from the dashboards, after decompression',
+                                           ['source'])
+        self.fetch_transfer_bytes = metrics.counter('scraper_fetch_transfer_bytes_total',
+                                                    'Response bytes transferred from the dashboards, compressed',
+                                                    ['source'])
+        self.fetches = metrics.counter('scraper_fetches_total', 'Dashboard fetches by result', ['source', 'result'])
+        self.fetch_retries = metrics.counter('scraper_fetch_retries_total',
+                                             'Fetches retried after a connection error, timeout or 5xx', ['source'])
+        self.circuit_state = metrics.gauge('scraper_circuit_state',
+                                           'Circuit breaker of a dashboard, 0 closed, 1 half open, 2 open', ['source'])
+        self.decode_seconds = metrics.histogram('scraper_decode_seconds',
+                                                'Time to decode a snapshot and split it into routes', ['source'])
+        self.dashboard_bets = metrics.gauge('scraper_bets', 'Bets in the last snapshot of a dashboard',
+                                            ['source', 'dashboard'])
+        self.new_bets = metrics.counter('scraper_new_bets_total', 'New bets found per route', ['route'])
+        self.bet_changes = metrics.counter('scraper_bet_changes_total',
+                                           'Bets per route that are new, updated (sent as an edit) or removed',
+                                           ['route', 'change'])
+        self.cycle_new_bets = metrics.histogram('scraper_cycle_new_bets', 'New bets found per poll cycle',
+                                                buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000))
+        self.render_seconds = metrics.histogram('scraper_render_seconds', 'Time to render the new bets of a route',
+                                                ['route'])
+        self.cycle_seconds = metrics.histogram('scraper_cycle_seconds', 'Time from the start of a poll to its messages'
+                                               ' being queued', buckets=(0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+        self.poll_to_send_seconds = metrics.histogram(
+            'scraper_poll_to_send_seconds', 'Time from the start of a poll until its messages were sent',
+            buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0))
+        self.poll_interval = metrics.gauge('scraper_poll_interval_seconds', 'Current interval between polls')
+        self.dedup_entries = metrics.gauge('scraper_dedup_entries', 'Entries in the dedup maps', ['partition'])
+        self.dedup_evictions = metrics.counter('scraper_dedup_evictions_total',
+                                               'Entries evicted from the dedup maps, expired or over capacity',
+                                               ['partition', 'reason'])
+        metrics.gauge('scraper_delay_queue_depth', 'Messages held back by the delay scheduler').set_function(
+            lambda: len(self.delay_scheduler) if self.delay_scheduler is not None else 0)
+
+    def start_metrics(self, config):
+        if config.get('metrics_port') is not None:
+            self.metrics.serve(config['metrics_port'], config.get('metrics_host', '127.0.0.1'))
+
+    def write_metrics(self, config):
+        metrics_file = config.get('metrics_file')
+        if metrics_file:
+            try:
+                self.metrics.write(metrics_file)
+            except OSError as e:
+                logger.error(f"Failed to write metrics to {metrics_file}: {e}")
+
+    def restore_state(self, config):
+        self.state_store = StateStore(config.get('state_db_path', './integrations/scraper_state.sqlite3'))
+        self.bets_dict, placed_bets = self.state_store.load()
+        self.message_tracker = self.state_store.message_tracker
+        # the kickoff of restored entries is unknown, so they get the default ttl
+        self.placed_bets = self.create_expiring_dict("placed_bets")
+        self.placed_bets.update_from(placed_bets)
+
+    def configure_dedup(self, config):
+        self.dedup_max_entries = config.get('dedup_max_entries', self.dedup_max_entries)
+        self.dedup_ttl_seconds = config.get('dedup_ttl_seconds', self.dedup_ttl_seconds)
+        self.dedup_grace_seconds = config.get('dedup_grace_seconds', self.dedup_grace_seconds)
+        self.placed_bets.max_size = self.dedup_max_entries
+        self.placed_bets.default_ttl = self.dedup_ttl_seconds
+
+    def create_expiring_dict(self, partition):
+        return ExpiringDict(max_size=self.dedup_max_entries, default_ttl=self.dedup_ttl_seconds,
+                            on_evict=lambda reason, count: self.dedup_evictions.inc(count, partition=partition,
+                                                                                    reason=reason))
+
+    def get_bet_ttl(self, bet):
+        # keep the bet until its kickoff (as seen the first time) plus a grace period for the match itself
+        hours_to_start = bet.get('hours_to_start')
+        if hours_to_start is None:
+            return self.dedup_ttl_seconds
+        return max(0, hours_to_start) * 60 * 60 + self.dedup_grace_seconds
+
+    def get_expiring_partition(self, url):
+        # partitions restored from disk are plain dicts, they become expiring ones the first time they are used
+        partition = self.bets_dict.get(url)
+        if partition is not None and not isinstance(partition, ExpiringDict):
+            expiring_partition = self.create_expiring_dict(url)
+            expiring_partition.update_from(partition)
+            self.bets_dict[url] = expiring_partition
+            return expiring_partition
+        return partition
+
+    def expire_dedup_entries(self):
+        expiring_dicts = [("placed_bets", self.placed_bets)]
+        expiring_dicts += [(url, bets) for url, bets in self.bets_dict.items() if isinstance(bets, ExpiringDict)]
+        for name, expiring_dict in expiring_dicts:
+            evicted_expired = expiring_dict.expire()
+            if evicted_expired:
+                logger.info(f"Evicted {evicted_expired} expired entries from {name}, {len(expiring_dict)} left "
+                            f"({expiring_dict.evicted_expired} expired, {expiring_dict.evicted_capacity} over capacity in total)")
+
+    def get_routing_table(self, config):
+        if self.routes is None:
+            self.sources, self.routes = load_routing_table(config)
+            if config.get('shard_routes') is not None:
+                # a worker of the supervisor only handles its own routes and fetches only their sources
+                self.routes = [route for route in self.routes if route.name in config['shard_routes']]
+                used_sources = {route.source for route in self.routes}
+                self.sources = {name: source for name, source in self.sources.items() if name in used_sources}
+            for source in self.sources.values():
+                self.get_bet_site(source.name, config)
+        return self.sources, self.routes
+
+    def get_route(self, name, config):
+        _, routes = self.get_routing_table(config)
+        for route in routes:
+            if route.name == name:
+                return route
+        return None
+
+    def get_bet_site(self, source_name, config):
+        if source_name not in self.bet_sites:
+            self.bet_sites[source_name] = BetSite(source_name)
+        bet_site = self.bet_sites[source_name]
+        bet_site.timeout = (config.get('http_connect_timeout', 5), config.get('http_read_timeout', 30))
+        bet_site.max_retries = config.get('fetch_retries', bet_site.max_retries)
+        bet_site.retry_delay = config.get('fetch_retry_delay', bet_site.retry_delay)
+        bet_site.max_retry_delay = config.get('fetch_retry_max_delay', bet_site.max_retry_delay)
+        breaker = bet_site.breaker
+        breaker.failure_threshold = config.get('breaker_failure_threshold', breaker.failure_threshold)
+        breaker.min_reset_timeout = config.get('breaker_reset_timeout', breaker.min_reset_timeout)
+        breaker.max_reset_timeout = config.get('breaker_max_reset_timeout', breaker.max_reset_timeout)
+        if breaker.failures == 0:
+            breaker.reset_timeout = breaker.min_reset_timeout
+        self.circuit_state.set_function(breaker.state_value, source=source_name)
+        bet_site.session_refresh_margin = config.get('session_refresh_margin', bet_site.session_refresh_margin)
+        bet_site.session_lifetime = config.get('session_lifetime', bet_site.session_lifetime)
+        if config.get('record_responses_path'):
+            if self.response_recorder is None:
+                self.response_recorder = ResponseRecorder(config['record_responses_path'])
+            bet_site.recorder = self.response_recorder
+        return bet_site
+
+    def login_to_sources(self, config):
+        sources, _ = self.get_routing_table(config)
+        for source in sources.values():
+            if not source.login_url:
+                continue
+            if self.get_bet_site(source.name, config).login(source.username, source.password, source.login_url):
+                logger.info(f"Logged in successfully to {source.name} bet site!")
+            else:
+                logger.info(f"Failed to log in to {source.name} bet site.")
 
     async def periodic_task(self, config):
+        self.poll_scheduler = self.create_poll_scheduler(config)
+        self.drain_outbox(config)
+        self.session_refresher = asyncio.create_task(self.refresh_sessions(config))
         while True:
+            cycle_started = self.poll_scheduler.start_cycle()
             message_queues = await self.get_and_parse_data(config)
-            await self.send_data_to_bot(message_queues, config)
-            await asyncio.sleep(30)
+            self.schedule_send(message_queues, config, cycle_started)
+
+            new_bets_count = sum(len(message_queue) for message_queue in message_queues.values())
+            self.cycle_new_bets.observe(new_bets_count)
+            sleep_time = self.poll_scheduler.sleep_time(new_bets_count, self.min_hours_to_start)
+            self.cycle_seconds.observe(self.poll_scheduler.last_cycle_duration)
+            self.poll_interval.set(self.poll_scheduler.interval)
+            self.write_metrics(config)
+            logger.info(f"Poll found {new_bets_count} new bets, next poll in {self.poll_scheduler.interval:.1f}s "
+                        f"(cycle took {self.poll_scheduler.last_cycle_duration:.2f}s)")
+            await asyncio.sleep(sleep_time)
+
+    async def refresh_sessions(self, config):
+        # runs next to the polls for the whole lifetime of the scraper
+        while True:
+            await asyncio.sleep(await self.refresh_due_sessions(config))
+
+    async def refresh_due_sessions(self, config, check_interval=60):
+        """Logs in again to the sources whose session is about to expire, returns the seconds until the next one."""
+        sources, _ = self.get_routing_table(config)
+        waits = [check_interval]
+        for source in sources.values():
+            bet_site = self.get_bet_site(source.name, config)
+            wait = bet_site.seconds_until_refresh()
+            if wait is not None and wait <= 0:
+                await bet_site.refresh_session()
+                wait = bet_site.seconds_until_refresh()
+            if wait is not None:
+                waits.append(wait)
+        return max(1, min(waits))
+
+    def create_poll_scheduler(self, config):
+        return PollScheduler(
+            base_interval=config.get('poll_interval', 30),
+            min_interval=config.get('poll_min_interval', 5),
+            max_interval=config.get('poll_max_interval', 60),
+            kickoff_window_hours=config.get('poll_kickoff_window_hours', 1.0),
+            kickoff_interval=config.get('poll_kickoff_interval', 10)
+        )
+
+    def schedule_send(self, message_queues, config, cycle_started=None):
+        task = asyncio.create_task(self.send_and_record_latency(message_queues, config, cycle_started))
+        self.pending_sends.add(task)
+        task.add_done_callback(self.pending_sends.discard)
+        return task
+
+    async def send_and_record_latency(self, message_queues, config, cycle_started):
+        await self.send_data_to_bot(message_queues, config)
+        if cycle_started is not None and any(message_queues.values()):
+            latency = self.poll_scheduler.record_send_latency(cycle_started)
+            self.poll_to_send_seconds.observe(latency)
+            logger.info(f"Poll to send latency: {latency:.2f}s")
+            return latency
+        return None
+
+    def get_telegram_dispatcher(self, config):
+        if self.telegram_dispatcher is None:
+            self.telegram_dispatcher = TelegramDispatcher(
+                self.get_telegram_api(config),
+                chat_rate=config.get('telegram_chat_rate', 1.0),
+                chat_burst=config.get('telegram_chat_burst', 3),
+                global_rate=config.get('telegram_global_rate', 30.0),
+                global_burst=config.get('telegram_global_burst', 30),
+                max_rate_limited_retries=config.get('telegram_max_rate_limited_retries', 20),
+                metrics=self.metrics,
+                bucket_factory=self.get_bucket_factory(config)
+            )
+        return self.telegram_dispatcher
+
+    def get_bucket_factory(self, config):
+        if not config.get('shared_telegram_budget', False):
+            return None
+        # the workers of the supervisor send from separate processes but share the rate limits of one bot
+        path = config.get('telegram_budget_path', DEFAULT_BUDGET_PATH)
+        return lambda name, rate, capacity: SharedTokenBucket(name, rate, capacity, path)
+
+    def get_telegram_api(self, config):
+        if self.telegram_api is None:
+            self.telegram_api = TelegramApi(
+                config['bot_token'],
+                connect_timeout=config.get('http_connect_timeout', 5),
+                read_timeout=config.get('telegram_read_timeout', 15),
+                pool_size=config.get('telegram_pool_size', 10),
+                api_url=config.get('telegram_api_url', TELEGRAM_API_URL)
+            )
+        return self.telegram_api
 
     async def get_and_parse_data(self, config):
-        # now all of the data comes from the same site
-        # api now returns a field called dashboard_name, which we can use to separate the messages
-        # dashboard_name can be 'sing' or 'bet365'
+        # the routing table splits the data of each source by dashboard_name (and optional filters)
+        # into routes, by default 'sing', 'bet365' and 'bet365_clean' from the unified dashboard
+        sources, routes = self.get_routing_table(config)
+        message_queues = {route.name: [] for route in routes}
+
+        # sources are fetched concurrently and each one is processed as soon as its own data is there
+        source_names = list(dict.fromkeys(route.source for route in routes))
+        await asyncio.gather(*(
+            self.poll_source(sources[name], [route for route in routes if route.source == name], message_queues, config)
+            for name in source_names
+        ))
+
+        min_hours = [hours for hours in self.source_min_hours_to_start.values() if hours is not None]
+        self.min_hours_to_start = min(min_hours) if min_hours else None
+
+        self.expire_dedup_entries()
+        self.dedup_entries.set(len(self.placed_bets), partition="placed_bets")
+        for partition, bets in self.bets_dict.items():
+            self.dedup_entries.set(len(bets), partition=partition)
+
+        if self.state_store is not None:
+            # the messages go into the outbox in the same transaction as the dedup state that made them new
+            new_messages = [(route.name, route.chats, message_queues[route.name])
+                            for route in routes if message_queues[route.name]]
+            outbox_messages = self.state_store.save(self.bets_dict, self.placed_bets, new_messages)
+            for (route_name, _, _), messages in zip(new_messages, outbox_messages):
+                message_queues[route_name] = messages
 
-        message_queues = {"sing": [], "bet365": [], "bet365_clean": []}
+        return message_queues
 
-        # Fetch data from the new unified API endpoint
-        unified_api_url = config['get_data2_api_url']
-        unified_data_with_metadata = self.dashboard_v2_site.get_bets_data(unified_api_url)
-        if unified_data_with_metadata is None:
-            logger.error("Failed to fetch data from the unified API endpoint.")
-            return message_queues
+    async def poll_source(self, source, routes, message_queues, config):
+        bet_site = self.get_bet_site(source.name, config)
+        fetch_started = time.perf_counter()
+        data_with_metadata = await bet_site.fetch_bets_data(source.api_url)
+        self.fetch_seconds.observe(time.perf_counter() - fetch_started, source=source.name)
+        self.record_fetch_bytes(source, bet_site)
+        self.fetch_retries.inc(bet_site.retry_counts.pop(source.api_url, 0), source=source.name)
+        if data_with_metadata is CIRCUIT_OPEN:
+            # the dashboard is down, the breaker lets a probe through once its timeout has passed
+            self.fetches.inc(source=source.name, result="circuit_open")
+            return
+        if data_with_metadata is None:
+            self.fetches.inc(source=source.name, result="failed")
+            logger.error(f"Failed to fetch data from the {source.name} API endpoint.")
+            return
+        if data_with_metadata is NOT_MODIFIED:
+            self.fetches.inc(source=source.name, result="not_modified")
+            # nothing changed since the last poll, so there can't be any new bets
+            return
+        self.fetches.inc(source=source.name, result="ok")
 
-        unified_data = json.loads(unified_data_with_metadata['data'])
+        if config.get('columnar_batches', False):
+            self.process_source_table(source, routes, message_queues, data_with_metadata['data'])
+            return
 
-        sing_data = []
-        bet365_data = []
-        # Process the data based on 'dashboard_name'
-        for bet_line in unified_data:
+        decode_started = time.perf_counter()
+        route_data = {route.name: [] for route in routes}
+        dashboard_counts = {}
+        min_hours_to_start = None
+        # bets are decoded one at a time straight into the routes they match
+        for bet_line in iter_bets(data_with_metadata['data']):
+            hours_to_start = bet_line.get('hours_to_start')
+            # a bet of a game that already started stays on the dashboard for a while, it isn't close to kickoff
+            if hours_to_start is not None and hours_to_start >= 0 and (
+                    min_hours_to_start is None or hours_to_start < min_hours_to_start):
+                min_hours_to_start = hours_to_start
             dashboard_name = bet_line.get('dashboard_name', '').lower()
-            if dashboard_name == 'sing':
-                sing_data.append(bet_line)
-
-            if dashboard_name == 'bet365':
-                bet365_data.append(bet_line)
-
-        # ORIGINAL SING SITE SCRAPING
-        # logger.info(f"sing elements in list: {len(sing_data)}")
-        new_bets = self.get_new_bets("sing_bets", sing_data)
-        sing_message_queue = self.process_new_bets(new_bets, "Sing")
-        message_queues["sing"] = sing_message_queue
-
-        # ORIGINAL BET365 SITE SCRAPING
-        # logger.info(f"bet365 elements in list: {len(bet365_data)}")
-        new_bets = self.get_new_bets("bet365_bets", bet365_data)
-        bet365_message_queue = self.process_new_bets(new_bets, "Bet365")
-        message_queues["bet365"] = bet365_message_queue
-
-        # SPECIAL BET365 SITE SCRAPING (1 second delay)
-        bet365_clean_new_bets = self.get_new_bets_based_on_uuid("bet365_clean", bet365_data)
-        bet365_message_queue = self.process_new_bets_clean(bet365_clean_new_bets, "Bet365")
-        message_queues["bet365_clean"] = bet365_message_queue
-
-        # clean bets that are older than 1 hour for bet365_clean
-        current_time = time.time()
-        if current_time - self.bet365_last_updated >= 1 * 60 * 60:
-            self.bet365_last_updated = current_time
-            self.bets_dict["bet365_clean"] = {}
+            dashboard_counts[dashboard_name] = dashboard_counts.get(dashboard_name, 0) + 1
+            for route in routes:
+                if route.matches(bet_line, dashboard_name):
+                    route_data[route.name].append(bet_line)
+        self.source_min_hours_to_start[source.name] = min_hours_to_start
+        self.decode_seconds.observe(time.perf_counter() - decode_started, source=source.name)
+        self.record_dashboard_bets(source, dashboard_counts)
+
+        for route in routes:
+            message_queues[route.name] = self.process_route(route, route_data[route.name])
+
+    def record_fetch_bytes(self, source, bet_site):
+        size = bet_site.response_sizes.pop(source.api_url, 0)
+        transfer_size = bet_site.transfer_sizes.pop(source.api_url, size)
+        self.fetch_bytes.inc(size, source=source.name)
+        self.fetch_transfer_bytes.inc(transfer_size, source=source.name)
+        if size:
+            logger.info(f"Fetched {size / 1024:.1f}kB from {source.name}, {transfer_size / 1024:.1f}kB transferred "
+                        f"({size / max(transfer_size, 1):.1f}x compression)")
+
+    def process_source_table(self, source, routes, message_queues, payload):
+        # the columnar path, the whole snapshot is loaded into a BetTable and every route works on its columns
+        decode_started = time.perf_counter()
+        table = BetTable(decode_bets(payload))
+        self.source_min_hours_to_start[source.name] = table.min_hours_to_start()
+        route_tables = table.partition(routes)
+        self.decode_seconds.observe(time.perf_counter() - decode_started, source=source.name)
+
+        dashboard_counts = {}
+        for dashboard_name in table.dashboard_names:
+            dashboard_counts[dashboard_name] = dashboard_counts.get(dashboard_name, 0) + 1
+        self.record_dashboard_bets(source, dashboard_counts)
+        for route in routes:
+            message_queues[route.name] = self.process_route_table(route, route_tables[route.name])
+
+    def record_dashboard_bets(self, source, dashboard_counts):
+        # dashboards that disappeared from the snapshot drop to 0 instead of keeping their last count
+        for label_values in list(self.dashboard_bets.values):
+            if label_values[0] == source.name and label_values[1] not in dashboard_counts:
+                self.dashboard_bets.set(0, source=source.name, dashboard=label_values[1])
+        for dashboard_name, count in dashboard_counts.items():
+            self.dashboard_bets.set(count, source=source.name, dashboard=dashboard_name)
+
+    def process_route(self, route, data):
+        if route.dedup == "uuid":
+            new_bets = self.get_new_bets_based_on_uuid(route.partition, data)
+        else:
+            new_bets = self.get_new_bets(route.partition, data)
+        self.track_changes(route, new_bets, [bet['uuid'] for bet in data])
+        return self.render_route(route, new_bets)
 
-        return message_queues
+    def process_route_table(self, route, table):
+        if route.dedup == "uuid":
+            new_bets = self.get_new_bets_from_table_based_on_uuid(route.partition, table)
+        else:
+            new_bets = self.get_new_bets_from_table(route.partition, table)
+        self.track_changes(route, new_bets, table.uuids)
+        return self.render_route(route, new_bets)
+
+    def track_changes(self, route, new_bets, uuids):
+        # a new bet whose uuid was sent before is a changed bet, it edits its message instead of a new post.
+        # bets that are gone from the snapshot are forgotten, if they come back they are posted again
+        if not route.edit_updates:
+            self.bet_changes.inc(len(new_bets), route=route.name, change="new")
+            return
+        sent_uuids = self.message_tracker.uuids(route.name)
+        updated = sum(1 for bet in new_bets if bet['uuid'] in sent_uuids)
+        removed = self.message_tracker.forget_missing(route.name, uuids)
+        self.bet_changes.inc(len(new_bets) - updated, route=route.name, change="new")
+        self.bet_changes.inc(updated, route=route.name, change="updated")
+        self.bet_changes.inc(len(removed), route=route.name, change="removed")
+
+    def render_route(self, route, new_bets):
+        self.new_bets.inc(len(new_bets), route=route.name)
+        render_started = time.perf_counter()
+        if route.renderer == "clean":
+            messages = self.process_new_bets_clean(new_bets, route.page_name)
+        else:
+            messages = self.process_new_bets(new_bets, route.page_name)
+        self.render_seconds.observe(time.perf_counter() - render_started, route=route.name)
+        if route.edit_updates:
+            messages = [TrackedMessage(message, bet['uuid']) for message, bet in zip(messages, new_bets)]
+        return messages
 
     async def send_data_to_bot(self, message_queues, config):
-        telegram_url = f"https://api.telegram.org/bot{config['bot_token']}/sendMessage"
-        current_time = time.time()
-
         if not message_queues:
             return
 
-        if "sing" in message_queues:
-            message_queue = message_queues["sing"]
-            for message in message_queue:
-                payload = {
-                    'chat_id': config['chat_sing_id'],
-                    'text': message,
-                    'parse_mode': 'MarkdownV2'
-                }
-                response = requests.post(telegram_url, data=payload)
-                # logger.info(response.text)
-
-        if "bet365" in message_queues:
-            message_queue = message_queues["bet365"]
-            for message in message_queue:
-                payload = {
-                    'chat_id': config['chat_bet365_id'],
-                    'text': message,
-                    'parse_mode': 'MarkdownV2'
-                }
-                response = requests.post(telegram_url, data=payload)
-                # logger.info(response.text)
-
-        # Handle 'bet365_clean' queue with a delay
-        if "bet365_clean" in message_queues:
-            for message in message_queues["bet365_clean"]:
-                # Add each message to the delay queue with its own timestamp
-                self.clean_delay_queue[message] = current_time
-
-        # Check the delay queue and send messages older than 1 second
-        for message, message_time in list(self.clean_delay_queue.items()):
-            if current_time - message_time >= 1:  # 1 seconds
-                payload = {
-                    'chat_id': config['chat_bet365_clean_id'],
-                    'text': message,
-                    'parse_mode': 'MarkdownV2'
-                }
-                # check if clean_message_count.txt has a number or if clean_message_count is > 0, then send a message
-                self.clean_message_count = self.get_clean_message_count()
-                if self.clean_message_count > 0:
-                    self.clean_message_count = self.clean_message_count - 1
-                    response = requests.post(telegram_url, data=payload)
-                    if self.clean_message_count == 0:
-                        end_payload = {
-                            'chat_id': config['chat_bet365_clean_id'],
-                            'text': 'All messages sent\n',
-                            'parse_mode': 'MarkdownV2'
-                        }
-                        requests.post(telegram_url, data=end_payload)
-                # Remove the message from the queue after sending
-                del self.clean_delay_queue[message]
-
-    def get_clean_message_count(self):
-        if self.clean_message_count <= 0:
-            try:
-                with open('./clean_message_count.txt', 'r') as f:
-                    clean_message_count = int(f.read())
-            except Exception as e:
-                clean_message_count = 0
-            finally:
-                # delete file if exists
-                try:
-                    os.remove('./clean_message_count.txt')
-                except Exception as e:
-                    pass
+        dispatcher = self.get_telegram_dispatcher(config)
+        deliveries = self.dispatch_queued_messages(dispatcher, message_queues, config)
+        if deliveries:
+            await asyncio.gather(*deliveries)
+            logger.info(f"Telegram dispatcher: {dispatcher.stats()}")
+        # the acknowledgements of the whole cycle are written in one transaction
+        if self.state_store is not None:
+            self.state_store.flush()
+
+    def dispatch_queued_messages(self, dispatcher, message_queues, config):
+        # everything is queued without awaiting in between, so the messages of one cycle stay in order per chat
+        deliveries = []
+        for destination, messages in message_queues.items():
+            if not messages:
+                continue
+            route = self.get_route(destination, config)
+            if route is None:
+                logger.warning(f"No route configured for {destination}, dropping {len(messages)} messages")
+                continue
+            if route.delay > 0:
+                delay_scheduler = self.get_delay_scheduler(config)
+                for message in messages:
+                    delay_scheduler.schedule((destination, message), route.delay)
+            else:
+                deliveries += self.dispatch_messages(dispatcher, route, messages, config)
+        return deliveries
+
+    def dispatch_messages(self, dispatcher, route, messages, config, chats=None):
+        chats = route.chats if chats is None else chats
+        end_message = None
+        if route.counter is not None:
+            messages, remaining = self.take_from_counter(route, messages, chats, config)
+            if messages and remaining == 0:
+                end_message = 'All messages sent\n'
+
+        # with a counter the count is per bet, batching only changes how many telegram messages carry them
+        if route.batch:
+            groups = pack_message_groups(messages)
         else:
-            clean_message_count = self.clean_message_count
-        return clean_message_count
+            groups = [[message] for message in messages]
+        deliveries = []
+        for chat_id in chats:
+            for group in groups:
+                delivery = dispatcher.enqueue(chat_id, MESSAGE_SEPARATOR.join(group),
+                                              edit_message_id=self.get_edit_message_id(route, group, chat_id))
+                if self.state_store is not None or route.edit_updates:
+                    delivery.add_done_callback(functools.partial(self.acknowledge_delivery, route, group, chat_id))
+                deliveries.append(delivery)
+            if end_message is not None:
+                deliveries.append(dispatcher.enqueue(chat_id, end_message))
+        return deliveries
+
+    def take_from_counter(self, route, messages, chats, config):
+        # one atomic take for all due messages instead of a file read per message, messages over the count are dropped.
+        # messages resent from the outbox were taken from the counter before the restart already.
+        # take() stays on the event loop, unlike the bot's set(): it is one short transaction per route and cycle
+        # on a local WAL file, the bot only ever holds the write lock for a single upsert, and awaiting a thread
+        # here would let other routes queue their messages in between and break the order of a cycle
+        to_count = [message for message in messages if not getattr(message, 'counted', False)]
+        taken, remaining = self.get_shared_counter(route.counter, config).take(len(to_count))
+        kept_messages = []
+        for message in messages:
+            if getattr(message, 'counted', False):
+                kept_messages.append(message)
+            elif taken > 0:
+                taken -= 1
+                kept_messages.append(message)
+                if self.state_store is not None:
+                    self.state_store.outbox.mark_counted(message)
+            elif self.state_store is not None:
+                # dropped for good, it must not come back from the outbox after a restart
+                for chat_id in chats:
+                    self.state_store.outbox.acknowledge(message, chat_id)
+        return kept_messages, remaining
+
+    def get_edit_message_id(self, route, group, chat_id):
+        # looked up when the message is queued, an update of a bet whose first message is not answered yet
+        # is posted as a new message
+        bet_uuid = getattr(group[0], 'bet_uuid', None)
+        if not route.edit_updates or bet_uuid is None:
+            return None
+        return self.message_tracker.message_id(route.name, bet_uuid, chat_id)
+
+    def acknowledge_delivery(self, route, group, chat_id, delivery):
+        if delivery.cancelled() or delivery.exception() is not None:
+            return
+        response = delivery.result()
+        if response is None:
+            # the dispatcher gave up, the message stays in the outbox and is sent again after a restart
+            return
+        if route.edit_updates:
+            if self.is_edit_target_gone(response):
+                self.repost(route, group, chat_id)
+                return
+            self.track_message(route, group[0], chat_id, response)
+        if self.state_store is None:
+            return
+        # anything but 200 here was rejected by telegram (bad markdown, bot removed from the chat) and would be
+        # rejected again, so it leaves the outbox as well
+        for message in group:
+            self.state_store.outbox.acknowledge(message, chat_id)
+
+    def track_message(self, route, message, chat_id, response):
+        bet_uuid = getattr(message, 'bet_uuid', None)
+        if bet_uuid is None:
+            return
+        if response.status_code == 200:
+            message_id = self.get_message_id(response)
+            if message_id is not None:
+                self.message_tracker.remember(route.name, bet_uuid, chat_id, message_id)
+
+    def is_edit_target_gone(self, response):
+        return response.status_code == 400 and 'message to edit not found' in response.text
+
+    def repost(self, route, group, chat_id):
+        # the message was deleted from the chat, the update is posted as a new one and its id replaces the old.
+        # it stays in the outbox until the new message is acknowledged
+        bet_uuid = getattr(group[0], 'bet_uuid', None)
+        if bet_uuid is not None:
+            self.message_tracker.forget(route.name, bet_uuid, chat_id)
+        delivery = self.telegram_dispatcher.enqueue(chat_id, MESSAGE_SEPARATOR.join(group))
+        delivery.add_done_callback(functools.partial(self.acknowledge_delivery, route, group, chat_id))
+
+    def get_message_id(self, response):
+        try:
+            message_id = response.json()['result']['message_id']
+        except (ValueError, KeyError, TypeError):
+            return None
+        return message_id if isinstance(message_id, int) else None
+
+    def drain_outbox(self, config):
+        """Sends the messages the last run did not get acknowledged, before anything new is queued."""
+        if self.state_store is None:
+            return None
+        pending = self.state_store.outbox.pending()
+        if not pending:
+            return None
+        logger.info(f"Resending {len(pending)} messages from the outbox")
+
+        messages_by_destination = {}
+        for route_name, message, chats in pending:
+            messages_by_destination.setdefault((route_name, tuple(chats)), []).append(message)
+        dispatcher = self.get_telegram_dispatcher(config)
+        deliveries = []
+        for (route_name, chats), messages in messages_by_destination.items():
+            # a route removed from the config since still gets its messages, to the chats they were meant for
+            route = self.get_route(route_name, config) or Route(route_name, DEFAULT_SOURCE)
+            deliveries += self.dispatch_messages(dispatcher, route, messages, config, chats=list(chats))
+
+        task = asyncio.create_task(self.finish_drain(deliveries))
+        self.pending_sends.add(task)
+        task.add_done_callback(self.pending_sends.discard)
+        return task
+
+    async def finish_drain(self, deliveries):
+        await asyncio.gather(*deliveries, return_exceptions=True)
+        self.state_store.flush()
+
+    def release_delayed_messages(self, items, config):
+        messages_by_destination = {}
+        for destination, message in items:
+            messages_by_destination.setdefault(destination, []).append(message)
+        dispatcher = self.get_telegram_dispatcher(config)
+        for destination, messages in messages_by_destination.items():
+            self.dispatch_messages(dispatcher, self.get_route(destination, config), messages, config)
+
+    def get_delay_scheduler(self, config):
+        if self.delay_scheduler is None:
+            self.delay_scheduler = DelayScheduler(lambda items: self.release_delayed_messages(items, config))
+        return self.delay_scheduler
+
+    def get_shared_counter(self, name, config):
+        if name not in self.shared_counters:
+            self.shared_counters[name] = SharedCounter(name, config.get('clean_counter_path', DEFAULT_COUNTER_PATH))
+        return self.shared_counters[name]
 
     def check_bet_for_placed_and_add_to_dict(self, bet):
         if bet['placed_count'] > 0:
             if bet['uuid'] not in self.placed_bets:
-                self.placed_bets[bet['uuid']] = bet
+                self.placed_bets.add(bet['uuid'], bet, self.get_bet_ttl(bet))
                 # logger.info(f"Placed bet: {bet['uuid']}")
 
     def get_new_bets(self, url, data):
@@ -206,60 +686,53 @@ class Scraper:
     def get_new_bets_based_on_uuid(self, url, data):
         new_bets = []
 
-        parsed_bets = {}
-        for item in data:
-            parsed_bets[item['uuid']] = item
+        first_poll = url not in self.bets_dict
+        if first_poll:
+            self.bets_dict[url] = self.create_expiring_dict(url)
+        seen_bets = self.get_expiring_partition(url)
 
-        if url not in self.bets_dict:
-            self.bets_dict[url] = parsed_bets
-            old_parsed_bets = self.bets_dict[url]
-        else:
-            old_parsed_bets = self.bets_dict[url]
-            for key, value in parsed_bets.items():
-                if key not in old_parsed_bets:
-                    new_bets.append(value)
+        for item in data:
+            if item['uuid'] in seen_bets:
+                continue
+            if not first_poll:
+                new_bets.append(item)
+            # the expiry is set when the bet is first seen and is not refreshed by later polls
+            seen_bets.add(item['uuid'], item, self.get_bet_ttl(item))
 
-        # append to the dict
-        old_parsed_bets.update(parsed_bets)
-        self.bets_dict[url] = old_parsed_bets
         return new_bets
 
+    def get_new_bets_from_table(self, url, table):
+        # same as get_new_bets, with the dedup done as a set difference of the digest columns
+        for uuid, bet in table.placed_rows(self.placed_bets).items():
+            self.placed_bets.add(uuid, bet, self.get_bet_ttl(bet))
+
+        first_poll = url not in self.bets_dict
+        parsed_bets, new_bets = table.new_rows_by_digest(self.bets_dict.get(url, {}))
+        self.bets_dict[url] = parsed_bets
+        return [] if first_poll else new_bets
+
+    def get_new_bets_from_table_based_on_uuid(self, url, table):
+        first_poll = url not in self.bets_dict
+        if first_poll:
+            self.bets_dict[url] = self.create_expiring_dict(url)
+        seen_bets = self.get_expiring_partition(url)
+
+        unseen_bets = table.unseen_rows_by_uuid(seen_bets)
+        for uuid, bet in unseen_bets.items():
+            seen_bets.add(uuid, bet, self.get_bet_ttl(bet))
+        return [] if first_poll else list(unseen_bets.values())
+
     def process_new_bets(self, new_bets, page_name):
         formatted_bets = []
         for bet in new_bets:
-            model = PrintModel(
-                page_name=page_name,
-                hours_to_start=bet['hours_to_start'],
-                league=bet['league'],
-                home_team=bet['home_team'],
-                away_team=bet['away_team'],
-                bet_type=bet['bet_type'],
-                mod=bet['mod'],
-                price=bet['price'],
-                bet_class=bet['bet_class'],
-                placed_count=bet['placed_count'],
-                placed_price=self.get_placed_price(bet['uuid'])
-            )
-            formatted_bets.append(model.get_markdown())
+            formatted_bets.append(self.render_cache.render(bet, page_name, bet['placed_count'],
+                                                           self.get_placed_price(bet['uuid'])))
         return formatted_bets
 
     def process_new_bets_clean(self, new_bets, page_name):
         formatted_bets = []
         for bet in new_bets:
-            model = PrintModel(
-                page_name=page_name,
-                hours_to_start=bet['hours_to_start'],
-                league=bet['league'],
-                home_team=bet['home_team'],
-                away_team=bet['away_team'],
-                bet_type=bet['bet_type'],
-                mod=bet['mod'],
-                price=bet['price'],
-                bet_class=bet['bet_class'],
-                placed_count=0,
-                placed_price="No Price"
-            )
-            formatted_bets.append(model.get_markdown())
+            formatted_bets.append(self.render_cache.render(bet, page_name, 0, "No Price"))
         return formatted_bets
 
     def get_placed_price(self, uuid):
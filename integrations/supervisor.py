@@ -0,0 +1,204 @@
+import json
+import logging
+import multiprocessing
+import os
+import re
+import signal
+import sqlite3
+import time
+
+import yaml
+
+from integrations.helpers.routing import load_routing_table, plan_shards, shared_endpoints
+from integrations.helpers.state_store import StateStore
+from integrations.scraper import Scraper
+
+loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+logging.basicConfig(level=logging.INFO, format=loggingFormat)
+logging.getLogger('telethon').setLevel(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+# config keys holding a file path, every worker gets its own file next to the configured one
+PER_WORKER_PATHS = {'state_db_path': './integrations/scraper_state.sqlite3', 'metrics_file': None,
+                    'record_responses_path': None}
+
+
+def shard_path(path, shard_name):
+    root, extension = os.path.splitext(path)
+    if extension in ('.gz',):
+        # keep double extensions like .jsonl.gz together
+        root, inner_extension = os.path.splitext(root)
+        extension = inner_extension + extension
+    return f"{root}.{re.sub(r'[^A-Za-z0-9_-]', '_', shard_name)}{extension}"
+
+
+def worker_config(config, shard_name, route_names, index):
+    config = dict(config)
+    config['shard_name'] = shard_name
+    config['shard_routes'] = route_names
+    config['shared_telegram_budget'] = True
+    for key, default in PER_WORKER_PATHS.items():
+        path = config.get(key, default)
+        if path:
+            config[key] = shard_path(path, shard_name)
+    if config.get('metrics_port') is not None:
+        config['metrics_port'] = config['metrics_port'] + index
+    return config
+
+
+def migrate_shared_state(path, shards, routes):
+    """Moves the state of a single process scraper into the state dbs of the shards that don't have one yet.
+
+    The dedup keys and sent message ids of a route go to the shard of the route, the placed bets to every shard.
+    Pending outbox messages are moved, so only their shard sends them. The ones of routes that are not in any
+    shard anymore go to the first shard.
+    """
+    if not os.path.exists(path):
+        return []
+    route_partitions = {route.name: route.partition for route in routes}
+    assigned_routes = {name for route_names in shards.values() for name in route_names}
+    # also brings an old db up to the current schema
+    StateStore(path).close()
+    migrated = []
+    for index, (shard_name, route_names) in enumerate(shards.items()):
+        shard_state_path = shard_path(path, shard_name)
+        if os.path.exists(shard_state_path):
+            continue
+        StateStore(shard_state_path).close()
+        connection = sqlite3.connect(shard_state_path)
+        try:
+            connection.execute("ATTACH DATABASE ? AS shared", (path,))
+            outbox_routes = list(route_names)
+            if index == 0:
+                outbox_routes += [route_name for (route_name,) in connection.execute(
+                    "SELECT DISTINCT route FROM shared.outbox_messages") if route_name not in assigned_routes]
+            partitions = json.dumps([route_partitions[name] for name in route_names if name in route_partitions])
+            with connection:
+                connection.execute("INSERT OR IGNORE INTO partitions SELECT name FROM shared.partitions "
+                                   "WHERE name IN (SELECT value FROM json_each(?))", (partitions,))
+                connection.execute("INSERT OR IGNORE INTO dedup_keys SELECT partition, key FROM shared.dedup_keys "
+                                   "WHERE partition IN (SELECT value FROM json_each(?))", (partitions,))
+                connection.execute("INSERT OR IGNORE INTO placed_bets SELECT uuid, bet FROM shared.placed_bets")
+                connection.execute("INSERT OR IGNORE INTO sent_messages SELECT route, uuid, chat_id, message_id "
+                                   "FROM shared.sent_messages WHERE route IN (SELECT value FROM json_each(?))",
+                                   (json.dumps(route_names),))
+                moved_ids = ("SELECT id FROM shared.outbox_messages "
+                             "WHERE route IN (SELECT value FROM json_each(?))")
+                arguments = (json.dumps(outbox_routes),)
+                connection.execute("INSERT INTO outbox_messages (id, route, text, created_at, counted, bet_uuid) "
+                                   "SELECT id, route, text, created_at, counted, bet_uuid FROM shared.outbox_messages "
+                                   f"WHERE id IN ({moved_ids})", arguments)
+                connection.execute("INSERT INTO outbox_pending SELECT message_id, chat_id FROM shared.outbox_pending "
+                                   f"WHERE message_id IN ({moved_ids})", arguments)
+                connection.execute(f"DELETE FROM shared.outbox_pending WHERE message_id IN ({moved_ids})", arguments)
+                connection.execute(f"DELETE FROM shared.outbox_messages WHERE id IN ({moved_ids})", arguments)
+        finally:
+            connection.close()
+        logger.info(f"Moved the state of routes {route_names} from {path} to {shard_state_path}")
+        migrated.append(shard_name)
+    return migrated
+
+
+def run_worker(config):
+    Scraper().run(config)
+
+
+class Worker:
+    def __init__(self, shard_name, config, restart_delay):
+        self.shard_name = shard_name
+        self.config = config
+        self.process = None
+        self.started_at = None
+        self.restart_at = None
+        self.restart_delay = restart_delay
+        self.restarts = 0
+
+
+class Supervisor:
+    """Runs the routes of the scraper in several worker processes and restarts the ones that die.
+
+    Every worker has its own dedup state and outbox, the telegram rate limits are shared between them through
+    SharedTokenBucket, so together they still stay within the limits of the one bot. The state of a single
+    process scraper is moved into the state dbs of the workers the first time they run, see migrate_shared_state.
+    """
+
+    def __init__(self, config, target=run_worker, restart_delay=1, max_restart_delay=60, stable_after=60,
+                 check_interval=1):
+        self.target = target
+        self.min_restart_delay = restart_delay
+        self.max_restart_delay = max_restart_delay
+        self.stable_after = stable_after
+        self.check_interval = check_interval
+        self.running = False
+        self.state_db_path = config.get('state_db_path', PER_WORKER_PATHS['state_db_path'])
+        sources, self.routes = load_routing_table(config)
+        self.shards = plan_shards(sources, self.routes, config)
+        for api_url, shard_names in shared_endpoints(sources, self.routes, self.shards).items():
+            logger.warning(f"Shards {shard_names} all fetch {api_url}, every one of them logs in and polls it on its "
+                           f"own. Use shard_by: source to fetch it once")
+        if len(self.shards) == 1:
+            logger.info("All routes run in a single worker, shard_by: dashboard or shards in creds.yml split them")
+        self.workers = {
+            shard_name: Worker(shard_name, worker_config(config, shard_name, route_names, index), restart_delay)
+            for index, (shard_name, route_names) in enumerate(self.shards.items())
+        }
+
+    def start_worker(self, worker):
+        worker.process = multiprocessing.Process(target=self.target, args=(worker.config,),
+                                                 name=f"scraper-{worker.shard_name}", daemon=True)
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        worker.restart_at = None
+        logger.info(f"Started worker {worker.shard_name} (pid {worker.process.pid}) "
+                    f"for routes {worker.config['shard_routes']}")
+
+    def check_workers(self):
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if worker.process is None or worker.process.is_alive():
+                continue
+            if worker.restart_at is None:
+                # a worker that ran for a while gets restarted quickly again, one that keeps dying backs off
+                if now - worker.started_at >= self.stable_after:
+                    worker.restart_delay = self.min_restart_delay
+                worker.restart_at = now + worker.restart_delay
+                logger.error(f"Worker {worker.shard_name} exited with code {worker.process.exitcode}, "
+                             f"restarting in {worker.restart_delay}s")
+                worker.restart_delay = min(self.max_restart_delay, worker.restart_delay * 2)
+            elif now >= worker.restart_at:
+                worker.restarts += 1
+                self.start_worker(worker)
+
+    def run(self):
+        self.running = True
+        signal.signal(signal.SIGTERM, lambda signum, frame: self.request_stop())
+        try:
+            migrate_shared_state(self.state_db_path, self.shards, self.routes)
+            for worker in self.workers.values():
+                self.start_worker(worker)
+            while self.running:
+                time.sleep(self.check_interval)
+                self.check_workers()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
+
+    def request_stop(self):
+        self.running = False
+
+    def stop(self):
+        for worker in self.workers.values():
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in self.workers.values():
+            if worker.process is not None:
+                worker.process.join(timeout=10)
+                if worker.process.is_alive():
+                    worker.process.kill()
+
+
+def start_supervisor():
+    with open('./integrations/creds.yml', 'rb') as f:
+        config = yaml.safe_load(f)
+    Supervisor(config).run()
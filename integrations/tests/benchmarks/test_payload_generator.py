@@ -0,0 +1,40 @@
+import json
+import unittest
+
+from integrations.benchmarks.payload_generator import BET_TYPES_BY_CLASS, PayloadGenerator
+from integrations.benchmarks.scraper_benchmark import render_markdown, run
+from integrations.print_model import ERROR_PAGE_NAME
+
+
+class TestPayloadGenerator(unittest.TestCase):
+    def test_generates_every_bet_class_and_renderable_bets(self):
+        generator = PayloadGenerator(2000)
+
+        self.assertEqual({bet['bet_class'] for bet in generator.bets}, set(BET_TYPES_BY_CLASS))
+        self.assertEqual({bet['dashboard_name'] for bet in generator.bets}, {'Sing', 'bet365'})
+        self.assertEqual(json.loads(generator.payload()['data']), generator.bets)
+        for bet in generator.bets:
+            self.assertFalse(render_markdown(bet).startswith(f"__{ERROR_PAGE_NAME}"))
+
+    def test_churn_changes_prices_and_replaces_bets(self):
+        generator = PayloadGenerator(1000, churn=0.1)
+        before = list(generator.bets)
+
+        after = generator.next_snapshot()
+
+        changed = [(old, new) for old, new in zip(before, after) if old != new]
+        self.assertEqual(len(changed), 100)
+        self.assertTrue(any(old['uuid'] == new['uuid'] for old, new in changed))
+        self.assertTrue(any(old['uuid'] != new['uuid'] for old, new in changed))
+
+    def test_run_reports_every_benchmark(self):
+        results = run(sizes=[200], trace_memory=False)
+
+        self.assertEqual(set(results['results']['200']), {
+            "compute_bet_model_hash", "get_new_bets", "get_new_bets_based_on_uuid", "print_model_get_markdown",
+            "escape", "get_and_parse_data", "get_and_parse_data_columnar"})
+        self.assertGreater(results['results']['200']['get_new_bets']['items_per_second'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import json
+import os
+import tempfile
+import unittest
+
+from integrations.benchmarks.replay import ReplaySession, build_response, replay
+from integrations.helpers.response_log import ResponseRecorder
+
+
+class TestReplay(unittest.TestCase):
+    def setUp(self):
+        with open('./integrations/test_data.json', 'rb') as f:
+            self.bets = [dict(bet, dashboard_name="Sing") for bet in json.loads(json.loads(f.read())['data'])]
+
+    def test_session_waits_for_the_recorded_time(self):
+        now = [0.0]
+        sleeps = []
+
+        def sleep(seconds):
+            sleeps.append(seconds)
+            now[0] += seconds
+
+        records = [{'t': 1000.0, 'url': "a", 'status': 200, 'headers': {}, 'body': "{}"},
+                   {'t': 1030.0, 'url': "a", 'status': 200, 'headers': {}, 'body': "{}"}]
+        session = ReplaySession(records, speed=10, clock=lambda: now[0], sleep=sleep)
+
+        session.get("a")
+        session.get("a")
+
+        self.assertEqual(sleeps, [3.0])
+        self.assertTrue(session.finished())
+        self.assertEqual(session.get("a").status_code, 304)
+
+    def test_replay_sends_the_recorded_bets_to_the_stub(self):
+        snapshots = [self.bets[:5], self.bets[:5], self.bets]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'responses.jsonl.gz')
+            clock = iter([0.0, 30.0, 60.0])
+            recorder = ResponseRecorder(path, clock=lambda: next(clock))
+            for snapshot in snapshots:
+                body = json.dumps({"data": json.dumps(snapshot)})
+                recorder.record("https://dashboard.example.com/api", build_response("", 200, {}, body))
+
+            config = {"get_data2_api_url": "https://dashboard.example.com/api", "chat_sing_id": 1,
+                      "telegram_chat_rate": 1000.0, "telegram_chat_burst": 100}
+            report = replay(path, config, speed=0)
+
+        self.assertEqual(report["records"], 3)
+        self.assertEqual(report["cycles"], 3)
+        # the second snapshot has the same bytes as the first, the third adds six bets
+        self.assertEqual(report["new_bets"]["sing"], 6)
+        self.assertEqual(report["messages_by_chat"], {"1": 6})
+        self.assertEqual(report["telegram"]["sent"], 6)
+
+    def test_expired_session_in_the_recording_logs_in_again(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'responses.jsonl.gz')
+            clock = iter([0.0, 30.0, 31.0])
+            recorder = ResponseRecorder(path, clock=lambda: next(clock))
+            url = "https://dashboard.example.com/api"
+            recorder.record(url, build_response("", 200, {}, json.dumps({"data": json.dumps(self.bets[:5])})))
+            recorder.record(url, build_response("", 401, {}, "Unauthorized"))
+            recorder.record(url, build_response("", 200, {}, json.dumps({"data": json.dumps(self.bets)})))
+
+            config = {"get_data2_api_url": url, "get_data2_login_url": "https://dashboard.example.com/login",
+                      "chat_sing_id": 1, "telegram_chat_rate": 1000.0, "telegram_chat_burst": 100}
+            report = replay(path, config, speed=0)
+
+        self.assertEqual((report["records"], report["cycles"], report["logins"]), (3, 2, 1))
+        self.assertEqual(report["new_bets"]["sing"], 6)
+
+
+if __name__ == '__main__':
+    unittest.main()
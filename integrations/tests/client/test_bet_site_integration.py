@@ -1,7 +1,22 @@
+import asyncio
+import gzip
+import io
+import json
+import time
 import unittest
 from unittest.mock import patch, Mock
 
-from integrations.client.bet_site import BetSite
+import requests
+from urllib3 import HTTPResponse
+
+from integrations.client.bet_site import BetSite, CIRCUIT_OPEN, NOT_MODIFIED
+from integrations.helpers.circuit_breaker import OPEN
+
+
+def streamed_response(content=b'', history=(), **attributes):
+    # the fetch streams the body, it is read with iter_content
+    return Mock(content=content, iter_content=lambda chunk_size: iter([content]), raw=None, history=list(history),
+                **attributes)
 
 
 class TestBetSiteIntegration(unittest.TestCase):
@@ -18,7 +33,8 @@ class TestBetSiteIntegration(unittest.TestCase):
         mock_post.return_value = Mock(status_code=200, text="Login Successful")
 
         # Mock the successful get data response
-        mock_get.return_value = Mock(status_code=200, json=lambda: {"key": "value"}, text="something")
+        mock_get.return_value = streamed_response(status_code=200, json=lambda: {"key": "value"}, text="something",
+                                                  content=b'{"key": "value"}', headers={})
 
         self.assertTrue(self.bet_site.login("testuser", "testpassword", self.login_url))
         data = self.bet_site.get_bets_data(self.data_url)
@@ -31,13 +47,170 @@ class TestBetSiteIntegration(unittest.TestCase):
         mock_post.return_value = Mock(status_code=200, text="Login Successful")
 
         # First mock the expired session response, then mock a successful data retrieval
-        mock_get.side_effect = [Mock(status_code=200, text="Username"),  # Session expired
-                                Mock(status_code=200, json=lambda: {"key": "value"}, text="something")]  # Successful data retrieval
+        mock_get.side_effect = [streamed_response(status_code=200, text="<form>Username</form>",  # Session expired
+                                                  headers={'Content-Type': 'text/html; charset=utf-8'}),
+                                streamed_response(status_code=200, json=lambda: {"key": "value"}, text="something",
+                                                  content=b'{"key": "value"}', headers={})]
 
         self.assertTrue(self.bet_site.login("testuser", "testpassword", self.login_url))
         data = self.bet_site.get_bets_data(self.data_url)
         self.assertEqual(data, {"key": "value"})
 
+    @patch('requests.Session.get')
+    def test_unchanged_body_is_not_decoded_again(self, mock_get):
+        json_mock = Mock(return_value={"key": "value"})
+        mock_get.return_value = streamed_response(status_code=200, json=json_mock, text="something",
+                                                  content=b'{"key": "value"}', headers={})
+
+        self.assertEqual(self.bet_site.get_bets_data(self.data_url), {"key": "value"})
+        self.assertIs(self.bet_site.get_bets_data(self.data_url), NOT_MODIFIED)
+        json_mock.assert_called_once()
+
+    @patch('requests.Session.get')
+    def test_conditional_request_with_etag(self, mock_get):
+        mock_get.side_effect = [streamed_response(status_code=200, json=lambda: {"key": "value"}, text="something",
+                                                  content=b'{"key": "value"}', headers={"ETag": '"v1"'}),
+                                streamed_response(status_code=304, text="", content=b'', headers={})]
+
+        self.assertEqual(self.bet_site.get_bets_data(self.data_url), {"key": "value"})
+        self.assertIs(self.bet_site.get_bets_data(self.data_url), NOT_MODIFIED)
+        self.assertEqual(mock_get.call_args.kwargs["headers"], {"If-None-Match": '"v1"'})
+
+    @patch('requests.Session.get')
+    def test_responses_are_recorded(self, mock_get):
+        response = streamed_response(status_code=200, json=lambda: {"key": "value"}, text="something",
+                                     content=b'{"key": "value"}', headers={})
+        mock_get.return_value = response
+        self.bet_site.recorder = Mock()
+
+        self.bet_site.get_bets_data(self.data_url)
+        self.bet_site.get_bets_data(self.data_url)
+
+        self.assertEqual(self.bet_site.recorder.record.call_count, 2)
+        self.bet_site.recorder.record.assert_called_with(self.data_url, response)
+
+    @patch('asyncio.sleep')
+    @patch('requests.Session.get')
+    def test_failed_fetches_are_retried_without_blocking(self, mock_get, mock_sleep):
+        mock_get.side_effect = [requests.exceptions.ConnectTimeout(),
+                                streamed_response(status_code=502, text="Bad Gateway", content=b'Bad Gateway',
+                                                  headers={}),
+                                streamed_response(status_code=200, json=lambda: {"key": "value"}, text="something",
+                                                  content=b'{"key": "value"}', headers={})]
+
+        data = asyncio.run(self.bet_site.fetch_bets_data(self.data_url))
+
+        self.assertEqual(data, {"key": "value"})
+        self.assertEqual(mock_sleep.call_count, 2)
+        # full jitter, each delay is at most the exponential backoff of its attempt
+        self.assertLessEqual(mock_sleep.call_args_list[0].args[0], 1)
+        self.assertLessEqual(mock_sleep.call_args_list[1].args[0], 2)
+        self.assertEqual(self.bet_site.retry_counts[self.data_url], 2)
+
+    @patch('asyncio.sleep')
+    @patch('requests.Session.get')
+    def test_dead_dashboard_opens_the_circuit(self, mock_get, mock_sleep):
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+        self.bet_site.breaker.failure_threshold = 2
+
+        async def poll(times):
+            return [await self.bet_site.fetch_bets_data(self.data_url) for _ in range(times)]
+
+        results = asyncio.run(poll(3))
+
+        self.assertEqual(results, [None, None, CIRCUIT_OPEN])
+        self.assertEqual(self.bet_site.breaker.state, OPEN)
+        self.assertEqual(mock_get.call_count, 2 * self.bet_site.max_retries)
+
+    def test_session_expiry_is_not_read_from_the_body(self):
+        self.bet_site.last_login_url = self.login_url
+        payload = Mock(status_code=200, text='[{"league": "Username FC"}]',
+                       headers={'Content-Type': 'application/json'}, history=[], url=self.data_url)
+        redirected = Mock(status_code=200, headers={}, history=[Mock(status_code=302)], url=self.login_url + "?next=/")
+
+        self.assertFalse(self.bet_site.is_session_expired(payload))
+        self.assertTrue(self.bet_site.is_session_expired(Mock(status_code=401, headers={})))
+        self.assertTrue(self.bet_site.is_session_expired(redirected))
+
+    @patch('requests.Session.post')
+    def test_session_is_refreshed_before_the_cookie_expires(self, mock_post):
+        mock_post.return_value = Mock(status_code=200, text="Login Successful")
+        self.bet_site.session.cookies.set("sessionid", "abc", expires=int(time.time()) + 3600)
+
+        self.assertTrue(self.bet_site.login("testuser", "testpassword", self.login_url))
+        self.assertAlmostEqual(self.bet_site.seconds_until_refresh(), 3600 - 60, delta=2)
+
+        mock_post.side_effect = requests.exceptions.ConnectionError()
+        self.assertFalse(asyncio.run(self.bet_site.refresh_session()))
+        # a failed refresh is tried again a little later
+        self.assertAlmostEqual(self.bet_site.seconds_until_refresh(), 30, delta=2)
+
+    def test_refresh_waits_for_a_running_fetch(self):
+        calls = []
+
+        def get_bets_data(url):
+            calls.append("fetch started")
+            time.sleep(0.1)
+            calls.append("fetch finished")
+            return {"key": "value"}
+
+        def login(username, password, url):
+            calls.append("login")
+            return True
+
+        async def run():
+            fetch = asyncio.create_task(self.bet_site.fetch_bets_data(self.data_url))
+            await asyncio.sleep(0)
+            await self.bet_site.refresh_session()
+            return await fetch
+
+        with patch.object(self.bet_site, "get_bets_data", side_effect=get_bets_data), \
+                patch.object(self.bet_site, "login", side_effect=login):
+            self.assertEqual(asyncio.run(run()), {"key": "value"})
+
+        self.assertEqual(calls, ["fetch started", "fetch finished", "login"])
+
+    @patch('requests.Session.get')
+    def test_compressed_body_is_decompressed_while_reading(self, mock_get):
+        body = json.dumps({"data": json.dumps([{"league": "League"}] * 1000)}).encode()
+        compressed = gzip.compress(body)
+        response = requests.Response()
+        response.status_code = 200
+        response.headers = requests.structures.CaseInsensitiveDict({'Content-Encoding': 'gzip',
+                                                                    'Content-Type': 'application/json'})
+        response.raw = HTTPResponse(body=io.BytesIO(compressed), headers={'Content-Encoding': 'gzip'},
+                                    preload_content=False)
+        mock_get.return_value = response
+
+        data = self.bet_site.get_bets_data(self.data_url)
+
+        self.assertEqual(data, json.loads(body))
+        self.assertTrue(mock_get.call_args.kwargs["stream"])
+        self.assertIn("gzip", self.bet_site.session.headers['Accept-Encoding'])
+        self.assertEqual(self.bet_site.response_sizes[self.data_url], len(body))
+        self.assertEqual(self.bet_site.transfer_sizes[self.data_url], len(compressed))
+
+    @patch('requests.Session.get')
+    def test_useless_answers_count_against_the_circuit(self, mock_get):
+        mock_get.return_value = streamed_response(status_code=404, text="Not Found", content=b'Not Found', headers={})
+        self.bet_site.breaker.failure_threshold = 2
+
+        async def poll(times):
+            return [await self.bet_site.fetch_bets_data(self.data_url) for _ in range(times)]
+
+        self.assertEqual(asyncio.run(poll(3)), [None, None, CIRCUIT_OPEN])
+        self.assertEqual(self.bet_site.breaker.state, OPEN)
+
+    @patch('requests.Session.get')
+    def test_no_retries_still_fetches_once(self, mock_get):
+        mock_get.side_effect = requests.exceptions.ConnectionError()
+        self.bet_site.max_retries = 0
+        self.bet_site.breaker.failure_threshold = 1
+
+        self.assertIsNone(asyncio.run(self.bet_site.fetch_bets_data(self.data_url)))
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertEqual(self.bet_site.breaker.state, OPEN)
+
 
 if __name__ == "__main__":
     unittest.main()
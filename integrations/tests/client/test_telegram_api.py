@@ -0,0 +1,51 @@
+import asyncio
+import unittest
+from unittest.mock import patch, Mock
+
+import requests
+
+from integrations.client.telegram_api import TelegramApi
+
+
+class TestTelegramApi(unittest.TestCase):
+
+    def setUp(self):
+        self.telegram_api = TelegramApi("test_token", connect_timeout=2, read_timeout=7)
+
+    @patch('requests.Session.post')
+    def test_send_message_uses_pooled_session_and_timeouts(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+
+        response = asyncio.run(self.telegram_api.send_message("1234", "Test message"))
+
+        self.assertEqual(response.status_code, 200)
+        mock_post.assert_called_once_with(
+            "https://api.telegram.org/bottest_token/sendMessage",
+            data={'chat_id': "1234", 'text': "Test message", 'parse_mode': 'MarkdownV2'},
+            timeout=(2, 7)
+        )
+
+    @patch('requests.Session.post')
+    def test_send_message_returns_none_on_timeout(self, mock_post):
+        mock_post.side_effect = requests.exceptions.ReadTimeout()
+
+        response = asyncio.run(self.telegram_api.send_message("1234", "Test message"))
+
+        self.assertIsNone(response)
+
+    @patch('requests.Session.post')
+    def test_edit_message_text(self, mock_post):
+        mock_post.return_value = Mock(status_code=200)
+
+        response = asyncio.run(self.telegram_api.edit_message_text("1234", 42, "Edited message"))
+
+        self.assertEqual(response.status_code, 200)
+        mock_post.assert_called_once_with(
+            "https://api.telegram.org/bottest_token/editMessageText",
+            data={'chat_id': "1234", 'message_id': 42, 'text': "Edited message", 'parse_mode': 'MarkdownV2'},
+            timeout=(2, 7)
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import unittest
+from unittest.mock import Mock
+
+from integrations.client.telegram_dispatcher import TelegramDispatcher, TokenBucket
+
+
+class FakeTelegramApi:
+    def __init__(self, responses=None):
+        self.responses = list(responses or [])
+        self.sent = []
+        self.edited = []
+
+    async def send_message(self, chat_id, text, parse_mode='MarkdownV2'):
+        self.sent.append((chat_id, text))
+        if self.responses:
+            return self.responses.pop(0)
+        return Mock(status_code=200)
+
+    async def edit_message_text(self, chat_id, message_id, text, parse_mode='MarkdownV2'):
+        self.edited.append((chat_id, message_id, text))
+        if self.responses:
+            return self.responses.pop(0)
+        return Mock(status_code=200)
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_waits_once_the_burst_is_used(self):
+        now = [0.0]
+        bucket = TokenBucket(rate=2, capacity=2, clock=lambda: now[0])
+
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0)
+        self.assertEqual(bucket.reserve(), 0.5)
+
+        now[0] += 1.5
+        self.assertEqual(bucket.reserve(), 0)
+
+
+class TestTelegramDispatcher(unittest.TestCase):
+    def test_messages_keep_their_order_per_chat(self):
+        telegram_api = FakeTelegramApi()
+        dispatcher = TelegramDispatcher(telegram_api, chat_burst=10)
+
+        async def run():
+            futures = [dispatcher.enqueue("a", "1"), dispatcher.enqueue("b", "x"), dispatcher.enqueue("a", "2")]
+            await asyncio.gather(*futures)
+
+        asyncio.run(run())
+
+        self.assertEqual([text for chat_id, text in telegram_api.sent if chat_id == "a"], ["1", "2"])
+        self.assertEqual(dispatcher.stats()['sent'], 3)
+        self.assertEqual(dispatcher.queue_depth(), 0)
+
+    def test_retry_after_is_honoured(self):
+        rate_limited = Mock(status_code=429)
+        rate_limited.json.return_value = {'ok': False, 'parameters': {'retry_after': 0.05}}
+        telegram_api = FakeTelegramApi([rate_limited])
+        dispatcher = TelegramDispatcher(telegram_api, chat_rate=1, chat_burst=10)
+
+        response = asyncio.run(dispatcher.send("a", "1"))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(telegram_api.sent, [("a", "1"), ("a", "1")])
+        self.assertEqual(dispatcher.rate_limited_count, 1)
+
+    def test_rate_limited_retries_are_capped(self):
+        rate_limited = Mock(status_code=429)
+        rate_limited.json.return_value = {'ok': False, 'parameters': {'retry_after': 0.01}}
+        telegram_api = FakeTelegramApi([rate_limited] * 5)
+        dispatcher = TelegramDispatcher(telegram_api, chat_burst=10, max_retries=2, max_rate_limited_retries=3)
+        paused = []
+        dispatcher.global_bucket.pause = paused.append
+
+        response = asyncio.run(dispatcher.send("a", "1"))
+
+        self.assertIsNone(response)
+        self.assertEqual(len(telegram_api.sent), 3)
+        self.assertEqual(paused, [0.01] * 3)
+        self.assertEqual(dispatcher.stats()['failed'], 1)
+
+    def test_edits_go_through_the_chat_queue(self):
+        not_modified = Mock(status_code=400, text='{"ok":false,"description":"Bad Request: message is not modified"}')
+        telegram_api = FakeTelegramApi([Mock(status_code=200), not_modified])
+        dispatcher = TelegramDispatcher(telegram_api, chat_burst=10)
+
+        async def run():
+            return await asyncio.gather(dispatcher.enqueue("a", "1"), dispatcher.enqueue("a", "1", edit_message_id=7))
+
+        asyncio.run(run())
+
+        self.assertEqual(telegram_api.sent, [("a", "1")])
+        self.assertEqual(telegram_api.edited, [("a", 7, "1")])
+        # an edit that changes nothing is not a failure
+        self.assertEqual(dispatcher.stats()['failed'], 0)
+        self.assertEqual(dispatcher.messages_total.get(result="edited"), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
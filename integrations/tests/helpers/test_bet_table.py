@@ -0,0 +1,62 @@
+import unittest
+
+from integrations.helpers.bet_table import BetTable
+from integrations.helpers.hash_calculator import compute_bet_model_hash
+from integrations.helpers.routing import Route
+
+
+def make_bet(uuid, dashboard_name="sing", price=2.0, placed_count=0, bet_class="ah"):
+    return {'uuid': uuid, 'pin_fix': f"pin_{uuid}", 'hours_to_start': 2.5, 'league': 'LeagueA', 'home_team': 'TeamA',
+            'away_team': 'TeamB', 'bet_type': '1', 'mod': 0.0, 'price': price, 'bet_class': bet_class,
+            'placed_count': placed_count, 'dashboard_name': dashboard_name}
+
+
+class TestBetTable(unittest.TestCase):
+    def test_partition_keeps_the_order_of_the_snapshot(self):
+        bets = [make_bet("a", "Sing"), make_bet("b", "bet365"), make_bet("c", "sing", bet_class="ou")]
+        routes = [Route("sing", "dashboard_v2", dashboard_name="sing"),
+                  Route("sing_ou", "dashboard_v2", dashboard_name="sing", bet_filter={'bet_class': ['ou']}),
+                  Route("bet365_clean", "dashboard_v2", dashboard_name="bet365", dedup="uuid"),
+                  Route("everything", "dashboard_v2", dedup="uuid")]
+
+        tables = BetTable(bets).partition(routes)
+
+        self.assertEqual(tables["sing"].uuids, ["a", "c"])
+        self.assertEqual(tables["sing_ou"].uuids, ["c"])
+        self.assertEqual(tables["bet365_clean"].uuids, ["b"])
+        self.assertEqual(tables["everything"].uuids, ["a", "b", "c"])
+        self.assertEqual(tables["sing"].digests, [compute_bet_model_hash(bets[0]), compute_bet_model_hash(bets[2])])
+        self.assertEqual(tables["everything"].digests, [compute_bet_model_hash(bet) for bet in bets])
+
+    def test_new_rows_by_digest(self):
+        old_bets = [make_bet("a"), make_bet("b")]
+        old_digests = dict(zip(BetTable(old_bets).digests, old_bets))
+        bets = [make_bet("c"), make_bet("a"), make_bet("b", price=2.1)]
+
+        rows_by_digest, new_rows = BetTable(bets).new_rows_by_digest(old_digests)
+
+        self.assertEqual(len(rows_by_digest), 3)
+        self.assertEqual([bet['uuid'] for bet in new_rows], ["c", "b"])
+
+    def test_unseen_rows_by_uuid_takes_the_first_row_of_a_repeated_uuid(self):
+        bets = [make_bet("a", price=1.5), make_bet("b"), make_bet("a", price=3.0)]
+
+        unseen = BetTable(bets).unseen_rows_by_uuid({"b"})
+
+        self.assertEqual(list(unseen), ["a"])
+        self.assertEqual(unseen["a"]['price'], 1.5)
+
+    def test_min_hours_to_start_skips_games_that_already_started(self):
+        bets = [dict(make_bet("a"), hours_to_start=-1.5), dict(make_bet("b"), hours_to_start=0.5), make_bet("c")]
+
+        self.assertEqual(BetTable(bets).min_hours_to_start(), 0.5)
+        self.assertIsNone(BetTable(bets[:1]).min_hours_to_start())
+
+    def test_placed_rows(self):
+        bets = [make_bet("a", placed_count=1), make_bet("b"), make_bet("c", placed_count=2)]
+
+        self.assertEqual(list(BetTable(bets).placed_rows({"c"})), ["a"])
+
+
+if __name__ == '__main__':
+    unittest.main()
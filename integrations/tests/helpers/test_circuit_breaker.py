@@ -0,0 +1,49 @@
+import unittest
+
+from integrations.helpers.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.breaker = CircuitBreaker("dashboard", failure_threshold=2, reset_timeout=10, max_reset_timeout=30,
+                                      clock=lambda: self.now)
+
+    def test_opens_after_the_threshold(self):
+        self.breaker.record_failure()
+        self.assertTrue(self.breaker.allow_request())
+
+        self.breaker.record_failure()
+
+        self.assertEqual(self.breaker.state, OPEN)
+        self.assertFalse(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state_value(), 2)
+
+    def test_probe_closes_the_circuit_again(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        self.now += 10
+        self.assertTrue(self.breaker.allow_request())
+        self.assertEqual(self.breaker.state, HALF_OPEN)
+        self.breaker.record_success()
+
+        self.assertEqual(self.breaker.state, CLOSED)
+        self.assertEqual(self.breaker.failures, 0)
+
+    def test_failed_probes_back_off(self):
+        self.breaker.record_failure()
+        self.breaker.record_failure()
+
+        for expected_timeout in (20, 30, 30):
+            self.now += self.breaker.reset_timeout
+            self.assertTrue(self.breaker.allow_request())
+            self.breaker.record_failure()
+            self.assertEqual((self.breaker.state, self.breaker.reset_timeout), (OPEN, expected_timeout))
+
+        self.now += 29
+        self.assertFalse(self.breaker.allow_request())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from integrations.helpers.delay_scheduler import DelayScheduler
+
+
+class TestDelayScheduler(unittest.TestCase):
+    def test_items_are_released_after_their_own_delay(self):
+        released = []
+
+        async def run():
+            loop = asyncio.get_running_loop()
+            scheduler = DelayScheduler(lambda items: released.append((items, loop.time())))
+            started = loop.time()
+            scheduler.schedule("late", 0.1)
+            scheduler.schedule("early", 0.02)
+            await asyncio.sleep(0.15)
+            scheduler.stop()
+            return started
+
+        started = asyncio.run(run())
+
+        self.assertEqual([items for items, _ in released], [["early"], ["late"]])
+        self.assertGreaterEqual(released[0][1] - started, 0.02)
+        self.assertLess(released[0][1] - started, 0.08)
+        self.assertGreaterEqual(released[1][1] - started, 0.1)
+
+    def test_items_due_together_are_released_in_one_batch(self):
+        released = []
+
+        async def run():
+            scheduler = DelayScheduler(released.append)
+            scheduler.schedule("a", 0.01)
+            scheduler.schedule("b", 0.01)
+            await asyncio.sleep(0.05)
+            scheduler.stop()
+
+        asyncio.run(run())
+
+        self.assertEqual(released, [["a", "b"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from integrations.helpers.expiring_dict import ExpiringDict
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestExpiringDict(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.expiring_dict = ExpiringDict(max_size=3, default_ttl=60, clock=self.clock)
+
+    def test_entries_expire_after_their_ttl(self):
+        self.expiring_dict.add('a', 1, ttl=10)
+        self.expiring_dict.add('b', 2)
+
+        self.clock.now += 30
+        self.assertEqual(self.expiring_dict.expire(), 1)
+
+        self.assertNotIn('a', self.expiring_dict)
+        self.assertEqual(self.expiring_dict['b'], 2)
+        self.assertEqual(self.expiring_dict.evicted_expired, 1)
+
+    def test_cap_evicts_the_entries_closest_to_expiry(self):
+        self.expiring_dict.add('a', 1, ttl=50)
+        self.expiring_dict.add('b', 2, ttl=10)
+        self.expiring_dict.add('c', 3, ttl=30)
+        self.expiring_dict.add('d', 4, ttl=40)
+
+        self.assertEqual(set(self.expiring_dict), {'a', 'c', 'd'})
+        self.assertEqual(self.expiring_dict.evicted_capacity, 1)
+
+    def test_added_entry_is_kept_when_its_ttl_is_the_shortest(self):
+        evictions = []
+        self.expiring_dict.on_evict = lambda reason, count: evictions.append((reason, count))
+        for key in ['a', 'b', 'c']:
+            self.expiring_dict.add(key, 1)
+        self.expiring_dict.add('d', 4, ttl=5)
+
+        self.assertIn('d', self.expiring_dict)
+        self.assertEqual(len(self.expiring_dict), 3)
+        self.assertEqual(evictions, [("capacity", 1)])
+
+    def test_re_added_entry_uses_the_new_expiry(self):
+        self.expiring_dict.add('a', 1, ttl=10)
+        self.expiring_dict.add('a', 1, ttl=100)
+
+        self.clock.now += 30
+        self.assertEqual(self.expiring_dict.expire(), 0)
+        self.assertIn('a', self.expiring_dict)
+
+
+if __name__ == '__main__':
+    unittest.main()
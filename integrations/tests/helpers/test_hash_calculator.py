@@ -0,0 +1,30 @@
+import unittest
+
+from integrations.helpers.hash_calculator import compute_bet_model_hash
+
+
+class TestHashCalculator(unittest.TestCase):
+    def setUp(self):
+        self.bet = {'uuid': 'aaa', 'pin_fix': 'bet1', 'hours_to_start': 1, 'league': 'LeagueA', 'home_team': 'TeamA',
+                    'away_team': 'TeamB', 'bet_type': '1', 'mod': 0, 'price': 2.0, 'bet_class': 'classA',
+                    'placed_count': 0}
+
+    def test_hash_is_stable_across_processes(self):
+        # hash() is salted per process, the digest has to stay the same so it can be stored on disk
+        self.assertEqual(compute_bet_model_hash(self.bet).hex(), "361c35bfd7cda0d079bba47dca3f8a4d")
+
+    def test_hash_ignores_fields_that_are_not_selected(self):
+        other_bet = dict(self.bet, uuid='bbb', hours_to_start=0.5, placed_count=1)
+        self.assertEqual(compute_bet_model_hash(self.bet), compute_bet_model_hash(other_bet))
+
+    def test_hash_treats_whole_floats_like_ints(self):
+        other_bet = dict(self.bet, mod=0.0, price=2)
+        self.assertEqual(compute_bet_model_hash(self.bet), compute_bet_model_hash(other_bet))
+
+    def test_hash_changes_with_price(self):
+        other_bet = dict(self.bet, price=2.05)
+        self.assertNotEqual(compute_bet_model_hash(self.bet), compute_bet_model_hash(other_bet))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import re
+import unittest
+
+from integrations.helpers.markdown import escape, escape_field
+
+
+def regex_escape(text):
+    # the escaper used before the translate table
+    escape_chars = r'_*\[\]()~>#+-=|{}.!'
+    return re.sub(f'([{re.escape(escape_chars)}])', r'\\\1', str(text))
+
+
+class TestMarkdown(unittest.TestCase):
+    def test_every_special_character_is_escaped(self):
+        self.assertEqual(escape("a_b*c[d]e(f)g~h>i#j+k-l=m|n{o}p.q!r\\s`t"),
+                         "a\\_b\\*c\\[d\\]e\\(f\\)g\\~h\\>i\\#j\\+k\\-l\\=m\\|n\\{o\\}p\\.q\\!r\\\\s`t")
+
+    def test_same_output_as_the_regex_escaper(self):
+        texts = [chr(code) for code in range(0x3000)] + [
+            "Premier League (England)", "Women's U-21 - Group B.1", "", "1.95", "-0.25", "2h 30min"]
+        values = texts + [1.95, -3, 0, None, True, 2.0]
+        for value in values:
+            self.assertEqual(escape(value), regex_escape(value))
+        # 1 and 1.0 are equal keys, the cache must not mix them up
+        self.assertEqual((escape_field(1), escape_field(1.0)), ("1", "1\\.0"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import unittest
+
+from integrations.helpers.message_batcher import pack_messages
+from integrations.print_model import PrintModel
+
+
+class TestMessageBatcher(unittest.TestCase):
+    def test_blocks_are_packed_under_the_limit(self):
+        blocks = ["a" * 40, "b" * 40, "c" * 40]
+        self.assertEqual(pack_messages(blocks, limit=81), ["a" * 40 + "\n" + "b" * 40, "c" * 40])
+
+    def test_block_is_never_split(self):
+        blocks = ["a" * 10, "b" * 100, "c" * 10]
+        self.assertEqual(pack_messages(blocks, limit=50), ["a" * 10, "b" * 100, "c" * 10])
+
+    def test_empty_input(self):
+        self.assertEqual(pack_messages([]), [])
+
+    def test_rendered_bets_fit_in_telegram_messages(self):
+        block = PrintModel("Sing", 2.5, "TestLeague", "HomeTeam", "AwayTeam", "o", 2.5, 1.9, "ou", 0).get_markdown()
+        messages = pack_messages([block] * 100)
+
+        self.assertTrue(all(len(message) <= 4096 for message in messages))
+        self.assertEqual(sum(message.count("__Sing__") for message in messages), 100)
+        self.assertLess(len(messages), 10)
+
+
+if __name__ == '__main__':
+    unittest.main()
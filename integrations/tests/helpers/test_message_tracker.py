@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from integrations.helpers.message_tracker import MessageTracker, TrackedMessage
+from integrations.helpers.state_store import StateStore
+
+
+class TestMessageTracker(unittest.TestCase):
+    def test_sent_messages_are_remembered_per_chat(self):
+        tracker = MessageTracker()
+
+        tracker.remember("sing", "a", 1, 10)
+        tracker.remember("sing", "a", 2, 20)
+        tracker.forget("sing", "a", 1)
+
+        self.assertIsNone(tracker.message_id("sing", "a", 1))
+        self.assertEqual(tracker.message_id("sing", "a", 2), 20)
+        self.assertIsNone(tracker.message_id("bet365", "a", 2))
+
+    def test_bets_missing_from_the_snapshot_are_forgotten(self):
+        tracker = MessageTracker()
+        tracker.remember("sing", "a", 1, 10)
+        tracker.remember("sing", "b", 1, 11)
+
+        self.assertEqual(tracker.forget_missing("sing", ["b", "c"]), ["a"])
+        self.assertEqual(list(tracker.uuids("sing")), ["b"])
+
+    def test_message_ids_survive_a_restart(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.sqlite3")
+            store = StateStore(path)
+            store.message_tracker.remember("sing", "a", 1, 10)
+            store.message_tracker.remember("sing", "b", 1, 11)
+            store.flush()
+            store.message_tracker.forget("sing", "b")
+            [[message]] = store.save({}, {}, [("sing", [1], [TrackedMessage("text", "a")])])
+            store.close()
+
+            restarted = StateStore(path)
+            self.assertEqual(restarted.message_tracker.message_id("sing", "a", 1), 10)
+            self.assertIsNone(restarted.message_tracker.message_id("sing", "b", 1))
+            [(_, pending_message, _)] = restarted.outbox.pending()
+            self.assertEqual((message.bet_uuid, pending_message.bet_uuid), ("a", "a"))
+            restarted.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+import os
+import tempfile
+import unittest
+import urllib.request
+
+from integrations.helpers.metrics import MetricsRegistry
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = MetricsRegistry()
+
+    def test_counter_and_gauge(self):
+        counter = self.metrics.counter('fetches_total', 'Fetches', ['source'])
+        counter.inc(source="dashboard_v2")
+        counter.inc(2, source="dashboard_v2")
+        self.metrics.gauge('queue_depth', 'Queue depth').set_function(lambda: 7)
+
+        rendered = self.metrics.render()
+
+        self.assertIn('# TYPE fetches_total counter\nfetches_total{source="dashboard_v2"} 3\n', rendered)
+        self.assertIn('# TYPE queue_depth gauge\nqueue_depth 7\n', rendered)
+
+    def test_histogram_buckets_are_cumulative(self):
+        histogram = self.metrics.histogram('render_seconds', 'Render time', buckets=(0.1, 1.0))
+        for value in [0.05, 0.5, 0.7, 3.0]:
+            histogram.observe(value)
+
+        rendered = self.metrics.render()
+
+        self.assertIn('render_seconds_bucket{le="0.1"} 1\n', rendered)
+        self.assertIn('render_seconds_bucket{le="1"} 3\n', rendered)
+        self.assertIn('render_seconds_bucket{le="+Inf"} 4\n', rendered)
+        self.assertIn('render_seconds_sum 4.25\n', rendered)
+        self.assertIn('render_seconds_count 4\n', rendered)
+
+    def test_label_values_are_escaped(self):
+        self.metrics.gauge('bets', 'Bets', ['dashboard']).set(1, dashboard='say "hi"\\')
+
+        self.assertIn('bets{dashboard="say \\"hi\\"\\\\"} 1', self.metrics.render())
+
+    def test_registering_twice_returns_the_same_metric(self):
+        counter = self.metrics.counter('sent_total', 'Sent')
+
+        self.assertIs(self.metrics.counter('sent_total', 'Sent'), counter)
+        with self.assertRaises(ValueError):
+            self.metrics.gauge('sent_total', 'Sent')
+        with self.assertRaises(ValueError):
+            counter.inc(chat="1")
+
+    def test_write_to_file(self):
+        self.metrics.counter('sent_total', 'Sent').inc()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'scraper.prom')
+            self.metrics.write(path)
+
+            with open(path) as f:
+                self.assertIn('sent_total 1\n', f.read())
+            self.assertEqual(os.listdir(directory), ['scraper.prom'])
+
+    def test_serve_over_http(self):
+        self.metrics.counter('sent_total', 'Sent').inc()
+        server = self.metrics.serve(0)
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/metrics"
+            with urllib.request.urlopen(url, timeout=5) as response:
+                self.assertIn('text/plain', response.headers['Content-Type'])
+                self.assertIn('sent_total 1\n', response.read().decode())
+        finally:
+            self.metrics.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
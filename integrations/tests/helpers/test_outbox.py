@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+
+from integrations.helpers.outbox import OutboxMessage
+from integrations.helpers.state_store import StateStore
+
+
+class TestOutbox(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_messages_are_saved_with_the_dedup_state(self):
+        store = StateStore(self.path)
+        store.load()
+        [messages] = store.save({"sing_bets": {b'\x01': {}}}, {}, [("sing", [1, 2], ["first", "second"])])
+        store.close()
+
+        self.assertEqual(messages, ["first", "second"])
+        self.assertIsInstance(messages[0], OutboxMessage)
+        restarted = StateStore(self.path)
+        self.assertEqual([(route, message, chats) for route, message, chats in restarted.outbox.pending()],
+                         [("sing", "first", [1, 2]), ("sing", "second", [1, 2])])
+        restarted.close()
+
+    def test_acknowledged_messages_leave_the_outbox(self):
+        store = StateStore(self.path)
+        [[first, second]] = store.save({}, {}, [("sing", [1, 2], ["first", "second"])])
+
+        store.outbox.acknowledge(first, 1)
+        store.outbox.acknowledge(first, 2)
+        store.outbox.acknowledge(second, 1)
+        store.outbox.mark_counted(second)
+        # nothing is written until the buffer is flushed
+        self.assertEqual(len(StateStore(self.path).outbox.pending()), 2)
+        store.close()
+
+        [(route, message, chats)] = StateStore(self.path).outbox.pending()
+        self.assertEqual((route, message, chats, message.counted), ("sing", "second", [2], True))
+        count = StateStore(self.path).connection.execute("SELECT COUNT(*) FROM outbox_messages").fetchone()[0]
+        self.assertEqual(count, 1)
+
+    def test_full_buffer_is_flushed(self):
+        store = StateStore(self.path)
+        store.outbox.flush_size = 2
+        [messages] = store.save({}, {}, [("sing", [1], ["a", "b", "c"])])
+
+        for message in messages:
+            store.outbox.acknowledge(message, 1)
+
+        self.assertEqual([message for _, message, _ in StateStore(self.path).outbox.pending()], ["c"])
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import json
+import unittest
+
+from integrations.helpers.payload_decoder import decode_bets, iter_bets
+
+
+class TestPayloadDecoder(unittest.TestCase):
+    def test_iter_bets_matches_json_loads(self):
+        with open('./integrations/test_data.json', 'rb') as f:
+            payload = json.loads(f.read())['data']
+
+        self.assertEqual(list(iter_bets(payload)), json.loads(payload))
+
+    def test_iter_bets_with_whitespace_and_empty_list(self):
+        self.assertEqual(list(iter_bets(' [ ] ')), [])
+        self.assertEqual(list(iter_bets('[ {"uuid": "a"} ,\n{"uuid": "b"} ]')), [{'uuid': 'a'}, {'uuid': 'b'}])
+
+    def test_iter_bets_accepts_already_decoded_list(self):
+        self.assertEqual(list(iter_bets([{'uuid': 'a'}])), [{'uuid': 'a'}])
+
+    def test_iter_bets_raises_on_malformed_payload(self):
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_bets('[{"uuid": "a"} {"uuid": "b"}]'))
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_bets('{"uuid": "a"}'))
+
+    def test_decode_bets(self):
+        self.assertEqual(decode_bets('[{"uuid": "a"}]'), [{'uuid': 'a'}])
+        self.assertEqual(decode_bets([{'uuid': 'a'}]), [{'uuid': 'a'}])
+        with self.assertRaises(json.JSONDecodeError):
+            decode_bets('{"uuid": "a"}')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+from unittest.mock import patch
+
+from integrations.helpers.poll_scheduler import PollScheduler
+
+
+class TestPollScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = PollScheduler(base_interval=30, min_interval=5, max_interval=60,
+                                       kickoff_window_hours=1.0, kickoff_interval=10)
+
+    def test_interval_shrinks_when_new_bets_arrive(self):
+        self.assertEqual(self.scheduler.next_interval(3), 15)
+        self.assertEqual(self.scheduler.next_interval(1), 7.5)
+        self.assertEqual(self.scheduler.next_interval(1), 5)
+
+    def test_interval_grows_when_nothing_changes(self):
+        self.assertEqual(self.scheduler.next_interval(0), 45)
+        self.assertEqual(self.scheduler.next_interval(0), 60)
+        self.assertEqual(self.scheduler.next_interval(0), 60)
+
+    def test_interval_is_capped_close_to_kickoff(self):
+        self.assertEqual(self.scheduler.next_interval(0, min_hours_to_start=0.5), 10)
+        self.assertEqual(self.scheduler.next_interval(0, min_hours_to_start=5), 15)
+
+    @patch("integrations.helpers.poll_scheduler.time.monotonic")
+    def test_sleep_time_subtracts_cycle_duration(self, mock_monotonic):
+        mock_monotonic.side_effect = [100.0, 104.0]
+        self.scheduler.start_cycle()
+
+        self.assertEqual(self.scheduler.sleep_time(0), 41)
+        self.assertEqual(self.scheduler.last_cycle_duration, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import json
+import unittest
+
+from integrations.helpers.render_cache import RenderCache
+from integrations.print_model import PrintModel
+
+
+def render_with_print_model(bet, page_name, placed_count, placed_price):
+    return PrintModel(page_name, bet['hours_to_start'], bet['league'], bet['home_team'], bet['away_team'],
+                      bet['bet_type'], bet['mod'], bet['price'], bet['bet_class'], placed_count,
+                      placed_price).get_markdown()
+
+
+class TestRenderCache(unittest.TestCase):
+    def setUp(self):
+        with open('./integrations/test_data.json', 'rb') as f:
+            self.bets = json.loads(json.loads(f.read())['data'])
+        self.render_cache = RenderCache(max_size=100)
+
+    def test_output_matches_print_model_for_every_lane(self):
+        for bet in self.bets:
+            for page_name, placed_count, placed_price in [("Bet365", bet['placed_count'], "2.0"),
+                                                          ("Bet365", 0, "No Price"), ("Sing", 1, "1.9")]:
+                self.assertEqual(self.render_cache.render(bet, page_name, placed_count, placed_price),
+                                 render_with_print_model(bet, page_name, placed_count, placed_price))
+
+    def test_body_is_rendered_once_per_bet(self):
+        bet = self.bets[0]
+        self.render_cache.render(bet, "Bet365", 1, "2.0")
+        self.render_cache.render(bet, "Bet365", 0, "No Price")
+
+        self.assertEqual((self.render_cache.misses, self.render_cache.hits), (1, 1))
+
+    def test_numbers_are_rendered_as_they_came(self):
+        bet = self.bets[0]
+        for mod, price in [(1, 2), (1.0, 2.0), ("1", "2")]:
+            same_bet = dict(bet, mod=mod, price=price)
+            self.assertEqual(self.render_cache.render(same_bet, "Bet365", 0, "No Price"),
+                             render_with_print_model(same_bet, "Bet365", 0, "No Price"))
+
+        self.assertEqual(self.render_cache.misses, 3)
+
+    def test_unknown_bet_class_keeps_the_error_page_name(self):
+        bet = dict(self.bets[0], bet_class="random_corners", bet_type="corners_2")
+        self.render_cache.render(bet, "Bet365", 0, "No Price")
+
+        self.assertTrue(self.render_cache.render(bet, "Sing", 0, "No Price").startswith("__Error: bet not changed__"))
+
+    def test_least_recently_used_body_is_evicted(self):
+        render_cache = RenderCache(max_size=2)
+        for bet in self.bets[:3]:
+            render_cache.render(bet, "Sing", 0, "No Price")
+
+        self.assertEqual(len(render_cache), 2)
+        render_cache.render(self.bets[0], "Sing", 0, "No Price")
+        self.assertEqual(render_cache.misses, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import gzip
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from integrations.helpers.response_log import ResponseRecorder, read_response_log
+
+
+def make_response(status_code, body, headers=None):
+    response = MagicMock()
+    response.status_code = status_code
+    response.content = body.encode()
+    response.headers = headers or {}
+    return response
+
+
+class TestResponseLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'logs', 'responses.jsonl.gz')
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_records_are_appended_and_read_back_in_order(self):
+        clock = iter([100.0, 130.0, 160.0])
+        recorder = ResponseRecorder(self.path, clock=lambda: next(clock))
+        recorder.record("https://a.api", make_response(200, '{"data": "[]"}', {'ETag': '"v1"', 'Server': 'x'}))
+        # a new recorder appends to the same log, like after a restart of the scraper
+        ResponseRecorder(self.path, clock=lambda: next(clock)).record("https://a.api", make_response(304, ''))
+
+        records = list(read_response_log(self.path))
+
+        self.assertEqual([(record['t'], record['status']) for record in records], [(100.0, 200), (130.0, 304)])
+        self.assertEqual(records[0]['headers'], {'ETag': '"v1"'})
+        self.assertEqual(records[0]['body'], '{"data": "[]"}')
+
+    def test_truncated_last_record_is_skipped(self):
+        recorder = ResponseRecorder(self.path)
+        recorder.record("https://a.api", make_response(200, '{"data": "[]"}'))
+        with open(self.path, 'ab') as f:
+            f.write(gzip.compress(b'{"t": 1, "url": "https://a.api", "status": 200, "bo')[:20])
+
+        self.assertEqual(len(list(read_response_log(self.path))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+
+from integrations.helpers.routing import load_routing_table, plan_shards, shared_endpoints
+
+
+class TestRouting(unittest.TestCase):
+    def test_legacy_config_keeps_the_original_routes(self):
+        config = {
+            "get_data2_api_url": "https://dashboard/api",
+            "chat_sing_id": "1",
+            "chat_bet365_id": "2",
+            "chat_bet365_clean_id": "3",
+        }
+        sources, routes = load_routing_table(config)
+
+        self.assertEqual(list(sources), ["dashboard_v2"])
+        self.assertEqual(sources["dashboard_v2"].api_url, "https://dashboard/api")
+        self.assertEqual([(route.name, route.partition, route.dedup, route.chats, route.delay) for route in routes], [
+            ("sing", "sing_bets", "hash", ["1"], 0),
+            ("bet365", "bet365_bets", "hash", ["2"], 0),
+            ("bet365_clean", "bet365_clean", "uuid", ["3"], 1),
+        ])
+        self.assertEqual(routes[2].counter, "clean_message_count")
+
+    def test_routes_from_config(self):
+        config = {
+            "sources": {
+                "corners": {"api_url": "https://corners/api", "login_url": "https://corners/login",
+                            "username": "user", "password": "pass"},
+            },
+            "routes": [
+                {"name": "corners_asian", "source": "corners", "dashboard_name": "Sing",
+                 "filter": {"bet_class": ["asian_corners"]}, "dedup": "uuid", "chats": [-100, -200], "batch": True},
+            ],
+        }
+        sources, routes = load_routing_table(config)
+        route = routes[0]
+
+        self.assertEqual(sources["corners"].login_url, "https://corners/login")
+        self.assertEqual((route.source, route.partition, route.page_name, route.chats, route.batch),
+                         ("corners", "corners_asian", "corners_asian", [-100, -200], True))
+        self.assertTrue(route.matches({"bet_class": "Asian_Corners"}, "sing"))
+        self.assertFalse(route.matches({"bet_class": "ou"}, "sing"))
+        self.assertFalse(route.matches({"bet_class": "asian_corners"}, "bet365"))
+
+    def test_unknown_source_or_mode_is_rejected(self):
+        with self.assertRaises(ValueError):
+            load_routing_table({"routes": [{"name": "a", "source": "missing"}]})
+        with self.assertRaises(ValueError):
+            load_routing_table({"sources": {"s": {"api_url": "u"}},
+                                "routes": [{"name": "a", "source": "s", "dedup": "fuzzy"}]})
+
+    def test_plan_shards_of_the_legacy_config_is_one_shard(self):
+        sources, routes = load_routing_table({"get_data2_api_url": "https://example.com/api"})
+
+        shards = plan_shards(sources, routes, {})
+
+        self.assertEqual(shards, {"dashboard_v2": ["sing", "bet365", "bet365_clean"]})
+        self.assertEqual(shared_endpoints(sources, routes, shards), {})
+
+    def test_plan_shards_by_dashboard_fetch_a_shared_endpoint_in_every_shard(self):
+        sources, routes = load_routing_table({"get_data2_api_url": "https://example.com/api"})
+
+        shards = plan_shards(sources, routes, {"shard_by": "dashboard"})
+
+        self.assertEqual(shards, {"dashboard_v2-sing": ["sing"], "dashboard_v2-bet365": ["bet365", "bet365_clean"]})
+        self.assertEqual(shared_endpoints(sources, routes, shards),
+                         {"https://example.com/api": ["dashboard_v2-sing", "dashboard_v2-bet365"]})
+
+    def test_plan_shards_by_source_merges_sources_of_the_same_endpoint(self):
+        config = {"sources": {"main": {"api_url": "https://example.com/api"},
+                              "mirror": {"api_url": "https://example.com/api"},
+                              "corners": {"api_url": "https://example.com/corners"}},
+                  "routes": [{"name": "sing", "source": "main"}, {"name": "bet365", "source": "mirror"},
+                             {"name": "corners", "source": "corners"}]}
+        sources, routes = load_routing_table(config)
+
+        self.assertEqual(plan_shards(sources, routes, config), {"main": ["sing", "bet365"], "corners": ["corners"]})
+
+    def test_plan_shards_from_config(self):
+        sources, routes = load_routing_table({"get_data2_api_url": "https://example.com/api"})
+
+        shards = plan_shards(sources, routes, {"shards": {"fast": ["sing", "bet365"], "clean": ["bet365_clean"]}})
+
+        self.assertEqual(shards, {"fast": ["sing", "bet365"], "clean": ["bet365_clean"]})
+        for bad_shards in [{"a": ["sing", "bet365"]}, {"a": ["sing", "bet365", "bet365_clean", "corners"]},
+                           {"a": ["sing", "bet365"], "b": ["bet365", "bet365_clean"]}]:
+            with self.assertRaises(ValueError):
+                plan_shards(sources, routes, {"shards": bad_shards})
+
+
+if __name__ == '__main__':
+    unittest.main()
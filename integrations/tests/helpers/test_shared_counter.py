@@ -0,0 +1,48 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from integrations.helpers.shared_counter import SharedCounter
+
+
+class TestSharedCounter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "counters", "shared_counters.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_take_never_goes_below_zero(self):
+        counter = SharedCounter('clean_message_count', self.path)
+        counter.set(3)
+
+        self.assertEqual(counter.take(2), (2, 1))
+        self.assertEqual(counter.take(5), (1, 0))
+        self.assertEqual(counter.take(1), (0, 0))
+        counter.close()
+
+    def test_value_set_by_another_connection_is_seen(self):
+        bot_counter = SharedCounter('clean_message_count', self.path)
+        scraper_counter = SharedCounter('clean_message_count', self.path)
+
+        self.assertEqual(scraper_counter.take(1), (0, 0))
+        bot_counter.set(4)
+        self.assertEqual(scraper_counter.take(1), (1, 3))
+        self.assertEqual(bot_counter.get(), 3)
+
+        bot_counter.close()
+        scraper_counter.close()
+
+    def test_home_directory_in_the_path_is_expanded(self):
+        with patch.dict(os.environ, {"HOME": self.directory.name}):
+            counter = SharedCounter('clean_message_count', "~/.forwarder/shared_counters.sqlite3")
+        counter.close()
+
+        self.assertEqual(counter.path, os.path.join(self.directory.name, ".forwarder", "shared_counters.sqlite3"))
+        self.assertTrue(os.path.exists(counter.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from integrations.helpers.shared_token_bucket import SharedTokenBucket
+
+
+class TestSharedTokenBucket(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "budget.sqlite3")
+        self.now = 1000.0
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_bucket(self, name="global"):
+        return SharedTokenBucket(name, rate=2.0, capacity=2, path=self.path, clock=lambda: self.now)
+
+    def test_buckets_with_the_same_name_share_their_tokens(self):
+        first, second, other_chat = self.create_bucket(), self.create_bucket(), self.create_bucket("chat:1")
+
+        self.assertEqual(first.reserve(), 0)
+        self.assertEqual(second.reserve(), 0)
+        self.assertEqual(first.reserve(), 0.5)
+        self.assertEqual(other_chat.reserve(), 0)
+
+        self.now += 1.5
+        self.assertEqual(second.reserve(), 0)
+
+    def test_pause_holds_every_process_back(self):
+        first, second = self.create_bucket(), self.create_bucket()
+
+        first.pause(3)
+
+        self.assertEqual(second.reserve(), 3)
+
+    def test_home_directory_in_the_path_is_expanded(self):
+        with patch.dict(os.environ, {"HOME": self.directory.name}):
+            bucket = SharedTokenBucket("global", rate=2.0, capacity=2, path="~/.forwarder/telegram_budget.sqlite3")
+        bucket.close()
+
+        self.assertEqual(bucket.path, os.path.join(self.directory.name, ".forwarder", "telegram_budget.sqlite3"))
+        self.assertTrue(os.path.exists(bucket.path))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+
+from integrations.helpers.state_store import StateStore
+
+
+class TestStateStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_state_survives_a_restart(self):
+        store = StateStore(self.path)
+        store.load()
+        bets_dict = {"sing_bets": {b'\x01': {'uuid': 'a'}, b'\x02': {'uuid': 'b'}}, "bet365_clean": {'uuid-1': {}}}
+        placed_bets = {'a': {'uuid': 'a', 'price': 2.0}}
+        store.save(bets_dict, placed_bets)
+        store.close()
+
+        restarted = StateStore(self.path)
+        loaded_bets_dict, loaded_placed_bets = restarted.load()
+
+        self.assertEqual(set(loaded_bets_dict["sing_bets"]), {b'\x01', b'\x02'})
+        self.assertEqual(set(loaded_bets_dict["bet365_clean"]), {'uuid-1'})
+        self.assertEqual(loaded_placed_bets, placed_bets)
+        restarted.close()
+
+    def test_save_writes_removed_keys_and_keeps_empty_partitions(self):
+        store = StateStore(self.path)
+        store.load()
+        store.save({"sing_bets": {b'\x01': {}, b'\x02': {}}}, {})
+        store.save({"sing_bets": {b'\x02': {}, b'\x03': {}}, "bet365_bets": {}}, {})
+        store.close()
+
+        restarted = StateStore(self.path)
+        loaded_bets_dict, _ = restarted.load()
+
+        self.assertEqual(loaded_bets_dict, {"sing_bets": {b'\x02': None, b'\x03': None}, "bet365_bets": {}})
+        restarted.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import json
+import unittest
+
+from integrations.print_model import PrintModel
+
+
+# golden_print_model.json holds the recorded bets from test_data.json and every bet_class / bet_type / mod
+# combination, rendered by PrintModel before the bet rules moved into a table
+class TestPrintModelGolden(unittest.TestCase):
+    def setUp(self):
+        with open('./integrations/tests/golden_print_model.json') as f:
+            self.cases = json.load(f)
+
+    def test_markdown_matches_golden_corpus(self):
+        for case in self.cases:
+            with self.subTest(bet_class=case['bet_class'], bet_type=case['bet_type'], mod=case['mod']):
+                if 'error' in case:
+                    with self.assertRaises((AttributeError, TypeError)) as context:
+                        self.render(case)
+                    self.assertEqual(type(context.exception).__name__, case['error'])
+                else:
+                    self.assertEqual(self.render(case), case['markdown'])
+
+    def render(self, case):
+        return PrintModel("Bet365", case['hours_to_start'], case['league'], case['home_team'], case['away_team'],
+                          case['bet_type'], case['mod'], case['price'], case['bet_class'], case['placed_count'],
+                          "2.1").get_markdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,16 +1,37 @@
 import asyncio
 import json
+import os
+import tempfile
+import time
 import unittest
 from unittest.mock import patch, MagicMock
 
 from integrations.client.bet_site import BetSite
 from integrations.scraper import Scraper
 from integrations.helpers.hash_calculator import compute_bet_model_hash
+from integrations.helpers.message_tracker import TrackedMessage
+from integrations.helpers.routing import Route
+
+
+async def restart_without_pending(config):
+    scraper = Scraper()
+    scraper.restore_state(config)
+    drained = scraper.drain_outbox(config)
+    scraper.state_store.close()
+    return drained
 
 
 class TestScraper(unittest.TestCase):
     def setUp(self):
         self.scraper = Scraper()
+        # the tests that start the scraper must never touch the state db in the working tree
+        self.directory = tempfile.TemporaryDirectory()
+        self.state_db_path = os.path.join(self.directory.name, "state.sqlite3")
+
+    def tearDown(self):
+        if self.scraper.state_store is not None:
+            self.scraper.state_store.close()
+        self.directory.cleanup()
 
     @patch("builtins.open", new_callable=MagicMock)
     @patch("yaml.safe_load")
@@ -31,6 +52,7 @@ class TestScraper(unittest.TestCase):
             "username": "testuser",
             "password": "testpassword",
             "login_url": "https://testloginurl.com",
+            "state_db_path": self.state_db_path,
         }
         self.scraper.start()
 
@@ -38,7 +60,7 @@ class TestScraper(unittest.TestCase):
         self.assertTrue(mock_safe_load.called)
         self.assertTrue(mock_run.called)
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_send_data_to_bot(self, mock_post):
         mock_post.return_value.text = "Mock Response"
         config = {
@@ -74,7 +96,8 @@ class TestScraper(unittest.TestCase):
             "password": "testpassword",
             "login_url": "https://testloginurl.com",
             "sing_api_url": "https://test_sing_url.com",
-            "bet365_api_url": "https://test_bet365_url.com"
+            "bet365_api_url": "https://test_bet365_url.com",
+            "state_db_path": self.state_db_path,
         }
 
         # Create a fake response object for the requests.Session.post/get
@@ -252,6 +275,249 @@ class TestScraper(unittest.TestCase):
         scraper.get_and_parse_data.assert_called_once()
         scraper.send_data_to_bot.assert_called_once()
 
+    @patch.object(BetSite, "fetch_bets_data")
+    def test_get_and_parse_data_with_routing_table(self, mock_fetch_bets_data):
+        bet = {'uuid': 'aaa', 'pin_fix': 'bet1', 'hours_to_start': 1, 'league': 'LeagueA', 'home_team': 'TeamA',
+               'away_team': 'TeamB', 'bet_type': '1', 'mod': 0, 'price': 2.0, 'bet_class': 'ah', 'placed_count': 0,
+               'dashboard_name': 'corners'}
+        payloads = {
+            "https://first.api": [{"data": "[]"}, {"data": json.dumps([bet])}],
+            "https://second.api": [{"data": "[]"}, {"data": json.dumps([dict(bet, uuid='bbb', pin_fix='bet2')])}],
+        }
+
+        async def fetch_bets_data(url):
+            return payloads[url].pop(0)
+
+        mock_fetch_bets_data.side_effect = fetch_bets_data
+        config = {
+            "sources": {"first": {"api_url": "https://first.api"}, "second": {"api_url": "https://second.api"}},
+            "routes": [
+                {"name": "first_corners", "source": "first", "dashboard_name": "corners", "chats": [1]},
+                {"name": "second_corners", "source": "second", "dashboard_name": "corners", "dedup": "uuid",
+                 "renderer": "clean", "page_name": "Second", "chats": [2]},
+            ],
+        }
+
+        # the first poll is the baseline for every route
+        first_result = asyncio.run(self.scraper.get_and_parse_data(config))
+        result = asyncio.run(self.scraper.get_and_parse_data(config))
+
+        self.assertEqual(first_result, {"first_corners": [], "second_corners": []})
+        self.assertEqual(len(result["first_corners"]), 1)
+        self.assertEqual(len(result["second_corners"]), 1)
+        self.assertTrue(result["second_corners"][0].startswith("__Second__"))
+
+    @patch.object(BetSite, "fetch_bets_data")
+    def test_columnar_batches_give_the_same_messages(self, mock_fetch_bets_data):
+        with open('./integrations/test_data.json', 'rb') as f:
+            bets = json.loads(json.loads(f.read())['data'])
+        for bet in bets[::2]:
+            bet['dashboard_name'] = 'bet365'
+        polls = [bets[:4], bets[:7] + [dict(bets[0], price=3.5)], bets, bets[2:]]
+
+        def run_polls(config):
+            scraper = Scraper()
+            payloads = [{"data": json.dumps(poll)} for poll in polls]
+
+            async def fetch_bets_data(url):
+                return payloads.pop(0)
+
+            mock_fetch_bets_data.side_effect = fetch_bets_data
+            results = [asyncio.run(scraper.get_and_parse_data(config)) for _ in polls]
+            return results, set(scraper.placed_bets)
+
+        config = {"get_data2_api_url": "https://example.com/api", "chat_sing_id": 1, "chat_bet365_id": 2,
+                  "chat_bet365_clean_id": 3}
+        row_results, row_placed_bets = run_polls(config)
+        columnar_results, columnar_placed_bets = run_polls(dict(config, columnar_batches=True))
+
+        self.assertEqual(columnar_results, row_results)
+        self.assertEqual(columnar_placed_bets, row_placed_bets)
+        self.assertTrue(any(row_results[1].values()))
+
+    @patch.object(BetSite, "fetch_bets_data")
+    def test_get_and_parse_data_records_metrics(self, mock_fetch_bets_data):
+        with open('./integrations/test_data.json', 'rb') as f:
+            bets = json.loads(json.loads(f.read())['data'])
+        payload = {"data": json.dumps([dict(bet, dashboard_name="Sing") for bet in bets])}
+
+        async def fetch_bets_data(url):
+            return payload
+
+        mock_fetch_bets_data.side_effect = fetch_bets_data
+        config = {"get_data2_api_url": "https://example.com/api", "chat_sing_id": 1}
+        asyncio.run(self.scraper.get_and_parse_data(config))
+
+        self.assertEqual(self.scraper.fetches.get(source="dashboard_v2", result="ok"), 1)
+        self.assertEqual(self.scraper.dashboard_bets.get(source="dashboard_v2", dashboard="sing"), 11)
+        self.assertEqual(self.scraper.dedup_entries.get(partition="sing_bets"), 11)
+        self.assertEqual(self.scraper.render_seconds.count(route="sing"), 1)
+        self.assertIn('scraper_decode_seconds_count{source="dashboard_v2"} 1', self.scraper.metrics.render())
+
+    def test_dedup_evictions_are_exported(self):
+        self.scraper.dedup_max_entries = 2
+        self.scraper.dedup_grace_seconds = 0
+        bets = [{'uuid': uuid, 'hours_to_start': hours} for uuid, hours in [("a", 0), ("b", 5), ("c", 5)]]
+
+        self.scraper.get_new_bets_based_on_uuid("bet365_clean_bets", bets)
+        self.scraper.get_new_bets_based_on_uuid("bet365_clean_bets", [{'uuid': "d", 'hours_to_start': 0}])
+        self.scraper.expire_dedup_entries()
+
+        self.assertEqual(self.scraper.dedup_evictions.get(partition="bet365_clean_bets", reason="capacity"), 2)
+        self.assertEqual(self.scraper.dedup_evictions.get(partition="bet365_clean_bets", reason="expired"), 1)
+        self.assertIn('scraper_dedup_evictions_total{partition="bet365_clean_bets",reason="capacity"} 2',
+                      self.scraper.metrics.render())
+
+    @patch.object(BetSite, "fetch_bets_data")
+    def test_unsent_messages_are_resent_once_after_a_crash(self, mock_fetch_bets_data):
+        with open('./integrations/test_data.json', 'rb') as f:
+            bets = [dict(bet, dashboard_name="sing") for bet in json.loads(json.loads(f.read())['data'])]
+        payloads = [{"data": json.dumps(bets[:5])}, {"data": json.dumps(bets)}, {"data": json.dumps(bets)}]
+
+        async def fetch_bets_data(url):
+            return payloads.pop(0)
+
+        mock_fetch_bets_data.side_effect = fetch_bets_data
+        sent = []
+
+        class FakeDispatcher:
+            def __init__(self, answer):
+                self.answer = answer
+
+            def enqueue(self, chat_id, text, edit_message_id=None):
+                future = asyncio.get_running_loop().create_future()
+                if self.answer:
+                    sent.append((chat_id, text))
+                    future.set_result(MagicMock(status_code=200))
+                return future
+
+        with tempfile.TemporaryDirectory() as directory:
+            config = {"get_data2_api_url": "https://example.com/api", "chat_sing_id": 1,
+                      "state_db_path": os.path.join(directory, "state.sqlite3")}
+
+            async def crash_before_telegram_answers():
+                scraper = Scraper()
+                scraper.restore_state(config)
+                scraper.telegram_dispatcher = FakeDispatcher(answer=False)
+                await scraper.get_and_parse_data(config)
+                message_queues = await scraper.get_and_parse_data(config)
+                scraper.dispatch_queued_messages(scraper.telegram_dispatcher, message_queues, config)
+                return message_queues
+
+            async def restart():
+                scraper = Scraper()
+                scraper.restore_state(config)
+                scraper.telegram_dispatcher = FakeDispatcher(answer=True)
+                await scraper.drain_outbox(config)
+                message_queues = await scraper.get_and_parse_data(config)
+                scraper.state_store.close()
+                return message_queues
+
+            lost_queues = asyncio.run(crash_before_telegram_answers())
+            restarted_queues = asyncio.run(restart())
+            self.assertIsNone(asyncio.run(restart_without_pending(config)))
+
+        self.assertEqual(len(lost_queues["sing"]), 6)
+        self.assertEqual(sent, [(1, message) for message in lost_queues["sing"]])
+        # the bets of the lost messages are not new anymore after the restart
+        self.assertEqual(restarted_queues["sing"], [])
+
+    @patch.object(BetSite, "fetch_bets_data")
+    def test_changed_bets_edit_their_message(self, mock_fetch_bets_data):
+        with open('./integrations/test_data.json', 'rb') as f:
+            bets = [dict(bet, dashboard_name="sing") for bet in json.loads(json.loads(f.read())['data'])][:3]
+        moved_bets = bets[:2] + [dict(bets[2], price=bets[2]['price'] + 0.1)]
+        payloads = [bets[:2], bets, moved_bets, bets[:2], bets]
+
+        async def fetch_bets_data(url):
+            return {"data": json.dumps(payloads.pop(0))}
+
+        mock_fetch_bets_data.side_effect = fetch_bets_data
+        sent = []
+
+        class FakeDispatcher:
+            def enqueue(self, chat_id, text, edit_message_id=None):
+                sent.append((chat_id, text, edit_message_id))
+                response = MagicMock(status_code=200)
+                response.json.return_value = {"ok": True, "result": {"message_id": edit_message_id or len(sent)}}
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(response)
+                return future
+
+            def stats(self):
+                return {}
+
+        config = {"get_data2_api_url": "https://example.com/api", "chat_sing_id": 1}
+        self.scraper.telegram_dispatcher = FakeDispatcher()
+
+        async def poll():
+            message_queues = await self.scraper.get_and_parse_data(config)
+            await self.scraper.send_data_to_bot(message_queues, config)
+            return message_queues["sing"]
+
+        async def run():
+            return [await poll() for _ in range(5)]
+
+        first, new, moved, removed, back = asyncio.run(run())
+
+        self.assertEqual(first, [])
+        self.assertEqual(len(new), 1)
+        self.assertEqual(len(moved), 1)
+        self.assertEqual(removed, [])
+        self.assertEqual([edit_message_id for _, _, edit_message_id in sent], [None, 1, None])
+        self.assertEqual(sent[1][1], moved[0])
+        # the bet came back after it was gone from the snapshot, so it is posted again
+        self.assertEqual(sent[2][1], back[0])
+        changes = {change: self.scraper.bet_changes.get(route="sing", change=change)
+                   for change in ("new", "updated", "removed")}
+        self.assertEqual(changes, {"new": 2, "updated": 1, "removed": 1})
+
+    def test_update_of_a_deleted_message_is_posted_again(self):
+        sent = []
+
+        class FakeDispatcher:
+            def enqueue(self, chat_id, text, edit_message_id=None):
+                sent.append((chat_id, text, edit_message_id))
+                response = MagicMock(status_code=200)
+                response.json.return_value = {"ok": True, "result": {"message_id": 9}}
+                future = asyncio.get_running_loop().create_future()
+                future.set_result(response)
+                return future
+
+        route = Route("sing", "dashboard_v2", edit_updates=True)
+        message = TrackedMessage("moved bet", "uuid-1")
+        self.scraper.telegram_dispatcher = FakeDispatcher()
+        self.scraper.message_tracker.remember("sing", "uuid-1", 1, 5)
+
+        async def run():
+            delivery = asyncio.get_running_loop().create_future()
+            delivery.set_result(MagicMock(status_code=400, text='{"ok":false,"description":'
+                                                                '"Bad Request: message to edit not found"}'))
+            self.scraper.acknowledge_delivery(route, [message], 1, delivery)
+            await asyncio.sleep(0)
+
+        asyncio.run(run())
+
+        self.assertEqual(sent, [(1, "moved bet", None)])
+        self.assertEqual(self.scraper.message_tracker.message_id("sing", "uuid-1", 1), 9)
+
+    def test_sessions_are_refreshed_when_due(self):
+        config = {"get_data2_api_url": "https://example.com/api", "get_data2_login_url": "https://example.com/login"}
+        bet_site = self.scraper.get_bet_site("dashboard_v2", config)
+
+        async def refresh_session():
+            bet_site.refresh_at = time.time() + 600
+            return True
+
+        with patch.object(bet_site, "refresh_session", side_effect=refresh_session) as mock_refresh:
+            self.assertEqual(asyncio.run(self.scraper.refresh_due_sessions(config)), 60)
+            mock_refresh.assert_not_called()
+
+            bet_site.refresh_at = time.time() - 1
+            self.assertAlmostEqual(asyncio.run(self.scraper.refresh_due_sessions(config, check_interval=3600)), 600,
+                                   delta=1)
+            mock_refresh.assert_called_once()
+
     def test_add_new_bet_to_placed_bets(self):
         bet = {'uuid': '12345', 'placed_count': 1}
         self.scraper.check_bet_for_placed_and_add_to_dict(bet)
@@ -1,7 +1,10 @@
 import asyncio
+import os
+import tempfile
 import unittest
 from unittest.mock import patch, MagicMock
 
+from integrations.helpers.shared_counter import SharedCounter
 from integrations.scraper import Scraper
 
 
@@ -14,25 +17,25 @@ class TestSendDataToBot(unittest.TestCase):
             "chat_bet365_id": "5678"
         }
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_empty_message_queue(self, mock_post):
         message_queues = {}
         asyncio.run(self.scraper.send_data_to_bot(message_queues, self.config))
         mock_post.assert_not_called()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_only_sing_in_message_queue(self, mock_post):
         message_queues = {"sing": ["Test message for sing"]}
         asyncio.run(self.scraper.send_data_to_bot(message_queues, self.config))
         mock_post.assert_called_once()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_only_bet365_in_message_queue(self, mock_post):
         message_queues = {"bet365": ["Test message for bet365"]}
         asyncio.run(self.scraper.send_data_to_bot(message_queues, self.config))
         mock_post.assert_called_once()
 
-    @patch("requests.post")
+    @patch("requests.Session.post")
     def test_both_in_message_queue(self, mock_post):
         message_queues = {
             "sing": ["Test message for sing"],
@@ -42,6 +45,42 @@ class TestSendDataToBot(unittest.TestCase):
         # Ensure that the post request was made twice, once for sing and once for bet365
         self.assertEqual(mock_post.call_count, 2)
 
+    @patch("requests.Session.post")
+    def test_batched_destination_sends_one_message(self, mock_post):
+        config = dict(self.config, batch_messages={"sing": True})
+        message_queues = {
+            "sing": ["Test message 1 for sing", "Test message 2 for sing"],
+            "bet365": ["Test message 1 for bet365", "Test message 2 for bet365"]
+        }
+        asyncio.run(self.scraper.send_data_to_bot(message_queues, config))
+        # sing is batched into one message, bet365 is not batched
+        self.assertEqual(mock_post.call_count, 3)
+
+    @patch("requests.Session.post")
+    def test_clean_messages_are_delayed_and_limited_by_shared_counter(self, mock_post):
+        with tempfile.TemporaryDirectory() as directory:
+            config = dict(self.config, chat_bet365_clean_id="9012", send_delays={"bet365_clean": 0.05},
+                          clean_counter_path=os.path.join(directory, "counters.sqlite3"))
+            counter = SharedCounter('clean_message_count', config['clean_counter_path'])
+            counter.set(2)
+
+            async def run():
+                await self.scraper.send_data_to_bot({"bet365_clean": ["clean 1", "clean 2", "clean 3"]}, config)
+                self.assertEqual(mock_post.call_count, 0)
+                self.assertEqual(len(self.scraper.delay_scheduler), 3)
+
+                await asyncio.sleep(0.1)
+                await self.scraper.telegram_dispatcher.join()
+
+            asyncio.run(run())
+
+            # after the delay two messages are sent, then the end message, the third is dropped
+            self.assertEqual([call.kwargs['data']['text'] for call in mock_post.call_args_list],
+                             ["clean 1", "clean 2", "All messages sent\n"])
+            self.assertEqual(counter.get(), 0)
+            counter.close()
+            self.scraper.shared_counters['clean_message_count'].close()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,104 @@
+import os
+import tempfile
+import time
+import unittest
+
+from integrations.helpers.routing import load_routing_table
+from integrations.helpers.state_store import StateStore
+from integrations.supervisor import Supervisor, migrate_shared_state, shard_path, worker_config
+
+
+def exit_immediately(config):
+    pass
+
+
+def run_forever(config):
+    while True:
+        time.sleep(1)
+
+
+class TestSupervisor(unittest.TestCase):
+    def setUp(self):
+        self.config = {"get_data2_api_url": "https://example.com/api", "chat_sing_id": 1, "chat_bet365_id": 2,
+                       "chat_bet365_clean_id": 3, "metrics_port": 9102,
+                       "record_responses_path": "./recordings/responses.jsonl.gz", "shard_by": "dashboard"}
+
+    def test_every_worker_gets_its_own_state(self):
+        config = worker_config(self.config, "dashboard_v2-bet365", ["bet365", "bet365_clean"], 1)
+
+        self.assertEqual(config['shard_routes'], ["bet365", "bet365_clean"])
+        self.assertTrue(config['shared_telegram_budget'])
+        self.assertEqual(config['state_db_path'], "./integrations/scraper_state.dashboard_v2-bet365.sqlite3")
+        self.assertEqual(config['record_responses_path'], "./recordings/responses.dashboard_v2-bet365.jsonl.gz")
+        self.assertEqual(config['metrics_port'], 9103)
+        self.assertEqual(shard_path("state", "a b"), "state.a_b")
+
+    def test_dead_workers_are_restarted_with_backoff(self):
+        supervisor = Supervisor(self.config, target=exit_immediately, restart_delay=0.05, stable_after=60)
+        for worker in supervisor.workers.values():
+            supervisor.start_worker(worker)
+
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline and min(w.restarts for w in supervisor.workers.values()) < 2:
+            supervisor.check_workers()
+            time.sleep(0.01)
+        supervisor.stop()
+
+        for worker in supervisor.workers.values():
+            self.assertGreaterEqual(worker.restarts, 2)
+            self.assertGreater(worker.restart_delay, 0.05)
+
+    def test_stop_terminates_the_workers(self):
+        supervisor = Supervisor(self.config, target=run_forever)
+        for worker in supervisor.workers.values():
+            supervisor.start_worker(worker)
+
+        supervisor.stop()
+
+        self.assertTrue(all(not worker.process.is_alive() for worker in supervisor.workers.values()))
+        self.assertEqual(len(supervisor.workers), 2)
+
+    def test_shards_by_source_fetch_a_shared_endpoint_once(self):
+        del self.config['shard_by']
+
+        supervisor = Supervisor(self.config, target=exit_immediately)
+
+        self.assertEqual(supervisor.shards, {"dashboard_v2": ["sing", "bet365", "bet365_clean"]})
+
+    def test_shards_that_share_an_endpoint_are_reported(self):
+        with self.assertLogs('integrations.supervisor', level='WARNING') as logs:
+            Supervisor(self.config, target=exit_immediately)
+
+        self.assertIn("https://example.com/api", logs.output[0])
+
+    def test_state_of_a_single_process_is_moved_into_the_shards(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "state.sqlite3")
+            state_store = StateStore(path)
+            state_store.save({"sing_bets": {"s1": None}, "bet365_clean": {"u1": None}}, {"p1": {"uuid": "p1"}},
+                             [("sing", [1], ["sing message"]), ("bet365_clean", [3], ["clean message"]),
+                              ("removed", [4], ["old message"])])
+            state_store.message_tracker.remember("bet365_clean", "u1", 3, 42)
+            state_store.close()
+            _, routes = load_routing_table(self.config)
+            shards = {"sing": ["sing"], "bet365": ["bet365", "bet365_clean"]}
+
+            self.assertEqual(migrate_shared_state(path, shards, routes), ["sing", "bet365"])
+            self.assertEqual(migrate_shared_state(path, shards, routes), [])
+
+            sing, bet365, shared = (StateStore(shard_path(path, "sing")), StateStore(shard_path(path, "bet365")),
+                                    StateStore(path))
+            self.assertEqual(sing.load(), ({"sing_bets": {"s1": None}}, {"p1": {"uuid": "p1"}}))
+            self.assertEqual(bet365.load(), ({"bet365_clean": {"u1": None}}, {"p1": {"uuid": "p1"}}))
+            self.assertEqual([(route, message) for route, message, _ in sing.outbox.pending()],
+                             [("sing", "sing message"), ("removed", "old message")])
+            self.assertEqual(bet365.outbox.pending()[0][1:], ("clean message", [3]))
+            self.assertEqual(bet365.message_tracker.message_id("bet365_clean", "u1", 3), 42)
+            # moved messages are not sent again by a single process scraper on the old db
+            self.assertEqual(shared.outbox.pending(), [])
+            for state_store in [sing, bet365, shared]:
+                state_store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
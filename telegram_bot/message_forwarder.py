@@ -1,12 +1,13 @@
 import asyncio
 import logging
-import os
 
 import yaml
 from asgiref.sync import sync_to_async
 from telethon import TelegramClient, events
 from telethon.events import NewMessage
 
+from integrations.helpers.shared_counter import SharedCounter, DEFAULT_COUNTER_PATH
+
 loggingFormat = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 logging.basicConfig(level=logging.INFO, format=loggingFormat)
 logging.getLogger('telethon').setLevel(level=logging.WARNING)
@@ -62,24 +63,24 @@ class MessageForwarder:
                 return
             # get the number from the message
             number = event.text.split(' ')[1]
-            # save the number to file in clean_message_count.txt
-            await write_to_file(number)
+            # save the number to the counter shared with the scraper
+            await set_clean_message_count(number)
             await bot.send_message(event.chat_id, f'Waiting for {number} messages to send.')
 
-        async def write_to_file(number):
+        async def set_clean_message_count(number):
             if number == 0 or number == '' or number == '0':
                 return
-            # deleting the file and writing to it
             try:
-                os.remove('./clean_message_count.txt')
+                await asyncio.to_thread(set_shared_counter, int(number))
             except Exception as e:
-                pass
+                logger.info(e)
 
+        def set_shared_counter(number):
+            counter = SharedCounter('clean_message_count', config.get('clean_counter_path', DEFAULT_COUNTER_PATH))
             try:
-                with open('./clean_message_count.txt', 'w') as f:
-                    f.write(str(number))
-            except Exception as e:
-                pass
+                counter.set(number)
+            finally:
+                counter.close()
 
         @bot.on(events.NewMessage(pattern=at_tag_pattern))
         async def handler(event: NewMessage.Event):